@@ -7,6 +7,8 @@ const CommunityFeed = () => {
     const [recipes, setRecipes] = useState<Recipe[]>([])
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<Error | null>(null)
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [showScrollTop, setShowScrollTop] = useState(false)
 
     useEffect(() => {
@@ -21,22 +23,28 @@ const CommunityFeed = () => {
         window.scrollTo({ top: 0, behavior: 'smooth' })
     }
 
-    async function fetchRecipes() {
+    // The API returns one page at a time; pass next_cursor back to get the
+    // next one
+    async function fetchRecipes(cursor?: string) {
         try {
-            const response = await fetch('http://localhost:8000/api/recipes')
+            const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+            const response = await fetch(`http://localhost:8000/api/recipes/summary${params}`)
             const data = await response.json()
             if (!response.ok)
                 throw new Error(`Failed to fetch recipes: ${response.status}`)
 
             // Map snake_case API data to camelCase for RecipeCard
-            const camelData: Recipe[] = data.map((r: any) => ({
+            const camelData: Recipe[] = data.items.map((r: any) => ({
                 id: r.id,
                 title: r.title,
                 totalTime: r.total_time,
                 imageUrl: r.image_url ?? null,
             }))
 
-            setRecipes(camelData)
+            setRecipes((prev) =>
+                cursor ? [...prev, ...camelData] : camelData
+            )
+            setNextCursor(data.next_cursor ?? null)
             setLoading(false)
         } catch (error) {
             setError(error as Error)
@@ -45,6 +53,13 @@ const CommunityFeed = () => {
         }
     }
 
+    async function handleLoadMore() {
+        if (!nextCursor) return
+        setLoadingMore(true)
+        await fetchRecipes(nextCursor)
+        setLoadingMore(false)
+    }
+
     useEffect(() => {
         fetchRecipes()
     }, [])
@@ -69,6 +84,15 @@ const CommunityFeed = () => {
                     />
                 ))}
             </div>
+            {nextCursor && (
+                <button
+                    className="load-more-btn"
+                    onClick={handleLoadMore}
+                    disabled={loadingMore}
+                >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+            )}
             <button
                 className={`scroll-to-top-btn ${showScrollTop ? 'visible' : ''}`}
                 aria-label="Scroll to top"
@@ -8,6 +8,8 @@ const Cookbook = () => {
     const [recipes, setRecipes] = useState<Recipe[]>([])
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<Error | null>(null)
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [showScrollTop, setShowScrollTop] = useState(false)
     const { user } = useUser()
 
@@ -38,15 +40,18 @@ const Cookbook = () => {
         }
     }
 
-    async function fetchRecipes() {
+    // The API returns one page at a time; pass next_cursor back to get the
+    // next one
+    async function fetchRecipes(cursor?: string) {
         try {
-            const response = await fetch(`/api/recipes/user/${user?.id}`)
+            const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+            const response = await fetch(`/api/recipes/user/${user?.id}/summary${params}`)
             const data = await response.json()
             if (!response.ok)
                 throw new Error(`Failed to fetch recipes: ${response.status}`)
 
             // Map snake_case API data to camelCase for RecipeCard
-            const camelData: Recipe[] = data.map((r: any) => ({
+            const camelData: Recipe[] = data.items.map((r: any) => ({
                 id: r.id,
                 title: r.title,
                 totalTime: r.total_time,
@@ -56,7 +61,10 @@ const Cookbook = () => {
             // Debug: log mapped camelData
             console.log('Mapped recipes:', camelData)
 
-            setRecipes(camelData)
+            setRecipes((prev) =>
+                cursor ? [...prev, ...camelData] : camelData
+            )
+            setNextCursor(data.next_cursor ?? null)
             setLoading(false)
         } catch (error) {
             setError(error as Error)
@@ -65,6 +73,13 @@ const Cookbook = () => {
         }
     }
 
+    async function handleLoadMore() {
+        if (!nextCursor) return
+        setLoadingMore(true)
+        await fetchRecipes(nextCursor)
+        setLoadingMore(false)
+    }
+
     useEffect(() => {
         fetchRecipes()
     }, [])
@@ -94,6 +109,15 @@ const Cookbook = () => {
                     />
                 ))}
             </div>
+            {nextCursor && (
+                <button
+                    className="load-more-btn"
+                    onClick={handleLoadMore}
+                    disabled={loadingMore}
+                >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+            )}
             <button
                 className={`scroll-to-top-btn ${showScrollTop ? 'visible' : ''}`}
                 aria-label="Scroll to top"
@@ -56,15 +56,48 @@ const RecipeGenerator = () => {
                 ingredients,
                 max_time: Number(maxTime),
             }
-            const res = await fetch('http://localhost:8000/api/generate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(body),
-            })
-            if (!res.ok) throw new Error('Chef is busy! Please try again.')
-            const data = await res.json()
-            setAiResult(data.result || JSON.stringify(data))
+            // Server-Sent Events: one "recipe" event per recipe as soon as
+            // it is ready, then "done" (or "error")
+            const res = await fetch(
+                'http://localhost:8000/api/generate/stream',
+                {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(body),
+                }
+            )
+            if (!res.ok || !res.body)
+                throw new Error('Chef is busy! Please try again.')
+            setAiResult(null)
             setAddStatus({})
+            const received: AIRecipe[] = []
+            const reader = res.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ''
+            for (;;) {
+                const { done, value } = await reader.read()
+                if (done) break
+                buffer += decoder.decode(value, { stream: true })
+                const events = buffer.split('\n\n')
+                buffer = events.pop() ?? ''
+                for (const block of events) {
+                    const fields: { [key: string]: string } = {}
+                    for (const line of block.split('\n')) {
+                        const sep = line.indexOf(': ')
+                        if (sep > 0)
+                            fields[line.slice(0, sep)] = line.slice(sep + 2)
+                    }
+                    const data = JSON.parse(fields.data || 'null')
+                    if (fields.event === 'recipe') {
+                        received.push(data)
+                        setAiResult(JSON.stringify({ recipes: [...received] }))
+                    } else if (fields.event === 'error') {
+                        throw new Error(
+                            data?.detail || 'Chef is busy! Please try again.'
+                        )
+                    }
+                }
+            }
         } catch (err) {
             setError((err as Error).message)
         } finally {
@@ -1,14 +1,36 @@
-from sqlalchemy import select
+from fastapi import HTTPException
+import hashlib
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .auth_models import DBUser
-import bcrypt
+from .auth_models import DBUser, DBUserSession
 from datetime import datetime, timedelta
 from secrets import token_urlsafe
 from .auth_schemas import UserPublicDetailsResponse
+from .passwords import (
+    PasswordHasher,
+    check_password,
+    hash_password,
+    needs_rehash,
+    password_hasher,
+)
+from .session_cache import SESSION_REFRESH_MINUTES, session_cache
+from .signed_tokens import (
+    issue_token,
+    revoke,
+    revocations,
+    signed_tokens_enabled,
+    verify_token,
+)
 
 SESSION_LIFE_MINUTES = 120
 
 
+def hash_token(session_token: str) -> str:
+    """The key a session token is stored under in user_sessions."""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+
 def get_user_by_username(session: Session, username: str) -> DBUser | None:
     """
     Get user object by username. Returns None if the user does not exist.
@@ -44,12 +66,23 @@ def create_user_account(
     Returns True if the account was created successfully, of
     False if the username exists.
     """
+    if get_user_by_username(session, username):
+        return False
+    return add_user_account(
+        session, username, hash_password(password), image_url
+    )
+
+
+def add_user_account(
+    session: Session,
+    username: str,
+    hashed_password: str,
+    image_url: str | None,
+) -> bool:
+    """create_user_account with the password already hashed."""
     stmt = select(DBUser).where(DBUser.username == username)
     if session.scalar(stmt):
         return False
-    hashed_password = bcrypt.hashpw(
-        password.encode(), bcrypt.gensalt()
-    ).decode()
     account = DBUser(
         username=username,
         hashed_password=hashed_password,
@@ -67,49 +100,111 @@ def validate_session(
 ) -> bool:
     """
     Validate a session token for a given username. Returns True if the
-    session is valid and not expired, and updates the session expiration.
-    Returns False otherwise.
+    session is valid and not expired, and slides the session expiration
+    forward. Returns False otherwise.
+
+    Recently validated sessions come from session_cache without a query,
+    and the expiration is only moved when it gets close (see
+    session_cache).
     """
-    stmt = (
-        select(DBUser)
-        .where(DBUser.username == username)
-        .where(DBUser.session_token == session_token)
-    )
-    user = session.scalar(stmt)
-    if not user:
+    now = datetime.now()
+    token_hash = hash_token(session_token)
+    cached = session_cache.get(token_hash)
+    if cached is None:
+        # primary key lookup, plus the owner's row by primary key
+        stmt = (
+            select(
+                DBUserSession.user_id,
+                DBUserSession.expires_at,
+                DBUser.username,
+            )
+            .join(DBUser, DBUser.id == DBUserSession.user_id)
+            .where(DBUserSession.token_hash == token_hash)
+        )
+        row = session.execute(stmt).first()
+        if row is None or row.username != username:
+            return False
+        # an extension still waiting for the flush is newer than the row
+        expires_at = session_cache.pending_expiry(token_hash)
+        if expires_at is None:
+            expires_at = row.expires_at
+        if now >= expires_at:
+            return False
+        cached = session_cache.set(
+            token_hash, row.user_id, username, expires_at
+        )
+    elif now >= cached.expires_at or cached.username != username:
         return False
 
-    # Check if session has expired or is None
-    if (
-        user.session_expires_at is None
-        or datetime.now() >= user.session_expires_at
-    ):
-        return False
+    if cached.expires_at - now < timedelta(minutes=SESSION_REFRESH_MINUTES):
+        session_cache.extend(
+            cached, now + timedelta(minutes=SESSION_LIFE_MINUTES)
+        )
+    if session_cache.flush_due():
+        flush_session_extensions(session)
+    return True
 
-    expires = datetime.now() + timedelta(minutes=SESSION_LIFE_MINUTES)
-    user.session_expires_at = expires
+
+def flush_session_extensions(session: Session) -> None:
+    """Write the queued session expiry extensions in one statement."""
+    pending = session_cache.take_pending()
+    if not pending:
+        return
+    sessions = DBUserSession.__table__
+    # a session deleted meanwhile (logout, sweeper) just matches nothing
+    stmt = (
+        update(sessions)
+        .where(sessions.c.token_hash == bindparam("session_key"))
+        .values(expires_at=bindparam("new_expires_at"))
+    )
+    session.execute(stmt, pending)
     session.commit()
-    return True
 
 
 def invalidate_session(
     session: Session, username: str, session_token: str
 ) -> None:
     """
-    Invalidate a user's session by setting the session token to a unique
-    expired value.
+    Invalidate a user's session by deleting it. The user's other sessions
+    stay valid. A signed token is added to the revocation list instead.
     """
-    stmt = (
-        select(DBUser)
-        .where(DBUser.username == username)
-        .where(DBUser.session_token == session_token)
-    )
-    user = session.scalar(stmt)
-    if not user:
+    if signed_tokens_enabled():
+        claims = verify_token(session_token)
+        if (
+            claims is not None
+            and claims.username == username
+            and not revocations.is_revoked(claims)
+        ):
+            revoke(
+                session,
+                claims.user_id,
+                SESSION_LIFE_MINUTES * 60,
+                claims.token_id,
+            )
         return
-
-    user.session_token = f"expired-{token_urlsafe()}"
+    token_hash = hash_token(session_token)
+    user_session = session.get(DBUserSession, token_hash)
+    if not user_session:
+        return
+    user = session.get(DBUser, user_session.user_id)
+    if user is None or user.username != username:
+        return
+    session.delete(user_session)
     session.commit()
+    session_cache.forget(user.id, token_hash)
+
+
+def end_user_sessions(
+    session: Session, user_id: int, keep_token: str | None = None
+) -> None:
+    """
+    Log a user out everywhere, except for the session keep_token if
+    given. The caller commits.
+    """
+    stmt = delete(DBUserSession).where(DBUserSession.user_id == user_id)
+    if keep_token is not None:
+        stmt = stmt.where(DBUserSession.token_hash != hash_token(keep_token))
+    session.execute(stmt)
 
 
 def validate_username_password(
@@ -119,16 +214,185 @@ def validate_username_password(
     Validate a password against a user object. If valid,
     generates a new session token, updates the session expiration, and
     returns the session token. Returns None if credentials are invalid.
+    With signed tokens nothing is stored, a signed token is returned.
     """
-    valid_credentials = bcrypt.checkpw(
-        password.encode(), user.hashed_password.encode()
-    )
-    if not valid_credentials:
+    if not check_password(password, user.hashed_password):
         return None
+    rehashed = None
+    if needs_rehash(user.hashed_password):
+        rehashed = hash_password(password)
+    return start_session(session, user, rehashed)
+
+
+def start_session(
+    session: Session, user: DBUser, rehashed_password: str | None = None
+) -> str:
+    """
+    Log in a user whose password was checked: returns a new session
+    token, and stores rehashed_password (the password hashed with the
+    current cost) if given.
+    """
+    if rehashed_password is not None:
+        user.hashed_password = rehashed_password
+    if signed_tokens_enabled():
+        if rehashed_password is not None:
+            session.commit()
+        return issue_token(user.id, user.username, SESSION_LIFE_MINUTES * 60)
 
     session_token = token_urlsafe()
-    user.session_token = session_token
     expires = datetime.now() + timedelta(minutes=SESSION_LIFE_MINUTES)
-    user.session_expires_at = expires
+    # the user's sessions on other devices stay valid
+    session.add(
+        DBUserSession(
+            token_hash=hash_token(session_token),
+            user_id=user.id,
+            expires_at=expires,
+        )
+    )
     session.commit()
     return session_token
+
+
+def update_user(
+    session: Session,
+    username: str,
+    new_username: str,
+    password: str | None,
+    session_token: str | None = None,
+) -> UserPublicDetailsResponse | None:
+    """
+    Change a user's username and, if given, password. Returns the new
+    public details, or None if the user does not exist. When either
+    really changes, the user's other sessions end; the caller's own
+    database session (session_token) is kept.
+    """
+    user = get_user_by_username(session, username)
+    if not user:
+        return None
+    if password and check_password(password, user.hashed_password):
+        password = None  # the same password again, nothing to change
+    hashed_password = hash_password(password) if password else None
+    return change_user(
+        session, username, new_username, hashed_password, session_token
+    )
+
+
+def change_user(
+    session: Session,
+    username: str,
+    new_username: str,
+    hashed_password: str | None,
+    session_token: str | None = None,
+) -> UserPublicDetailsResponse | None:
+    """
+    update_user with the new password, if it differs from the current
+    one, already hashed.
+    """
+    user = get_user_by_username(session, username)
+    if not user:
+        return None
+    changed = new_username != username or hashed_password is not None
+    user.username = new_username
+    if hashed_password is not None:
+        user.hashed_password = hashed_password
+    if changed:
+        # sessions are for the old username and password
+        end_user_sessions(session, user.id, keep_token=session_token)
+    session.commit()
+    if changed:
+        session_cache.forget(user.id)
+        if signed_tokens_enabled():
+            # the tokens carry the old username and stand for the old
+            # password; the caller gets a new one (see update_me)
+            revoke(session, user.id, SESSION_LIFE_MINUTES * 60)
+    return UserPublicDetailsResponse(
+        id=user.id, username=user.username, image_url=user.image_url
+    )
+
+
+# Async variants for async def endpoints. run_sync drives the functions
+# above on the AsyncSession's connection, so the database round trips are
+# awaited instead of blocking the event loop.
+async def get_user_by_username_async(
+    session: AsyncSession, username: str
+) -> DBUser | None:
+    return await session.run_sync(get_user_by_username, username)
+
+
+async def get_user_public_details_async(
+    session: AsyncSession, username: str
+) -> UserPublicDetailsResponse | None:
+    return await session.run_sync(get_user_public_details, username)
+
+
+# bcrypt runs on the PasswordHasher's pool, not inside run_sync, which
+# would hold up the event loop for the whole hash.
+async def create_user_account_async(
+    session: AsyncSession,
+    username: str,
+    password: str,
+    image_url: str | None,
+    hasher: PasswordHasher = password_hasher,
+) -> bool:
+    if await get_user_by_username_async(session, username):
+        return False
+    hashed_password = await hasher.hash(password)
+    return await session.run_sync(
+        add_user_account, username, hashed_password, image_url
+    )
+
+
+async def validate_session_async(
+    session: AsyncSession, username: str, session_token: str
+) -> bool:
+    return await session.run_sync(validate_session, username, session_token)
+
+
+async def flush_session_extensions_async(session: AsyncSession) -> None:
+    await session.run_sync(flush_session_extensions)
+
+
+async def invalidate_session_async(
+    session: AsyncSession, username: str, session_token: str
+) -> None:
+    await session.run_sync(invalidate_session, username, session_token)
+
+
+async def validate_username_password_async(
+    session: AsyncSession,
+    user: DBUser,
+    password: str,
+    hasher: PasswordHasher = password_hasher,
+) -> str | None:
+    if not await hasher.check(password, user.hashed_password):
+        return None
+    rehashed = None
+    if hasher.needs_rehash(user.hashed_password):
+        try:
+            rehashed = await hasher.hash(password)
+        except HTTPException:
+            pass  # pool is busy, upgrade on a later login
+    return await session.run_sync(start_session, user, rehashed)
+
+
+async def update_user_async(
+    session: AsyncSession,
+    username: str,
+    new_username: str,
+    password: str | None,
+    hasher: PasswordHasher = password_hasher,
+    session_token: str | None = None,
+) -> UserPublicDetailsResponse | None:
+    user = await get_user_by_username_async(session, username)
+    if not user:
+        return None
+    if password and await hasher.check(password, user.hashed_password):
+        password = None  # the same password again, nothing to change
+    hashed_password = await hasher.hash(password) if password else None
+    return await session.run_sync(
+        change_user,
+        username,
+        new_username,
+        hashed_password,
+        session_token,
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, ForeignKey
 from typing import Optional, TYPE_CHECKING
 from shared.base_model import Base
 
@@ -15,6 +15,7 @@ class DBUser(Base):
     username: Mapped[str] = mapped_column(nullable=False, unique=True)
     hashed_password: Mapped[str] = mapped_column(nullable=False)
     image_url: Mapped[Optional[str]] = mapped_column(nullable=True)
+    # no longer used, sessions are in user_sessions (see migration 0006)
     session_token: Mapped[str] = mapped_column(nullable=True)
     session_expires_at: Mapped[datetime] = mapped_column(nullable=True)
 
@@ -27,3 +28,42 @@ class DBUser(Base):
 
     # Relationhip to recipes through the junction table
     recipes: Mapped[list["DBRecipe"]] = relationship(back_populates="user")
+
+
+class DBUserSession(Base):
+    """
+    A logged-in session. Only the SHA-256 of the token is stored, so the
+    table can't be used to log in as anyone; a user can have many.
+    """
+
+    __tablename__ = "user_sessions"
+
+    token_hash: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now
+    )
+    # the sweeper deletes expired sessions by expires_at
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, index=True
+    )
+
+
+class DBSessionRevocation(Base):
+    """
+    A revoked signed session token (token_id), or with token_id NULL every
+    token of the user issued up to revoked_at. Rows are only needed until
+    expires_at, after which the tokens they revoke have expired anyway.
+    """
+
+    __tablename__ = "session_revocations"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(nullable=False)
+    token_id: Mapped[Optional[str]] = mapped_column(nullable=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, index=True
+    )
@@ -1,14 +1,23 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from sqlalchemy.orm import Session
-from shared.database import get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared.database import get_async_session
 from shared.auth import require_auth
 from .auth_db import (
-    validate_username_password,
-    get_user_public_details,
-    get_user_by_username,
-    create_user_account,
-    invalidate_session,
+    SESSION_LIFE_MINUTES,
+    validate_username_password_async,
+    get_user_public_details_async,
+    get_user_by_username_async,
+    create_user_account_async,
+    invalidate_session_async,
+    update_user_async,
 )
+from .passwords import (
+    LoginThrottle,
+    PasswordHasher,
+    get_login_throttle,
+    get_password_hasher,
+)
+from .signed_tokens import issue_token, signed_tokens_enabled
 from .auth_schemas import (
     LoginRequest,
     LoginResponse,
@@ -17,7 +26,6 @@ from .auth_schemas import (
     AuthenticatedUser,
     UpdateUserRequest,
 )
-import bcrypt
 
 auth_router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
@@ -26,21 +34,28 @@ auth_router = APIRouter(prefix="/api/auth", tags=["authentication"])
 async def session_login(
     credentials: LoginRequest,
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    throttle: LoginThrottle = Depends(get_login_throttle),
 ) -> LoginResponse:
     """
     Handle user login.
     Validates credentials, creates a session, and stores session info
     in cookies. Returns success if login is valid, else raises 401.
+    Raises 429 after too many attempts for the username or from the
+    client, and 503 when password checks are backed up.
     """
     username = credentials.username
     password = credentials.password
+    throttle.check(request, username)
 
-    user = get_user_by_username(session, username)
+    user = await get_user_by_username_async(session, username)
     if not user:
         raise HTTPException(status_code=401)
 
-    new_session_token = validate_username_password(session, user, password)
+    new_session_token = await validate_username_password_async(
+        session, user, password, hasher
+    )
     if not new_session_token:
         raise HTTPException(status_code=401)
 
@@ -54,7 +69,9 @@ async def session_login(
 async def signup(
     credentials: SignUpRequest,
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    throttle: LoginThrottle = Depends(get_login_throttle),
 ) -> LoginResponse:
     """
     Handle user signup.
@@ -68,15 +85,20 @@ async def signup(
         raise HTTPException(
             status_code=400, detail="Username and password required"
         )
-    success = create_user_account(session, username, password, image_url)
+    throttle.check(request, username)
+    success = await create_user_account_async(
+        session, username, password, image_url, hasher
+    )
     if not success:
         raise HTTPException(status_code=409, detail="Username already exists")
 
-    user = get_user_by_username(session, username)
+    user = await get_user_by_username_async(session, username)
     if not user:
         raise HTTPException(status_code=500, detail="User creation failed")
 
-    new_session_token = validate_username_password(session, user, password)
+    new_session_token = await validate_username_password_async(
+        session, user, password, hasher
+    )
     if not new_session_token:
         raise HTTPException(status_code=500, detail="User creation failed")
 
@@ -88,7 +110,7 @@ async def signup(
 
 @auth_router.get("/logout", response_model=LoginResponse)
 async def session_logout(
-    request: Request, session: Session = Depends(get_session)
+    request: Request, session: AsyncSession = Depends(get_async_session)
 ) -> LoginResponse:
     """
     Handle user logout.
@@ -101,7 +123,7 @@ async def session_logout(
     session_token = request.session.get("session_token")
     if not session_token and not isinstance(session_token, str):
         return LoginResponse(success=False)
-    invalidate_session(session, username, session_token)
+    await invalidate_session_async(session, username, session_token)
 
     request.session.clear()
     return LoginResponse(success=True)
@@ -112,14 +134,16 @@ async def session_logout(
     response_model=UserPublicDetailsResponse,
 )
 async def get_me(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
 ) -> UserPublicDetailsResponse:
     """
     Returns the public details of the currently authenticated user.
     Raises 404 if the user is not found in the database.
     """
-    user_details = get_user_public_details(session, auth_user.username)
+    user_details = await get_user_public_details_async(
+        session, auth_user.username
+    )
     if not user_details:
         raise HTTPException(status_code=404, detail="User not found")
     return user_details
@@ -128,21 +152,33 @@ async def get_me(
 @auth_router.put("/me", response_model=UserPublicDetailsResponse)
 async def update_me(
     req: UpdateUserRequest,
-    session: Session = Depends(get_session),
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
+    hasher: PasswordHasher = Depends(get_password_hasher),
 ):
     """
-    Update the current user's username and/or password.
+    Update the current user's username and/or password. The user's other
+    sessions end; this one stays logged in.
     """
-    user = get_user_by_username(session, auth_user.username)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     if not req.username or not req.username.strip():
         raise HTTPException(status_code=400, detail="Username is required")
-    user.username = req.username.strip()
-    if req.password:
-        user.hashed_password = bcrypt.hashpw(
-            req.password.encode(), bcrypt.gensalt()
-        ).decode()
-    session.commit()
-    return get_user_public_details(session, user.username)
+    user_details = await update_user_async(
+        session,
+        auth_user.username,
+        req.username.strip(),
+        req.password,
+        hasher,
+        request.session.get("session_token"),
+    )
+    if not user_details:
+        raise HTTPException(status_code=404, detail="User not found")
+    request.session["username"] = user_details.username
+    if signed_tokens_enabled():
+        # the change revoked every token issued until now, this one too
+        request.session["session_token"] = issue_token(
+            user_details.id,
+            user_details.username,
+            SESSION_LIFE_MINUTES * 60,
+        )
+    return user_details
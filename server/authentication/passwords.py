@@ -0,0 +1,165 @@
+"""
+Password hashing off the event loop, and login throttling.
+
+bcrypt takes a few hundred milliseconds of CPU per hash or check by
+design. Run inline in an async endpoint that stalls every other request
+on the worker, so PasswordHasher runs it on a small dedicated thread pool
+(bcrypt releases the GIL while hashing). At most max_pending hashes may be
+queued or running; beyond that callers get 503 with Retry-After at once
+instead of waiting behind an ever longer queue.
+
+Hashes made with a different cost than BCRYPT_ROUNDS are replaced on the
+next successful login, so raising the cost upgrades users as they log in.
+
+LoginThrottle limits password attempts per username and per client
+address before any hashing happens, so guessing passwords (or sending
+logins just to burn CPU) is refused with 429 cheaply.
+"""
+
+import asyncio
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from fastapi import HTTPException, Request
+from shared.rate_limit import InMemoryRateLimitStore, RateLimit, RateLimitStore
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(4 * PASSWORD_HASH_WORKERS))
+)
+LOGIN_USER_RATE = RateLimit(
+    per_minute=float(os.getenv("LOGIN_USER_PER_MINUTE", "5")),
+    burst=float(os.getenv("LOGIN_USER_BURST", "10")),
+)
+LOGIN_IP_RATE = RateLimit(
+    per_minute=float(os.getenv("LOGIN_IP_PER_MINUTE", "20")),
+    burst=float(os.getenv("LOGIN_IP_BURST", "30")),
+)
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """True when the hash ($2b$<cost>$...) wasn't made with rounds."""
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+
+class PasswordHasher:
+    """
+    bcrypt on a bounded thread pool. Use from one event loop; shutdown()
+    when done.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = BCRYPT_ROUNDS,
+        busy_retry_seconds: float = 1.0,
+    ):
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.busy_retry_seconds = busy_retry_seconds
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix="bcrypt"
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def check(self, password: str, hashed_password: str) -> bool:
+        return await self._run(check_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return needs_rehash(hashed_password, self.rounds)
+
+    async def _run(self, function, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, try again shortly",
+                headers={
+                    "Retry-After": str(math.ceil(self.busy_retry_seconds))
+                },
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+class LoginThrottle:
+    """Token buckets for password attempts per username and per address."""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        user_rate: RateLimit = LOGIN_USER_RATE,
+        ip_rate: RateLimit = LOGIN_IP_RATE,
+    ):
+        self.store = store
+        self.user_rate = user_rate
+        self.ip_rate = ip_rate
+        self.throttled = 0
+
+    def check(self, request: Request, username: str) -> None:
+        """Count an attempt for username from request's client, or 429."""
+        host = request.client.host if request.client else "unknown"
+        for key, limit in [
+            (f"login-ip:{host}", self.ip_rate),
+            (f"login-user:{username.lower()}", self.user_rate),
+        ]:
+            wait = self.store.take(key, limit)
+            if wait > 0:
+                self.throttled += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+
+password_hasher = PasswordHasher()
+_login_throttle = LoginThrottle(InMemoryRateLimitStore())
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Dependency returning the worker's PasswordHasher."""
+    return password_hasher
+
+
+def get_login_throttle() -> LoginThrottle:
+    """Dependency returning the worker's LoginThrottle."""
+    return _login_throttle
@@ -0,0 +1,201 @@
+"""
+Cache of validated sessions, so require_auth rarely touches the database.
+
+validate_session remembers a session it looked up in user_sessions for
+SESSION_CACHE_TTL_SECONDS. The sliding expiry is only moved when less
+than SESSION_REFRESH_MINUTES of the session are left, and those moves are
+queued and written together every SESSION_EXTEND_FLUSH_SECONDS instead of
+one UPDATE and commit per request.
+
+Entries are keyed by token hash, one per session (a user may have
+several). Logout forgets its session, renames and password changes forget
+all of the user's, which takes effect at once in this process. With a
+shared backend configured (use_backend), the other processes drop their
+entries for that user on their next request too. Without one they would
+keep accepting the old token until their entry expires, so when the
+server runs several workers (WEB_CONCURRENCY) sessions are only cached
+with a backend; extensions are still batched.
+
+Queued extensions live in process memory, flush them on shutdown.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime
+from shared.cache import CacheBackend
+
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+SESSION_REFRESH_MINUTES = float(os.getenv("SESSION_REFRESH_MINUTES", "60"))
+SESSION_EXTEND_FLUSH_SECONDS = float(
+    os.getenv("SESSION_EXTEND_FLUSH_SECONDS", "30")
+)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class CachedSession:
+    def __init__(
+        self,
+        token_hash: str,
+        user_id: int,
+        username: str,
+        expires_at: datetime,
+        cached_at: float,
+    ):
+        self.token_hash = token_hash
+        self.user_id = user_id
+        self.username = username
+        self.expires_at = expires_at
+        self.cached_at = cached_at
+
+
+class SessionCache:
+    """
+    Thread-safe LRU of validated sessions plus the queue of expiry
+    extensions not yet written.
+    """
+
+    def __init__(
+        self,
+        max_size: int = SESSION_CACHE_SIZE,
+        ttl_seconds: float = SESSION_CACHE_TTL_SECONDS,
+        flush_seconds: float = SESSION_EXTEND_FLUSH_SECONDS,
+        workers: int = WEB_CONCURRENCY,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_size = max_size
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.flush_seconds = flush_seconds
+        self.backend: CacheBackend | None = None
+        # wall clock, so revocation times compare across processes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token_hash -> session
+        self._entries: OrderedDict[str, CachedSession] = OrderedDict()
+        # token_hash -> new expiry
+        self._pending: dict[str, datetime] = {}
+        self._last_flush = clock()
+        self.hits = 0
+        self.misses = 0
+        self.extensions_written = 0
+
+    @property
+    def enabled(self) -> bool:
+        """False when a logout in another worker couldn't reach us."""
+        return self.max_size > 0 and (
+            self.workers <= 1 or self.backend is not None
+        )
+
+    def get(self, token_hash: str) -> CachedSession | None:
+        """The cached session for token_hash, if any."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None or now - entry.cached_at >= self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token_hash)
+        if self.backend is not None:
+            revoked_at = self.backend.get(revoked_key(entry.user_id))
+            if revoked_at and float(revoked_at) >= entry.cached_at:
+                self._drop(entry.user_id)
+                self.misses += 1
+                return None
+        self.hits += 1
+        return entry
+
+    def set(
+        self,
+        token_hash: str,
+        user_id: int,
+        username: str,
+        expires_at: datetime,
+    ) -> CachedSession:
+        """Cache a validated session (unless disabled) and return it."""
+        entry = CachedSession(
+            token_hash, user_id, username, expires_at, self._clock()
+        )
+        if not self.enabled:
+            return entry
+        with self._lock:
+            self._entries[token_hash] = entry
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def extend(self, entry: CachedSession, expires_at: datetime) -> None:
+        """Move a session's expiry, written by the next flush."""
+        with self._lock:
+            entry.expires_at = expires_at
+            self._pending[entry.token_hash] = expires_at
+
+    def pending_expiry(self, token_hash: str) -> datetime | None:
+        """The queued, not yet written, expiry of the session."""
+        with self._lock:
+            return self._pending.get(token_hash)
+
+    def forget(self, user_id: int, token_hash: str | None = None) -> None:
+        """
+        Drop one session (token_hash) or all of the user's sessions here
+        and, via the backend, the user's sessions elsewhere.
+        """
+        if token_hash is None:
+            self._drop(user_id)
+        else:
+            with self._lock:
+                self._entries.pop(token_hash, None)
+                self._pending.pop(token_hash, None)
+        if self.backend is not None:
+            self.backend.set(
+                revoked_key(user_id), str(self._clock()), self.ttl_seconds
+            )
+
+    def _drop(self, user_id: int) -> None:
+        with self._lock:
+            for token_hash, entry in list(self._entries.items()):
+                if entry.user_id == user_id:
+                    del self._entries[token_hash]
+                    self._pending.pop(token_hash, None)
+
+    def flush_due(self) -> bool:
+        return bool(self._pending) and (
+            self._clock() - self._last_flush >= self.flush_seconds
+        )
+
+    def take_pending(self) -> list[dict]:
+        """Queued extensions as update parameters, emptying the queue."""
+        with self._lock:
+            pending = [
+                {"session_key": token_hash, "new_expires_at": expires}
+                for token_hash, expires in self._pending.items()
+            ]
+            self._pending.clear()
+            self._last_flush = self._clock()
+        self.extensions_written += len(pending)
+        return pending
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def revoked_key(user_id: int) -> str:
+    return f"session-revoked:{user_id}"
+
+
+session_cache = SessionCache()
+
+
+def use_backend(backend: CacheBackend | None) -> None:
+    """Share revocations through backend (None to stop sharing)."""
+    session_cache.backend = backend
+    session_cache.clear()
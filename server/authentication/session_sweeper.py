@@ -0,0 +1,176 @@
+"""
+Deletes expired rows from user_sessions and session_revocations.
+
+Sessions that are never logged out stay in the table after they expire,
+and so do signed token revocations once the tokens they revoke have
+expired. The sweeper wakes every SESSION_SWEEP_INTERVAL_SECONDS and
+deletes them SESSION_SWEEP_BATCH_SIZE at a time, committing and pausing between
+batches so a large backlog never holds locks or the connection for long.
+Running it in several processes is harmless; they just share the work.
+
+A session's sliding expiry may be moved in a worker's session_cache but
+not yet written. So the sweeper writes its own worker's queued
+extensions before deleting, every worker writes its queue at least every
+SESSION_EXTEND_FLUSH_SECONDS even when no request comes in to do it, and
+only rows expired for longer than twice that are deleted, by which time
+any other worker has written the extensions it had queued.
+"""
+
+import asyncio
+import contextvars
+import os
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from shared.database import AsyncSessionLocal
+from .auth_db import flush_session_extensions_async
+from .auth_models import DBSessionRevocation, DBUserSession
+from .session_cache import SESSION_EXTEND_FLUSH_SECONDS
+
+SESSION_SWEEP_INTERVAL_SECONDS = float(
+    os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300")
+)
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+SESSION_SWEEP_PAUSE_SECONDS = 0.1
+
+
+def delete_expired_sessions(
+    session: Session, batch_size: int, now: datetime
+) -> int:
+    """Delete up to batch_size sessions expired at now, return how many."""
+    expired = (
+        select(DBUserSession.token_hash)
+        .where(DBUserSession.expires_at <= now)
+        .limit(batch_size)
+    )
+    result = session.execute(
+        delete(DBUserSession).where(DBUserSession.token_hash.in_(expired))
+    )
+    session.commit()
+    return result.rowcount
+
+
+def delete_expired_revocations(
+    session: Session, batch_size: int, now: datetime
+) -> int:
+    """Delete up to batch_size revocations expired at now, return how many."""
+    expired = (
+        select(DBSessionRevocation.id)
+        .where(DBSessionRevocation.expires_at <= now)
+        .limit(batch_size)
+    )
+    result = session.execute(
+        delete(DBSessionRevocation).where(DBSessionRevocation.id.in_(expired))
+    )
+    session.commit()
+    return result.rowcount
+
+
+class SessionSweeper:
+    """
+    Background tasks deleting expired sessions and revocations and writing
+    queued expiry extensions. start() them, stop() them.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+        pause_seconds: float = SESSION_SWEEP_PAUSE_SECONDS,
+        flush_seconds: float = SESSION_EXTEND_FLUSH_SECONDS,
+        now: Callable[[], datetime] = datetime.now,
+    ):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.flush_seconds = flush_seconds
+        self._now = now
+        self._tasks: list[asyncio.Task] = []
+        self.deleted = 0
+        self.revocations_deleted = 0
+
+    def start(self) -> None:
+        if not self._tasks:
+            # a fresh context, so no request's deadline applies
+            self._tasks = [
+                asyncio.create_task(loop(), context=contextvars.Context())
+                for loop in (self._loop, self._flush_loop)
+            ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def flush(self) -> None:
+        """Write this worker's queued expiry extensions."""
+        async with self.session_factory() as session:
+            await flush_session_extensions_async(session)
+
+    async def sweep(self) -> int:
+        """
+        Delete every session and revocation expired now, batch by batch.
+        Returns how many sessions were deleted.
+        """
+        now = self._now()
+        await self.flush()
+        # other workers write theirs within flush_seconds
+        cutoff = now - timedelta(seconds=2 * self.flush_seconds)
+        deleted = await self._delete_batches(delete_expired_sessions, cutoff)
+        self.deleted += deleted
+        self.revocations_deleted += await self._delete_batches(
+            delete_expired_revocations, now
+        )
+        return deleted
+
+    async def _delete_batches(
+        self,
+        delete_batch: Callable[[Session, int, datetime], int],
+        now: datetime,
+    ) -> int:
+        deleted = 0
+        while True:
+            async with self.session_factory() as session:
+                count = await session.run_sync(
+                    delete_batch, self.batch_size, now
+                )
+            deleted += count
+            if count < self.batch_size:
+                return deleted
+            await asyncio.sleep(self.pause_seconds)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print("[WARN] Session sweep failed:", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                print("[WARN] Session extension flush failed:", e)
+
+
+_sweeper: SessionSweeper | None = None
+
+
+def start_session_sweeper() -> None:
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = SessionSweeper(AsyncSessionLocal)
+    _sweeper.start()
+
+
+async def stop_session_sweeper() -> None:
+    if _sweeper is not None:
+        await _sweeper.stop()
@@ -0,0 +1,282 @@
+"""
+Stateless signed session tokens.
+
+With AUTH_TOKENS=signed, login issues an HMAC-SHA256 signed token carrying
+the user id, username, a token id and the issue and expiry times instead
+of storing a session in user_sessions. require_auth checks the
+signature and expiry in memory, so an authenticated request needs no
+database round trip. Tokens slide like database sessions: require_auth
+re-signs one (same token id and issue time, new expiry) once less than
+SESSION_REFRESH_MINUTES are left.
+
+Because nothing is looked up, logging out can't simply forget a token.
+Logout records the token id, and a password or username change records
+"every token of this user issued until now", in the session_revocations
+table. Every process keeps the unexpired rows in memory (a
+RevocationList) and reloads them every TOKEN_REVOCATION_REFRESH_SECONDS;
+revocations made in a process apply there at once, the others pick them
+up on their next reload. A row is only loaded while a token it revokes
+could still be valid, so the list stays small, and the session sweeper
+deletes it after that.
+
+Unlike database sessions, logging in again does not end a user's other
+signed sessions.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .auth_models import DBSessionRevocation
+
+# "database" (sessions stored in user_sessions) or "signed"
+AUTH_TOKENS = os.getenv("AUTH_TOKENS", "database")
+SESSION_TOKEN_SECRET = os.getenv(
+    "SESSION_TOKEN_SECRET", os.getenv("SECRET_KEY", "your-secret-key-here")
+)
+TOKEN_REVOCATION_REFRESH_SECONDS = float(
+    os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "10")
+)
+
+
+def signed_tokens_enabled() -> bool:
+    return AUTH_TOKENS == "signed"
+
+
+class TokenClaims:
+    def __init__(
+        self,
+        user_id: int,
+        username: str,
+        token_id: str,
+        issued_at: float,
+        expires_at: float,
+    ):
+        self.user_id = user_id
+        self.username = username
+        self.token_id = token_id
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: str, secret: str) -> str:
+    digest = hmac.new(
+        secret.encode(), payload.encode(), hashlib.sha256
+    ).digest()
+    return _b64encode(digest)
+
+
+def sign_token(claims: TokenClaims, secret: str = SESSION_TOKEN_SECRET) -> str:
+    payload = _b64encode(
+        json.dumps(
+            {
+                "uid": claims.user_id,
+                "sub": claims.username,
+                "jti": claims.token_id,
+                "iat": claims.issued_at,
+                "exp": claims.expires_at,
+            },
+            separators=(",", ":"),
+        ).encode()
+    )
+    return f"{payload}.{_signature(payload, secret)}"
+
+
+def issue_token(
+    user_id: int,
+    username: str,
+    lifetime_seconds: float,
+    secret: str = SESSION_TOKEN_SECRET,
+) -> str:
+    now = time.time()
+    claims = TokenClaims(
+        user_id, username, uuid.uuid4().hex, now, now + lifetime_seconds
+    )
+    return sign_token(claims, secret)
+
+
+def verify_token(
+    token: str, now: float | None = None, secret: str = SESSION_TOKEN_SECRET
+) -> TokenClaims | None:
+    """
+    The token's claims if it is correctly signed and not expired, else
+    None. Revocation is checked separately (see RevocationList).
+    """
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(signature, _signature(payload, secret)):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+        claims = TokenClaims(
+            int(data["uid"]),
+            str(data["sub"]),
+            str(data["jti"]),
+            float(data["iat"]),
+            float(data["exp"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if (now if now is not None else time.time()) >= claims.expires_at:
+        return None
+    return claims
+
+
+def renewed_token(
+    claims: TokenClaims,
+    lifetime_seconds: float,
+    refresh_seconds: float,
+    secret: str = SESSION_TOKEN_SECRET,
+) -> str | None:
+    """
+    A re-signed token with a new expiry when less than refresh_seconds
+    are left, else None. Token id and issue time stay, so revocations
+    still match it.
+    """
+    now = time.time()
+    if claims.expires_at - now >= refresh_seconds:
+        return None
+    renewed = TokenClaims(
+        claims.user_id,
+        claims.username,
+        claims.token_id,
+        claims.issued_at,
+        now + lifetime_seconds,
+    )
+    return sign_token(renewed, secret)
+
+
+class RevocationList:
+    """In-memory copy of the unexpired session_revocations rows."""
+
+    def __init__(
+        self,
+        refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token_id -> when the entry can be dropped
+        self._token_ids: dict[str, float] = {}
+        # user_id -> (tokens issued up to this time are revoked, drop time)
+        self._users: dict[int, tuple[float, float]] = {}
+        self._loaded_at: float | None = None
+        self.refreshing = False
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.token_id in self._token_ids:
+            return True
+        revoked = self._users.get(claims.user_id)
+        return revoked is not None and claims.issued_at <= revoked[0]
+
+    def add(self, revocation: DBSessionRevocation) -> None:
+        with self._lock:
+            self._add(self._token_ids, self._users, revocation)
+
+    @staticmethod
+    def _add(token_ids, users, revocation: DBSessionRevocation) -> None:
+        expires_at = revocation.expires_at.timestamp()
+        if revocation.token_id is not None:
+            token_ids[revocation.token_id] = expires_at
+            return
+        revoked_at = revocation.revoked_at.timestamp()
+        previous = users.get(revocation.user_id)
+        if previous is None or previous[0] < revoked_at:
+            users[revocation.user_id] = (revoked_at, expires_at)
+
+    def refresh_due(self) -> bool:
+        return (
+            self._loaded_at is None
+            or self._clock() - self._loaded_at >= self.refresh_seconds
+        )
+
+    def refresh(self, session: Session) -> None:
+        """
+        Reload the unexpired revocations. Only reads; the session sweeper
+        deletes the expired rows.
+        """
+        now = datetime.fromtimestamp(self._clock())
+        rows = session.scalars(
+            select(DBSessionRevocation).where(
+                DBSessionRevocation.expires_at > now
+            )
+        ).all()
+        token_ids: dict[str, float] = {}
+        users: dict[int, tuple[float, float]] = {}
+        for row in rows:
+            self._add(token_ids, users, row)
+        with self._lock:
+            # keep revocations added here since the rows were read
+            for token_id, expires_at in self._token_ids.items():
+                token_ids.setdefault(token_id, expires_at)
+            for user_id, revoked in self._users.items():
+                if users.get(user_id, (0.0,))[0] < revoked[0]:
+                    users[user_id] = revoked
+            cutoff = now.timestamp()
+            self._token_ids = {
+                k: v for k, v in token_ids.items() if v > cutoff
+            }
+            self._users = {k: v for k, v in users.items() if v[1] > cutoff}
+            self._loaded_at = self._clock()
+
+    async def refresh_if_due(self, session: AsyncSession) -> None:
+        """Reload when due, once at a time; others use the current list."""
+        if self.refreshing or not self.refresh_due():
+            return
+        self.refreshing = True
+        try:
+            await session.run_sync(self.refresh)
+        finally:
+            self.refreshing = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._token_ids.clear()
+            self._users.clear()
+            self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._token_ids) + len(self._users)
+
+
+revocations = RevocationList()
+
+
+def revoke(
+    session: Session,
+    user_id: int,
+    lifetime_seconds: float,
+    token_id: str | None = None,
+) -> None:
+    """
+    Revoke one token (token_id) or, without token_id, every token of the
+    user issued until now. A token valid now expires within
+    lifetime_seconds, so that is how long the revocation is kept.
+    """
+    now = time.time()
+    revocation = DBSessionRevocation(
+        user_id=user_id,
+        token_id=token_id,
+        revoked_at=datetime.fromtimestamp(now),
+        expires_at=datetime.fromtimestamp(now + lifetime_seconds),
+    )
+    session.add(revocation)
+    session.commit()
+    revocations.add(revocation)
@@ -0,0 +1,150 @@
+"""
+Compare authenticated request throughput of the session token modes.
+
+Run from the server directory:
+
+    python -m data.benchmark_auth --requests 5000 --concurrency 20
+
+Serves a route protected by require_auth in process (no network) and
+drives it with logged-in clients, once per mode:
+
+- database: validate_session against user_sessions on every request
+- cached: validate_session with the session cache (the default)
+- signed: AUTH_TOKENS=signed, signature and revocation list only
+
+By default the users live in a temporary SQLite database; pass
+--database-url (e.g. postgresql+psycopg://...) to measure against a real
+server, where the database round trips cost more.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import uuid
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.middleware.sessions import SessionMiddleware
+from authentication import signed_tokens
+from authentication.auth_router import auth_router
+from authentication.auth_schemas import AuthenticatedUser
+from authentication.passwords import LoginThrottle, get_login_throttle
+from authentication.session_cache import session_cache
+from recipes.recipes_models import DBRecipe  # noqa: F401, registers it
+from shared.auth import require_auth
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import InMemoryRateLimitStore, RateLimit
+
+MODES = ["database", "cached", "signed"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def build_app(session_factory) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key="benchmark")
+    app.include_router(auth_router)
+
+    async def get_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_session
+    # every client signs up from the same address
+    unlimited = RateLimit(per_minute=1e9, burst=1e9)
+    throttle = LoginThrottle(InMemoryRateLimitStore(), unlimited, unlimited)
+    app.dependency_overrides[get_login_throttle] = lambda: throttle
+
+    @app.get("/whoami")
+    async def whoami(
+        auth_user: AuthenticatedUser = Depends(require_auth),
+    ) -> AuthenticatedUser:
+        return auth_user
+
+    return app
+
+
+async def run_mode(
+    app: FastAPI, mode: str, requests: int, concurrency: int
+) -> None:
+    signed_tokens.AUTH_TOKENS = "signed" if mode == "signed" else "database"
+    session_cache.max_size = 0 if mode == "database" else 10_000
+    session_cache.clear()
+    signed_tokens.revocations.clear()
+
+    transport = httpx.ASGITransport(app=app)
+    clients = [
+        httpx.AsyncClient(transport=transport, base_url="http://bench")
+        for _ in range(concurrency)
+    ]
+    latencies: list[float] = []
+    errors = 0
+    try:
+        for client in clients:
+            credentials = {
+                "username": f"bench-{uuid.uuid4().hex[:12]}",
+                "password": "benchmark",
+            }
+            response = await client.post("/api/auth/signup", json=credentials)
+            response.raise_for_status()
+
+        async def worker(client: httpx.AsyncClient, count: int) -> None:
+            nonlocal errors
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get("/whoami")
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        per_client = requests // concurrency
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(c, per_client) for c in clients))
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    print(
+        f"{mode:<9} {len(latencies) / elapsed:>9.0f} "
+        f"{statistics.median(latencies) * 1000:>8.2f} "
+        f"{percentile(latencies, 0.95) * 1000:>8.2f} {errors:>7}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite+aiosqlite:///{directory}/auth.db"
+        engine = create_async_engine(url)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        app = build_app(
+            async_sessionmaker(bind=engine, expire_on_commit=False)
+        )
+        print(f"{'mode':<9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} errors")
+        try:
+            for mode in args.modes:
+                await run_mode(app, mode, args.requests, args.concurrency)
+        finally:
+            await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark require_auth per session token mode."
+    )
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark the saved-recipe similarity index on synthetic recipes.
+
+Run from the server directory:
+
+    python -m data.benchmark_similarity --recipes 100000
+
+Builds the index from random ingredient sets (no database needed), then
+reports build time, query latency percentiles and the cost of incremental
+adds.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from recipes.similarity_index import SimilarityIndex
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the recipe similarity index."
+    )
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [f"ingredient {i}" for i in range(args.vocabulary)]
+
+    def ingredients() -> list[str]:
+        return rng.sample(vocabulary, rng.randint(4, 12))
+
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    index.load_recipes(
+        (recipe_id, ingredients(), rng.randint(5, 120))
+        for recipe_id in range(1, args.recipes + 1)
+    )
+    build = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(args.queries):
+        pantry = ingredients()
+        started = time.perf_counter()
+        index.search(pantry, max_time=rng.randint(10, 120), limit=3)
+        latencies.append(time.perf_counter() - started)
+
+    adds = []
+    for recipe_id in range(args.recipes + 1, args.recipes + 1001):
+        names = ingredients()
+        started = time.perf_counter()
+        index.add(recipe_id, names, 30)
+        adds.append(time.perf_counter() - started)
+
+    print(f"Recipes: {len(index)} ({index.dimensions} dimensions)")
+    print(f"Build: {build:.2f} s")
+    print(
+        f"Query: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+        f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, "
+        f"max {max(latencies) * 1000:.2f} ms"
+    )
+    print(
+        f"Incremental add: p50 {statistics.median(adds) * 1e6:.0f} us, "
+        f"max {max(adds) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS session_revocations;
+DROP TABLE IF EXISTS user_sessions;
+DROP TABLE IF EXISTS generation_jobs;
+DROP TABLE IF EXISTS generation_cache;
 DROP TABLE IF EXISTS recipe_photos;
 DROP TABLE IF EXISTS instructions;
 DROP TABLE IF EXISTS ingredients;
@@ -15,17 +20,33 @@ CREATE TABLE users (
     updated_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
 );
 
+CREATE TABLE user_sessions (
+    token_hash TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_user_sessions_user_id ON user_sessions (user_id);
+CREATE INDEX ix_user_sessions_expires_at ON user_sessions (expires_at);
+
 CREATE TABLE recipes (
     id SERIAL PRIMARY KEY ,
     user_id INTEGER NOT NULL,
     title VARCHAR(255) NOT NULL,
     image_url TEXT,
     total_time INTEGER NOT NULL,
+    version INTEGER DEFAULT 1 NOT NULL,
+    search_vector TSVECTOR,
     created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
     updated_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
+CREATE INDEX ix_recipes_search_vector ON recipes USING GIN (search_vector);
+CREATE INDEX ix_recipes_created_at_id ON recipes (created_at, id);
+CREATE INDEX ix_recipes_user_id_created_at_id ON recipes (user_id, created_at, id);
+
 CREATE TABLE ingredients (
     id SERIAL PRIMARY KEY,
     recipe_id INTEGER NOT NULL,
@@ -35,6 +56,8 @@ CREATE TABLE ingredients (
     FOREIGN KEY (recipe_id) REFERENCES recipes(id) ON DELETE CASCADE
 );
 
+CREATE INDEX ix_ingredients_recipe_id ON ingredients (recipe_id);
+
 CREATE TABLE instructions (
     id SERIAL PRIMARY KEY,
     recipe_id INTEGER NOT NULL,
@@ -45,11 +68,51 @@ CREATE TABLE instructions (
     FOREIGN KEY (recipe_id) REFERENCES recipes(id) ON DELETE CASCADE
 );
 
+CREATE INDEX ix_instructions_recipe_id_step_number ON instructions (recipe_id, step_number);
+
 CREATE TABLE recipe_photos (
     id SERIAL PRIMARY KEY,
     photo_name TEXT NOT NULL
 );
 
+CREATE TABLE generation_cache (
+    key TEXT PRIMARY KEY,
+    ingredients TEXT NOT NULL,
+    max_time INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    hits INTEGER DEFAULT 0 NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    last_used_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_generation_cache_last_used_at ON generation_cache (last_used_at);
+
+CREATE TABLE generation_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    ingredients TEXT NOT NULL,
+    max_time INTEGER NOT NULL,
+    attempts INTEGER DEFAULT 0 NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    run_after TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_generation_jobs_status ON generation_jobs (status);
+
+CREATE TABLE session_revocations (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    token_id TEXT,
+    revoked_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX ix_session_revocations_expires_at ON session_revocations (expires_at);
+
 INSERT INTO users (username, hashed_password, image_url) VALUES
     ('leiaquesada143', '$2b$12$ZIYIBOy3u66cLJNF5cMbquGPnY1ZE4x4Zb6NRFr0yIGCmA5VdB9q.', 'https://example.com/leia.jpg'),
     ('cosimaoctavia720', '$2b$12$1l1yZJlncGRg9t4h.MDfLe5KreHPNgwHtij8vsqiL3sW0LKuAu2SC', 'https://example.com/cosima.jpg'),
@@ -661,3 +724,14 @@ INSERT INTO instructions (recipe_id, step_text, step_number) VALUES
     (66, 'Add vegetables.', 2),
     (66, 'Add noodles and cook.', 3),
     (66, 'Season and serve.', 4);
+
+-- Full-text search documents for the seeded recipes (the API keeps them
+-- up to date afterwards)
+UPDATE recipes SET search_vector =
+    setweight(to_tsvector('english', title), 'A')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(name, ' ') FROM ingredients
+         WHERE ingredients.recipe_id = recipes.id), '')), 'B')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(step_text, ' ') FROM instructions
+         WHERE instructions.recipe_id = recipes.id), '')), 'C');
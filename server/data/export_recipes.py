@@ -0,0 +1,45 @@
+"""
+Export every recipe with its ingredients and instructions as NDJSON.
+
+Run from the server directory:
+
+    python -m data.export_recipes -o recipes.ndjson
+
+Writes to stdout when no output file is given.
+"""
+
+import argparse
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from shared.database import DATABASE_URL
+from recipes.recipes_db import iter_recipes_ndjson, EXPORT_BATCH_SIZE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export all recipes as NDJSON."
+    )
+    parser.add_argument("-o", "--output", help="file to write to")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Own engine without echo so SQL logging never ends up in the export
+    engine = create_engine(DATABASE_URL)
+    SessionLocal = sessionmaker(bind=engine)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    count = 0
+    try:
+        with SessionLocal() as session:
+            for line in iter_recipes_ndjson(session, args.batch_size):
+                out.write(line)
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {count} recipes.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Import recipes for a user from a JSON array or an NDJSON file.
+
+Each record needs the RecipeCreate fields (title, total_time, ingredients,
+instructions); extra fields are ignored, so the output of
+data.export_recipes can be imported again. Run from the server directory:
+
+    python -m data.import_recipes recipes.ndjson --user-id 1
+
+Every batch is inserted in a single transaction with add_recipes_bulk.
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Iterator
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from shared.database import DATABASE_URL
+from recipes.recipes_db import add_recipes_bulk, MAX_BULK_RECIPES
+from recipes.recipes_schemas import RecipeCreate
+
+# Import all models to register with SQLAlchemy metadata
+from authentication.auth_models import DBUser  # noqa: F401
+
+
+def read_recipes(path: str) -> Iterator[RecipeCreate]:
+    """Yield recipes from a JSON array file or an NDJSON file."""
+    with open(path) as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            for record in json.load(f):
+                yield RecipeCreate.model_validate(record)
+            return
+        for line in f:
+            if line.strip():
+                yield RecipeCreate.model_validate_json(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk import recipes from JSON or NDJSON."
+    )
+    parser.add_argument("path", help="JSON array or NDJSON file")
+    parser.add_argument(
+        "--user-id", type=int, required=True, help="owner of the recipes"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help=f"recipes per transaction (max {MAX_BULK_RECIPES})",
+    )
+    args = parser.parse_args()
+    batch_size = max(1, min(args.batch_size, MAX_BULK_RECIPES))
+
+    engine = create_engine(DATABASE_URL)
+    SessionLocal = sessionmaker(bind=engine)
+
+    count = 0
+    batch: list[RecipeCreate] = []
+    with SessionLocal() as session:
+        for recipe in read_recipes(args.path):
+            batch.append(recipe)
+            if len(batch) == batch_size:
+                count += len(add_recipes_bulk(session, batch, args.user_id))
+                batch = []
+        if batch:
+            count += len(add_recipes_bulk(session, batch, args.user_id))
+    print(f"Imported {count} recipes.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Drive mixed concurrent traffic at a running API and report throughput.
+
+Start the server, then run from the server directory:
+
+    python -m data.load_test --base-url http://localhost:8000 \
+        --concurrency 50 --duration 30
+
+Each worker signs up its own user and then loops over a mix of recipe
+list, recipe detail, recipe create, /me and login requests. Run it
+against both the sync and async code paths (e.g. before and after a
+change) to compare requests per second and latency percentiles.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+import httpx
+
+# relative weights of each request type in the mix
+TRAFFIC_MIX = {
+    "list": 40,
+    "get": 30,
+    "create": 10,
+    "me": 15,
+    "login": 5,
+}
+
+
+def new_recipe() -> dict:
+    return {
+        "title": f"Load test {uuid.uuid4().hex[:8]}",
+        "total_time": random.randint(5, 90),
+        "ingredients": [{"name": "Salt"}, {"name": "Water"}],
+        "instructions": [{"step_text": "Boil the water", "step_number": 1}],
+    }
+
+
+async def sign_up(client: httpx.AsyncClient) -> dict:
+    credentials = {
+        "username": f"load-{uuid.uuid4().hex[:12]}",
+        "password": "load-test",
+    }
+    response = await client.post("/api/auth/signup", json=credentials)
+    response.raise_for_status()
+    return credentials
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    credentials: dict,
+    deadline: float,
+    latencies: dict[str, list[float]],
+    errors: dict[str, int],
+) -> None:
+    recipe_ids: list[int] = []
+    kinds = list(TRAFFIC_MIX)
+    weights = list(TRAFFIC_MIX.values())
+    while time.monotonic() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        if kind == "get" and not recipe_ids:
+            kind = "list"
+        started = time.perf_counter()
+        if kind == "list":
+            response = await client.get("/api/recipes")
+            if response.status_code == 200:
+                recipe_ids.extend(
+                    item["id"] for item in response.json()["items"][:5]
+                )
+                del recipe_ids[:-50]
+        elif kind == "get":
+            recipe_id = random.choice(recipe_ids)
+            response = await client.get(f"/api/recipes/{recipe_id}")
+        elif kind == "create":
+            response = await client.post("/api/recipes", json=new_recipe())
+            if response.status_code == 200:
+                recipe_ids.append(response.json()["id"])
+        elif kind == "me":
+            response = await client.get("/api/auth/me")
+        else:
+            response = await client.post("/api/auth/login", json=credentials)
+        latencies.setdefault(kind, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[kind] = errors.get(kind, 0) + 1
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def report(
+    latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float
+) -> None:
+    everything = [value for values in latencies.values() for value in values]
+    print(
+        f"{'request':<8} {'count':>7} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for kind in [*TRAFFIC_MIX, "total"]:
+        values = everything if kind == "total" else latencies.get(kind, [])
+        failed = (
+            sum(errors.values()) if kind == "total" else errors.get(kind, 0)
+        )
+        print(
+            f"{kind:<8} {len(values):>7} {failed:>7} "
+            f"{percentile(values, 50) * 1000:>8.1f} "
+            f"{percentile(values, 95) * 1000:>8.1f}"
+        )
+    print(f"Throughput: {len(everything) / elapsed:.1f} requests/s")
+
+
+async def run(base_url: str, concurrency: int, duration: float) -> None:
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency)
+    # one client per worker so each keeps its own session cookie
+    clients = [
+        httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits)
+        for _ in range(concurrency)
+    ]
+    try:
+        # sign every worker up first so only the mixed traffic is timed
+        logins = await asyncio.gather(*(sign_up(c) for c in clients))
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                worker(client, credentials, deadline, latencies, errors)
+                for client, credentials in zip(clients, logins)
+            )
+        )
+    finally:
+        for client in clients:
+            await client.aclose()
+    report(latencies, errors, time.monotonic() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mixed-traffic load test against a running API."
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument(
+        "-d", "--duration", type=float, default=30, help="seconds"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
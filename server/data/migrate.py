@@ -0,0 +1,22 @@
+"""
+Apply pending schema migrations to DATABASE_URL.
+
+Run from the server directory:
+
+    python -m data.migrate
+"""
+
+from sqlalchemy import create_engine
+from shared.database import DATABASE_URL
+from shared.migrations import run_migrations
+
+
+def main() -> None:
+    engine = create_engine(DATABASE_URL)
+    applied = run_migrations(engine)
+    if not applied:
+        print("Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
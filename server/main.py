@@ -1,14 +1,25 @@
 # import early to ensure environment vars are loaded first
 import os
+from contextlib import asynccontextmanager
 
 # from dotenv import load_dotenv
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from authentication.auth_db import flush_session_extensions_async
 from authentication.auth_router import auth_router
+from authentication.session_cache import session_cache
+from authentication.session_sweeper import (
+    start_session_sweeper,
+    stop_session_sweeper,
+)
 from recipes.recipes_router import recipes_router, ai_router
+from recipes.ai_jobs import stop_generation_jobs
 from photos.photos_router import photos_router
+from shared.database import AsyncSessionLocal, engine
+from shared.migrations import run_migrations
+from shared.resilience import DeadlineMiddleware, breaker_stats
 
 # from rich import print
 from rich import print
@@ -18,7 +29,30 @@ load_dotenv()
 
 RENDER = os.getenv("RENDER")
 
-app = FastAPI(redirect_slashes=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring the schema up to date before serving (see shared/migrations.py)
+    if os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() != "false":
+        run_migrations(engine)
+    if session_cache.workers > 1 and session_cache.backend is None:
+        print(
+            "[WARN] Session cache disabled: WEB_CONCURRENCY > 1 without a "
+            "shared backend"
+        )
+    start_session_sweeper()
+    yield
+    await stop_generation_jobs()
+    await stop_session_sweeper()
+    # queued session extensions only live in this process
+    try:
+        async with AsyncSessionLocal() as session:
+            await flush_session_extensions_async(session)
+    except Exception as e:
+        print("[WARN] Flushing session extensions failed:", e)
+
+
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 
 RENDER = os.getenv("RENDER")
 # TODO, add production-ready origins,
@@ -54,7 +88,16 @@ app.add_middleware(
     https_only=True if RENDER is not None else False,
 )
 
+# outermost, so the deadline covers the whole request
+app.add_middleware(DeadlineMiddleware)
+
 app.include_router(auth_router)
 app.include_router(recipes_router)
 app.include_router(ai_router)
 app.include_router(photos_router)
+
+
+# Circuit breaker state of the upstream services, for monitoring
+@app.get("/api/upstreams")
+def upstreams() -> dict:
+    return breaker_stats()
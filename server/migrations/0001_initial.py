@@ -0,0 +1,114 @@
+"""
+Baseline schema: users, recipes, ingredients, instructions, photos and the
+full-text search storage.
+
+Tables are created with checkfirst, so a database seeded from
+data/chefgpt.sql is adopted as-is. The tables are spelled out here instead
+of using the ORM models so this migration keeps meaning the same schema as
+the models change.
+"""
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    text,
+)
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String, nullable=False, unique=True),
+    Column("hashed_password", String, nullable=False),
+    Column("image_url", String, nullable=True),
+    Column("session_token", String, nullable=True),
+    Column("session_expires_at", DateTime(), nullable=True),
+    Column("created_at", DateTime(), nullable=False),
+    Column("updated_at", DateTime(), nullable=False),
+)
+
+Table(
+    "recipes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("image_url", String, nullable=True),
+    Column("total_time", Integer, nullable=False),
+    Column("created_at", DateTime(), nullable=False),
+    Column("updated_at", DateTime(), nullable=False),
+    Column("version", Integer, nullable=False, server_default="1"),
+)
+
+Table(
+    "ingredients",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("recipe_id", Integer, ForeignKey("recipes.id"), nullable=False),
+    Column("name", String, nullable=False),
+    Column("created_at", DateTime(), nullable=False),
+    Column("updated_at", DateTime(), nullable=False),
+)
+
+Table(
+    "instructions",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("recipe_id", Integer, ForeignKey("recipes.id"), nullable=False),
+    Column("step_text", String, nullable=False),
+    Column("step_number", Integer, nullable=False),
+    Column("created_at", DateTime(), nullable=False),
+    Column("updated_at", DateTime(), nullable=False),
+)
+
+Table(
+    "photos",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("photo_name", String, nullable=False),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
+    # checkfirst leaves an existing recipes table alone, and databases
+    # seeded before optimistic locking have no version column
+    columns = {
+        column["name"] for column in inspect(connection).get_columns("recipes")
+    }
+    if "version" not in columns:
+        connection.execute(
+            text(
+                "ALTER TABLE recipes "
+                "ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+        )
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text(
+                "ALTER TABLE recipes "
+                "ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector "
+                "ON recipes USING GIN (search_vector)"
+            )
+        )
+    else:
+        connection.execute(
+            text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts "
+                "USING fts5(title, ingredients, steps)"
+            )
+        )
@@ -0,0 +1,25 @@
+"""
+Indexes for the hot queries: children by recipe (instructions already in
+step order), keyset pagination of recipes globally and per user, and
+session validation by (username, session_token).
+"""
+
+from sqlalchemy import Connection, text
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_ingredients_recipe_id "
+    "ON ingredients (recipe_id)",
+    "CREATE INDEX IF NOT EXISTS ix_instructions_recipe_id_step_number "
+    "ON instructions (recipe_id, step_number)",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_created_at_id "
+    "ON recipes (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_user_id_created_at_id "
+    "ON recipes (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_session_token "
+    "ON users (username, session_token)",
+]
+
+
+def upgrade(connection: Connection) -> None:
+    for statement in INDEXES:
+        connection.execute(text(statement))
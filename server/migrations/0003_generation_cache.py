@@ -0,0 +1,34 @@
+"""
+Durable tier of the AI generation cache.
+"""
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+
+metadata = MetaData()
+
+Table(
+    "generation_cache",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("ingredients", String, nullable=False),
+    Column("max_time", Integer, nullable=False),
+    Column("response", String, nullable=False),
+    Column("hits", Integer, nullable=False, server_default="0"),
+    Column("created_at", DateTime(), nullable=False),
+    Column("expires_at", DateTime(), nullable=False),
+    Column("last_used_at", DateTime(), nullable=False),
+    Index("ix_generation_cache_last_used_at", "last_used_at"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,36 @@
+"""
+State of asynchronous recipe generation jobs.
+"""
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+
+metadata = MetaData()
+
+Table(
+    "generation_jobs",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("status", String, nullable=False),
+    Column("ingredients", String, nullable=False),
+    Column("max_time", Integer, nullable=False),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("error", String, nullable=True),
+    Column("result", String, nullable=True),
+    Column("created_at", DateTime(), nullable=False),
+    Column("updated_at", DateTime(), nullable=False),
+    Column("run_after", DateTime(), nullable=False),
+    Index("ix_generation_jobs_status", "status"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,80 @@
+"""
+Sessions move from the single users.session_token column to the
+user_sessions table, keyed by the SHA-256 of the token, so a user can be
+logged in on several devices and validation is a primary key lookup.
+
+Live sessions are copied over, so nobody is logged out by the upgrade.
+The old columns are left in place (unused) for code still running against
+them during a deploy.
+"""
+
+import hashlib
+from datetime import datetime
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    insert,
+    select,
+    text,
+)
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("session_token", String, nullable=True),
+    Column("session_expires_at", DateTime(), nullable=True),
+)
+
+user_sessions = Table(
+    "user_sessions",
+    metadata,
+    Column("token_hash", String, primary_key=True),
+    Column(
+        "user_id",
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("created_at", DateTime(), nullable=False),
+    Column("expires_at", DateTime(), nullable=False),
+    Index("ix_user_sessions_user_id", "user_id"),
+    Index("ix_user_sessions_expires_at", "expires_at"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, tables=[user_sessions], checkfirst=True)
+    now = datetime.now()
+    live = connection.execute(
+        select(
+            users.c.id, users.c.session_token, users.c.session_expires_at
+        ).where(
+            users.c.session_token.is_not(None),
+            users.c.session_expires_at > now,
+        )
+    ).all()
+    rows = [
+        {
+            "token_hash": hashlib.sha256(token.encode()).hexdigest(),
+            "user_id": user_id,
+            "created_at": now,
+            "expires_at": expires_at,
+        }
+        for user_id, token, expires_at in live
+    ]
+    if rows:
+        connection.execute(insert(user_sessions), rows)
+    # validation no longer looks users up by token
+    connection.execute(
+        text("DROP INDEX IF EXISTS ix_users_username_session_token")
+    )
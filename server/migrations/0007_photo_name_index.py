@@ -0,0 +1,15 @@
+"""
+Index photos by object name, which confirming a direct upload looks up.
+Unique, so concurrent confirmations of one upload record it once.
+"""
+
+from sqlalchemy import Connection, text
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_photos_photo_name "
+            "ON photos (photo_name)"
+        )
+    )
@@ -0,0 +1,61 @@
+"""
+Build the full-text search documents of recipes that existed before search
+did. Only recipes written since then were indexed by recipes_db, so search
+missed the existing catalog.
+
+The statements are copied from recipes_search as they were when this was
+written, so later changes there don't change what this migration does.
+"""
+
+from sqlalchemy import Connection, bindparam, text
+
+BATCH_SIZE = 500
+
+PG_REINDEX = text("""
+UPDATE recipes SET search_vector =
+    setweight(to_tsvector('english', title), 'A')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(name, ' ') FROM ingredients
+         WHERE ingredients.recipe_id = recipes.id), '')), 'B')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(step_text, ' ') FROM instructions
+         WHERE instructions.recipe_id = recipes.id), '')), 'C')
+WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+SQLITE_DELETE = text("DELETE FROM recipes_fts WHERE rowid IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+
+SQLITE_INSERT = text("""
+INSERT INTO recipes_fts (rowid, title, ingredients, steps)
+SELECT id, title,
+    coalesce((SELECT group_concat(name, ' ') FROM ingredients
+              WHERE ingredients.recipe_id = recipes.id), ''),
+    coalesce((SELECT group_concat(step_text, ' ') FROM instructions
+              WHERE instructions.recipe_id = recipes.id), '')
+FROM recipes WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        statements = [PG_REINDEX]
+    else:
+        statements = [SQLITE_DELETE, SQLITE_INSERT]
+    last_id = 0
+    while True:
+        ids = list(
+            connection.scalars(
+                text(
+                    "SELECT id FROM recipes WHERE id > :last_id "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+        )
+        if not ids:
+            break
+        for statement in statements:
+            connection.execute(statement, {"ids": ids})
+        last_id = ids[-1]
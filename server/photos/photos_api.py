@@ -1,14 +1,29 @@
-"""Image Upload Routines"""
+"""Image Upload Routines
+
+S3 calls have connect/read timeouts, are not started once the request's
+deadline has passed, and go through the "s3" circuit breaker (see
+shared/resilience).
+
+Besides upload_photo, which receives the image and sends it on, clients
+can upload straight to the bucket: create_presigned_upload returns a
+presigned POST whose policy only accepts an allowed image type of at most
+MAX_IMAGE_SIZE_BYTES under a fresh key, and confirm_upload then checks the
+object with a HEAD request before the photo is recorded. The API never
+handles the image bytes.
+"""
 
 from __future__ import annotations
 
+import os
+
 # for unique filename for every image file
 import uuid
 from typing import TYPE_CHECKING
 
 # Boto 3 is the library that you can use to talk to S3 compatible APIs
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 
 from shared.database import (
     AWS_ACCESS_KEY,
@@ -17,10 +32,19 @@ from shared.database import (
     BUCKET_NAME,
     REGION_NAME,
 )
+from shared.resilience import circuit_breaker, time_left
 
 if TYPE_CHECKING:
     from fastapi import UploadFile
 
+S3_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("S3_CONNECT_TIMEOUT_SECONDS", "3")
+)
+S3_READ_TIMEOUT_SECONDS = float(os.getenv("S3_READ_TIMEOUT_SECONDS", "10"))
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = int(
+    os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "300")
+)
+
 # Create the boto3 client
 s3 = boto3.client(
     "s3",
@@ -28,7 +52,14 @@ s3 = boto3.client(
     aws_access_key_id=AWS_ACCESS_KEY,
     aws_secret_access_key=AWS_SECRET_KEY,
     region_name=REGION_NAME,
+    config=Config(
+        connect_timeout=S3_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=S3_READ_TIMEOUT_SECONDS,
+        retries={"max_attempts": 2, "mode": "standard"},
+    ),
 )
+# timeouts are BotoCoreErrors, so they count as failures too
+s3_breaker = circuit_breaker("s3", failure_types=(BotoCoreError, ClientError))
 
 # Constants for validation
 MAX_IMAGE_SIZE_BYTES = 5 * 1024 * 1024  # 5 MB max size
@@ -78,7 +109,8 @@ def validate_image(image: UploadFile) -> bool:
 
 
 # AWS S3 gives pre-signed URLs to items in the bucket. These expire
-# so you always need to go get new ones
+# so you always need to go get new ones. Presigning is done locally, no
+# request to S3 is made.
 def get_url(photo_name: str) -> str | None:
     """Return the full URL to a photo."""
     try:
@@ -102,16 +134,87 @@ def upload_photo(image: UploadFile) -> str | None:
     # Plus a uuid
     # Keeps users from overwriting each other's files
     photo_name = f"{uuid.uuid4()}_{image.filename}"
+    # raises DeadlineExceeded when there is no time left to try
+    time_left(S3_READ_TIMEOUT_SECONDS)
     try:
-        s3.upload_fileobj(
-            image.file,
-            BUCKET_NAME,
-            photo_name,
-            ExtraArgs={
-                "ContentType": image.content_type,
-            },
+        with s3_breaker.guard():
+            s3.upload_fileobj(
+                image.file,
+                BUCKET_NAME,
+                photo_name,
+                ExtraArgs={
+                    "ContentType": image.content_type,
+                },
+            )
+    except (BotoCoreError, ClientError) as e:
+        print(e)
+        return None
+    return photo_name
+
+
+def create_presigned_upload(filename: str, content_type: str) -> dict | None:
+    """
+    Return the photo name plus the url and form fields of a presigned POST
+    for uploading it, or None if content_type isn't an allowed image type.
+    """
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        print(f"Image validation failed: Unsupported type: {content_type}")
+        return None
+    # only the last path component, so the key stays a plain name
+    photo_name = f"{uuid.uuid4()}_{os.path.basename(filename)}"
+    try:
+        post = s3.generate_presigned_post(
+            Bucket=BUCKET_NAME,
+            Key=photo_name,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, MAX_IMAGE_SIZE_BYTES],
+            ],
+            ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_SECONDS,
         )
     except ClientError as e:
         print(e)
         return None
-    return photo_name
+    return {
+        "photo_name": photo_name,
+        "url": post["url"],
+        "fields": post["fields"],
+        "expires_in": PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+    }
+
+
+def confirm_upload(photo_name: str) -> bool:
+    """
+    Check that photo_name was uploaded and is an allowed image within the
+    size limit. An object that isn't is deleted.
+    """
+    time_left(S3_READ_TIMEOUT_SECONDS)
+    try:
+        with s3_breaker.guard():
+            try:
+                head = s3.head_object(Bucket=BUCKET_NAME, Key=photo_name)
+            except ClientError as e:
+                # not uploaded (yet): the client's mistake, not S3 failing
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                    raise
+                print(f"Photo upload not found: {photo_name}")
+                return False
+    except (BotoCoreError, ClientError) as e:
+        print(e)
+        return False
+    size = head["ContentLength"]
+    content_type = head.get("ContentType")
+    allowed_size = 0 < size <= MAX_IMAGE_SIZE_BYTES
+    if content_type in ALLOWED_IMAGE_TYPES and allowed_size:
+        return True
+    print(
+        f"Image validation failed: {photo_name} is {content_type}, "
+        f"{size} bytes"
+    )
+    try:
+        with s3_breaker.guard():
+            s3.delete_object(Bucket=BUCKET_NAME, Key=photo_name)
+    except (BotoCoreError, ClientError) as e:
+        print(e)
+    return False
@@ -1,18 +1,11 @@
 """Database routines."""
 
 from collections.abc import Sequence
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 from .photos_models import DBPhoto
-from shared.base_model import Base
 
-from shared.database import DATABASE_URL
-
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
-
-# Create all tables defined in the models
-Base.metadata.create_all(engine)
+# the shared engine: statement timeout, request deadline and breaker apply
+from shared.database import SessionLocal
 
 
 def get_photos() -> Sequence[DBPhoto]:
@@ -23,6 +16,13 @@ def get_photos() -> Sequence[DBPhoto]:
     return photos
 
 
+def get_photo_by_name(photo_name: str) -> DBPhoto | None:
+    """Retrieve a photo by its object name, or None."""
+    with SessionLocal() as session:
+        stmt = select(DBPhoto).where(DBPhoto.photo_name == photo_name)
+        return session.scalars(stmt).first()
+
+
 def add_photo(photo_name: str) -> DBPhoto:
     """Add a single photo's name to the database."""
     with SessionLocal() as session:
@@ -9,4 +9,4 @@ class DBPhoto(Base):
 
     __tablename__ = "photos"
     id = Column(Integer, primary_key=True, index=True)
-    photo_name = Column(String, nullable=False)
+    photo_name = Column(String, nullable=False, unique=True, index=True)
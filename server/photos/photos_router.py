@@ -1,10 +1,22 @@
 from fastapi import APIRouter, HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
 from .photos_db import (
     get_photos,
+    get_photo_by_name,
     add_photo,
 )
-from .photos_schemas import PhotoResponse
-from .photos_api import upload_photo, get_url
+from .photos_schemas import (
+    PhotoResponse,
+    PhotoUploadConfirm,
+    PhotoUploadRequest,
+    PhotoUploadResponse,
+)
+from .photos_api import (
+    confirm_upload,
+    create_presigned_upload,
+    upload_photo,
+    get_url,
+)
 
 photos_router = APIRouter(prefix="/api/photos", tags=["photos"])
 
@@ -31,3 +43,37 @@ def upload_photo_endpoint(photo: UploadFile) -> PhotoResponse:
     return PhotoResponse.model_validate(
         {"id": db_photo.id, "photo_url": get_url(str(db_photo.photo_name))}
     )
+
+
+@photos_router.post("/uploads", response_model=PhotoUploadResponse)
+def create_upload_endpoint(request: PhotoUploadRequest) -> PhotoUploadResponse:
+    """
+    Start a direct upload: returns a presigned POST that lets the client
+    send the image straight to the bucket. Confirm it afterwards.
+    """
+    upload = create_presigned_upload(request.filename, request.content_type)
+    if upload is None:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    return PhotoUploadResponse.model_validate(upload)
+
+
+@photos_router.post("/uploads/confirm", response_model=PhotoResponse)
+def confirm_upload_endpoint(request: PhotoUploadConfirm) -> PhotoResponse:
+    """
+    Record a photo uploaded with a presigned POST once the bucket has it.
+    Confirming the same photo again returns the same record.
+    """
+    db_photo = get_photo_by_name(request.photo_name)
+    if db_photo is None:
+        if not confirm_upload(request.photo_name):
+            raise HTTPException(
+                status_code=400, detail="Photo upload not found or invalid"
+            )
+        try:
+            db_photo = add_photo(request.photo_name)
+        except IntegrityError:
+            # another request confirmed it since we looked
+            db_photo = get_photo_by_name(request.photo_name)
+    return PhotoResponse.model_validate(
+        {"id": db_photo.id, "photo_url": get_url(str(db_photo.photo_name))}
+    )
@@ -6,3 +6,29 @@ class PhotoResponse(BaseSchema):
 
     id: int
     photo_url: str | None = None
+
+
+class PhotoUploadRequest(BaseSchema):
+    """The image a client wants to upload straight to the bucket."""
+
+    filename: str
+    content_type: str
+
+
+class PhotoUploadResponse(BaseSchema):
+    """
+    Where and how to upload: POST fields plus the file (as the last
+    field, named "file") as multipart/form-data to url, then confirm
+    photo_name.
+    """
+
+    photo_name: str
+    url: str
+    fields: dict[str, str]
+    expires_in: int
+
+
+class PhotoUploadConfirm(BaseSchema):
+    """An uploaded photo to record."""
+
+    photo_name: str
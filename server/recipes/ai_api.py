@@ -1,16 +1,92 @@
+"""
+Recipe generation with an LLM (Gemini by default, see ai_providers).
+
+Calls go through RecipeGenerator, which awaits the provider on the event
+loop, caps how many calls are in flight with a semaphore and coalesces
+identical requests: while a call for the same normalized ingredients and
+max_time is running, later callers wait for its result instead of
+starting another one.
+
+Answers are cached by the same canonical request (see ai_cache), so a
+pantry someone already asked about never reaches the model again while the
+entry lives.
+
+RecipeGenerator.stream is the streaming variant: it reads the model's
+output as it is produced and yields each recipe once its JSON object is
+complete (see ai_stream).
+
+Every provider call is timed and measured, and answers that cannot be
+parsed are counted (see ai_providers.LLMMetrics and GET
+/api/generate/stats).
+
+Model calls time out at LLM_TIMEOUT_SECONDS or the request's deadline and
+go through the "llm" circuit breaker, so a slow or failing provider is
+answered with 504/503 instead of piling up requests (see
+shared/resilience).
+
+Requests to the generation endpoints are admitted by the limiter from
+get_generation_limiter: a token bucket per logged-in user (per client IP
+for anonymous callers) and a cap on requests in flight, see
+shared/rate_limit.
+"""
+
+import asyncio
 import os
-import dotenv
-import google.genai as genai
 import json
+from collections.abc import AsyncIterator
+from fastapi import Request
+from pydantic import ValidationError
+from recipes.ingredient_index import normalize_ingredient
+from shared.database import AsyncSessionLocal
+from shared.rate_limit import (
+    AdmissionController,
+    InMemoryRateLimitStore,
+    RateLimit,
+)
+from shared.resilience import CircuitBreaker, circuit_breaker
+from .ai_cache import GenerationCache
+from .ai_schemas import GenerateRecipesResponse, GeneratedRecipe
+from .ai_providers import (
+    GuardedLLMClient,
+    InstrumentedLLMClient,
+    LLMClient,
+    LLMMetrics,
+    create_llm_client,
+)
+from .ai_stream import RecipeStreamParser
 
-dotenv.load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# LLM calls allowed in flight at once per worker, the rest wait
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# max_time is rounded down to one of these (in minutes) before asking the
+# model, so e.g. 35 and 40 share an answer that fits both
+MAX_TIME_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240)
+# /api/generate answers with saved recipes instead of calling the model
+# when at least SIMILAR_RECIPES_COUNT of them are this similar to the pantry
+SIMILAR_RECIPES_COUNT = int(os.getenv("SIMILAR_RECIPES_COUNT", "3"))
+SIMILAR_RECIPES_MIN_SCORE = float(
+    os.getenv("SIMILAR_RECIPES_MIN_SCORE", "0.6")
+)
+# most pantries one /api/generate/batch request may ask about
+MAX_GENERATE_BATCH = int(os.getenv("MAX_GENERATE_BATCH", "20"))
+# token buckets for the generation endpoints, a batch costs one token per
+# distinct pantry
+GENERATE_USER_RATE = RateLimit(
+    per_minute=float(os.getenv("GENERATE_USER_PER_MINUTE", "20")),
+    burst=float(os.getenv("GENERATE_USER_BURST", "20")),
+)
+GENERATE_IP_RATE = RateLimit(
+    per_minute=float(os.getenv("GENERATE_IP_PER_MINUTE", "10")),
+    burst=float(os.getenv("GENERATE_IP_BURST", "5")),
+)
+# generation requests being served at once per worker before answering 503
+GENERATE_MAX_IN_FLIGHT = int(
+    os.getenv("GENERATE_MAX_IN_FLIGHT", str(4 * LLM_MAX_CONCURRENCY))
+)
 
 
-def generate_recipes_with_gemini(ingredients, max_time):
+def build_prompt(ingredients, max_time) -> str:
     ingredients_str = ", ".join(ingredients)
-    prompt = f"""
+    return f"""
 You are a meal planning assistant.
 
 User ingredients:
@@ -39,11 +115,10 @@ Return JSON in this EXACT format:
     }}
 ]
 """
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        contents=prompt,
-    )
-    raw_text = (response.text or "").strip()
+
+
+def parse_recipes(raw_text: str) -> list[dict]:
+    raw_text = (raw_text or "").strip()
     if not raw_text:
         raise ValueError("LLM returned empty response")
     #  SAFETY: strip markdown if Gemini adds it anyway
@@ -55,3 +130,190 @@ Return JSON in this EXACT format:
     except json.JSONDecodeError:
         raise ValueError(f"LLM did not return valid JSON:\n{raw_text}")
     return recipes_data
+
+
+def time_bucket(max_time: int) -> int:
+    """Largest bucket not above max_time (max_time itself if below all)."""
+    fitting = [bucket for bucket in MAX_TIME_BUCKETS if bucket <= max_time]
+    return fitting[-1] if fitting else max_time
+
+
+def request_key(ingredients, max_time) -> tuple:
+    """
+    Requests with the same key get the same answer. Pass the bucketed
+    max_time.
+    """
+    names = {normalize_ingredient(name) for name in ingredients}
+    names.discard("")
+    return (tuple(sorted(names)), max_time)
+
+
+class RecipeGenerator:
+    """
+    Caching, bounded, deduplicating front for an LLMClient. Use one per
+    event loop.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        cache: GenerationCache | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.metrics = LLMMetrics()
+        if breaker is None:
+            breaker = CircuitBreaker("llm")
+        self.breaker = breaker
+        self.client = GuardedLLMClient(
+            InstrumentedLLMClient(client, self.metrics), self.breaker
+        )
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: dict[tuple, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    async def generate(self, ingredients, max_time) -> GenerateRecipesResponse:
+        """
+        Generate recipes for the ingredients. Served from the cache when
+        possible, otherwise sharing the upstream call with any identical
+        request already in flight.
+        """
+        max_time = time_bucket(max_time)
+        key = request_key(ingredients, max_time)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached.model_copy(update={"cached": True})
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._generate(key, ingredients, max_time)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # shield: a caller that goes away must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: tuple, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def _generate(
+        self, key: tuple, ingredients, max_time
+    ) -> GenerateRecipesResponse:
+        async with self._semaphore:
+            self.upstream_calls += 1
+            raw_text = await self.client.generate(
+                build_prompt(ingredients, max_time)
+            )
+        # validated before caching, so a malformed answer is never stored
+        try:
+            response = GenerateRecipesResponse(recipes=parse_recipes(raw_text))
+        except ValueError:
+            self.metrics.parse_failures += 1
+            raise
+        if self.cache is not None:
+            await self.cache.set(key, response)
+        return response
+
+    async def stream(
+        self, ingredients, max_time
+    ) -> AsyncIterator[tuple[GeneratedRecipe, bool]]:
+        """
+        Yield (recipe, cached) for each recipe as soon as the model has
+        finished writing it. Objects that fail validation are skipped.
+        Cached answers are yielded at once. Streams are not coalesced,
+        each one holds a concurrency slot until it ends.
+        """
+        max_time = time_bucket(max_time)
+        key = request_key(ingredients, max_time)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                for recipe in cached.recipes:
+                    yield recipe, True
+                return
+        parser = RecipeStreamParser()
+        recipes = []
+        skipped = 0
+        async with self._semaphore:
+            self.upstream_calls += 1
+            prompt = build_prompt(ingredients, max_time)
+            async for chunk in self.client.stream(prompt):
+                try:
+                    completed = parser.feed(chunk)
+                except ValueError:
+                    self.metrics.parse_failures += 1
+                    raise
+                for data in completed:
+                    try:
+                        recipe = GeneratedRecipe.model_validate(data)
+                    except ValidationError as e:
+                        skipped += 1
+                        self.metrics.invalid_recipes += 1
+                        print("[WARN] Skipping invalid generated recipe:", e)
+                        continue
+                    recipes.append(recipe)
+                    yield recipe, False
+        if not recipes:
+            self.metrics.parse_failures += 1
+            raise ValueError("LLM returned no valid recipes")
+        if self.cache is not None and not skipped and parser.done:
+            await self.cache.set(key, GenerateRecipesResponse(recipes=recipes))
+
+    def stats(self) -> dict:
+        """Counters for monitoring."""
+        return {
+            "model": self.client.model,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "llm": self.metrics.stats(),
+            "breaker": self.breaker.stats(),
+        }
+
+
+def generation_client(request: Request) -> tuple[str, RateLimit]:
+    """
+    Bucket key and limit for the caller: the user id from the session
+    cookie when logged in, otherwise the client address (behind a proxy,
+    run uvicorn with --proxy-headers so this is the real client).
+    """
+    user_id = request.scope.get("session", {}).get("user_id")
+    if user_id:
+        return f"user:{user_id}", GENERATE_USER_RATE
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}", GENERATE_IP_RATE
+
+
+_limiter = AdmissionController(
+    InMemoryRateLimitStore(), GENERATE_MAX_IN_FLIGHT
+)
+
+
+def get_generation_limiter() -> AdmissionController:
+    """Dependency returning the worker's limiter for generation requests."""
+    return _limiter
+
+
+_generator: RecipeGenerator | None = None
+
+
+def get_recipe_generator() -> RecipeGenerator:
+    """
+    Dependency returning the worker's RecipeGenerator, created on first use
+    with the provider selected by LLM_PROVIDER / LLM_MODEL.
+    """
+    global _generator
+    if _generator is None:
+        _generator = RecipeGenerator(
+            create_llm_client(),
+            cache=GenerationCache(AsyncSessionLocal),
+            breaker=circuit_breaker("llm"),
+        )
+    return _generator
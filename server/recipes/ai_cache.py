@@ -0,0 +1,167 @@
+"""
+Cache of AI-generated recipes, keyed by the canonical request.
+
+Pantries that differ only in order, casing, duplicates or plurals ("Eggs,
+flour" vs "flour, egg") map to the same key, as do max_time values in the
+same bucket (see ai_api.time_bucket). Lookups go to an in-process LRU tier
+first and then to the generation_cache table, which survives restarts and
+is shared by every worker. Both tiers expire entries after
+GENERATION_CACHE_TTL_SECONDS; the table keeps at most
+GENERATION_CACHE_MAX_ROWS rows, dropping the least recently used.
+
+A failing table never fails a generation: errors are logged and the
+request falls through to the model.
+"""
+
+import hashlib
+import os
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from shared.cache import LRUCache
+from .ai_models import DBGenerationCache
+from .ai_schemas import GenerateRecipesResponse
+
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "512"))
+GENERATION_CACHE_TTL_SECONDS = float(
+    os.getenv("GENERATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+GENERATION_CACHE_MAX_ROWS = int(
+    os.getenv("GENERATION_CACHE_MAX_ROWS", "10000")
+)
+
+
+def cache_key(key: tuple) -> str:
+    """Table key for a request key from ai_api.request_key."""
+    names, max_time = key
+    return hashlib.sha256(f"{','.join(names)}|{max_time}".encode()).hexdigest()
+
+
+class GenerationCache:
+    """
+    LRU tier plus an optional durable tier in the generation_cache table.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] | None,
+        max_size: int = GENERATION_CACHE_SIZE,
+        ttl_seconds: float = GENERATION_CACHE_TTL_SECONDS,
+        max_rows: int = GENERATION_CACHE_MAX_ROWS,
+        now: Callable[[], datetime] = datetime.now,
+    ):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._now = now
+        self.local = LRUCache(
+            max_size, ttl_seconds, clock=lambda: now().timestamp()
+        )
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.db_errors = 0
+
+    async def get(self, key: tuple) -> GenerateRecipesResponse | None:
+        """Cached response for a request key, or None."""
+        table_key = cache_key(key)
+        value = self.local.get(table_key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        value = await self._load(table_key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        self.local.set(table_key, value)
+        return value
+
+    async def set(self, key: tuple, value: GenerateRecipesResponse) -> None:
+        table_key = cache_key(key)
+        self.local.set(table_key, value)
+        await self._store(table_key, key, value)
+
+    async def _load(self, table_key: str) -> GenerateRecipesResponse | None:
+        if self.session_factory is None:
+            return None
+        now = self._now()
+        try:
+            async with self.session_factory() as session:
+                row = await session.get(DBGenerationCache, table_key)
+                if row is None or row.expires_at <= now:
+                    return None
+                await session.execute(
+                    update(DBGenerationCache)
+                    .where(DBGenerationCache.key == table_key)
+                    .values(hits=DBGenerationCache.hits + 1, last_used_at=now)
+                )
+                response = row.response
+                await session.commit()
+        except SQLAlchemyError as e:
+            self.db_errors += 1
+            print("[WARN] Generation cache read failed:", e)
+            return None
+        return GenerateRecipesResponse.model_validate_json(response)
+
+    async def _store(
+        self, table_key: str, key: tuple, value: GenerateRecipesResponse
+    ) -> None:
+        if self.session_factory is None:
+            return
+        names, max_time = key
+        now = self._now()
+        try:
+            async with self.session_factory() as session:
+                await session.merge(
+                    DBGenerationCache(
+                        key=table_key,
+                        ingredients=", ".join(names),
+                        max_time=max_time,
+                        response=value.model_dump_json(exclude={"cached"}),
+                        hits=0,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds),
+                        last_used_at=now,
+                    )
+                )
+                await session.flush()
+                await self._evict(session, now)
+                await session.commit()
+        except SQLAlchemyError as e:
+            self.db_errors += 1
+            print("[WARN] Generation cache write failed:", e)
+
+    async def _evict(self, session: AsyncSession, now: datetime) -> None:
+        # writes only happen on model calls, so this runs rarely
+        await session.execute(
+            delete(DBGenerationCache).where(
+                DBGenerationCache.expires_at <= now
+            )
+        )
+        overflow = (
+            select(DBGenerationCache.key)
+            .order_by(DBGenerationCache.last_used_at.desc())
+            .offset(self.max_rows)
+        )
+        await session.execute(
+            delete(DBGenerationCache).where(
+                DBGenerationCache.key.in_(overflow)
+            )
+        )
+
+    def stats(self) -> dict[str, float]:
+        """Counters and hit rate for monitoring."""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        hits = self.memory_hits + self.db_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "db_errors": self.db_errors,
+            "size": len(self.local),
+        }
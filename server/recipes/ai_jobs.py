@@ -0,0 +1,324 @@
+"""
+Asynchronous recipe generation jobs.
+
+POST /api/generate/jobs stores a job in the generation_jobs table and puts
+its id on a JobQueue. A pool of worker tasks takes ids off the queue and
+runs them through the RecipeGenerator, so the request returns at once and
+the client polls GET /api/generate/jobs/{id} for the result.
+
+A failed attempt (including one that runs past
+GENERATION_JOB_TIMEOUT_SECONDS) is retried with exponential backoff until
+GENERATION_JOB_MAX_ATTEMPTS attempts have been made. Jobs can be cancelled
+while queued or running. Every state change is a conditional UPDATE on the
+row, so a job is claimed by one worker only and a cancelled job never
+turns into a result, even when several processes share the table.
+
+The queue only carries job ids, the table is the source of truth.
+InMemoryJobQueue needs no external services but is per process and lost
+on restart; queued jobs are put back from the table when the pool starts.
+A broker shared by the workers (Redis, SQS) can implement JobQueue
+instead.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import random
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from shared.database import AsyncSessionLocal
+from .ai_api import RecipeGenerator, get_recipe_generator
+from .ai_models import DBGenerationJob
+from .ai_schemas import GenerateRecipesResponse, GenerationJobOut
+
+GENERATION_JOB_WORKERS = int(os.getenv("GENERATION_JOB_WORKERS", "4"))
+GENERATION_JOB_MAX_ATTEMPTS = int(
+    os.getenv("GENERATION_JOB_MAX_ATTEMPTS", "3")
+)
+# the n-th retry waits about GENERATION_JOB_RETRY_SECONDS * 2 ** (n - 1)
+GENERATION_JOB_RETRY_SECONDS = float(
+    os.getenv("GENERATION_JOB_RETRY_SECONDS", "2")
+)
+GENERATION_JOB_MAX_RETRY_SECONDS = 60.0
+GENERATION_JOB_TIMEOUT_SECONDS = float(
+    os.getenv("GENERATION_JOB_TIMEOUT_SECONDS", "120")
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueue(ABC):
+    """Hands job ids to the workers."""
+
+    @abstractmethod
+    async def put(self, job_id: str, delay: float = 0.0) -> None:
+        """Make job_id available to get() after delay seconds."""
+
+    @abstractmethod
+    async def get(self) -> str:
+        """Wait for the next job id and return it."""
+
+
+class InMemoryJobQueue(JobQueue):
+    """asyncio.Queue based JobQueue for a single process."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+
+    async def put(self, job_id: str, delay: float = 0.0) -> None:
+        if delay > 0:
+            asyncio.get_running_loop().call_later(
+                delay, self._queue.put_nowait, job_id
+            )
+        else:
+            self._queue.put_nowait(job_id)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+
+def job_out(job: DBGenerationJob) -> GenerationJobOut:
+    return GenerationJobOut(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        result=(
+            GenerateRecipesResponse.model_validate_json(job.result)
+            if job.result is not None
+            else None
+        ),
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+class GenerationJobs:
+    """
+    Job store plus worker pool. Use one per event loop, start() it before
+    submitting.
+    """
+
+    def __init__(
+        self,
+        generator: RecipeGenerator,
+        session_factory: async_sessionmaker[AsyncSession],
+        queue: JobQueue | None = None,
+        workers: int = GENERATION_JOB_WORKERS,
+        max_attempts: int = GENERATION_JOB_MAX_ATTEMPTS,
+        retry_seconds: float = GENERATION_JOB_RETRY_SECONDS,
+        timeout_seconds: float = GENERATION_JOB_TIMEOUT_SECONDS,
+        now: Callable[[], datetime] = datetime.now,
+    ):
+        self.generator = generator
+        self.session_factory = session_factory
+        self.queue = queue if queue is not None else InMemoryJobQueue()
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.timeout_seconds = timeout_seconds
+        self._now = now
+        self._started = False
+        self._tasks: list[asyncio.Task] = []
+        # attempts running in this process, so cancel() can stop them
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+
+    async def start(self) -> None:
+        """Queue jobs left from a previous run and start the workers."""
+        if self._started:
+            return
+        self._started = True
+        await self._recover()
+        # a fresh context, so workers started from a request don't inherit
+        # its deadline
+        self._tasks = [
+            asyncio.create_task(self._work(), context=contextvars.Context())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._started = False
+
+    async def submit(self, ingredients, max_time) -> GenerationJobOut:
+        now = self._now()
+        job = DBGenerationJob(
+            id=uuid.uuid4().hex,
+            status=QUEUED,
+            ingredients=json.dumps(list(ingredients)),
+            max_time=max_time,
+            attempts=0,
+            created_at=now,
+            updated_at=now,
+            run_after=now,
+        )
+        async with self.session_factory() as session:
+            session.add(job)
+            await session.commit()
+        await self.queue.put(job.id)
+        return job_out(job)
+
+    async def get(self, job_id: str) -> GenerationJobOut | None:
+        async with self.session_factory() as session:
+            job = await session.get(DBGenerationJob, job_id)
+            return job_out(job) if job is not None else None
+
+    async def cancel(self, job_id: str) -> GenerationJobOut | None:
+        """
+        Cancel a queued or running job. Finished jobs are left as they are.
+        Returns the job, or None if there is no such job.
+        """
+        if await self._transition(job_id, (QUEUED, RUNNING), CANCELLED):
+            task = self._running.get(job_id)
+            if task is not None and task.cancel():
+                self._cancelled.add(job_id)
+        return await self.get(job_id)
+
+    async def _transition(
+        self, job_id: str, from_statuses: tuple, status: str, **values
+    ) -> bool:
+        """Move the job to status if it is in from_statuses."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(DBGenerationJob)
+                .where(
+                    DBGenerationJob.id == job_id,
+                    DBGenerationJob.status.in_(from_statuses),
+                )
+                .values(status=status, updated_at=self._now(), **values)
+            )
+            await session.commit()
+        return result.rowcount == 1
+
+    async def _recover(self) -> None:
+        now = self._now()
+        # attempts time out, so a job running for longer lost its worker
+        stale = now - timedelta(seconds=self.timeout_seconds)
+        async with self.session_factory() as session:
+            await session.execute(
+                update(DBGenerationJob)
+                .where(
+                    DBGenerationJob.status == RUNNING,
+                    DBGenerationJob.updated_at < stale,
+                )
+                .values(status=QUEUED, updated_at=now)
+            )
+            rows = await session.execute(
+                select(DBGenerationJob.id, DBGenerationJob.run_after).where(
+                    DBGenerationJob.status == QUEUED
+                )
+            )
+            queued = rows.all()
+            await session.commit()
+        for job_id, run_after in queued:
+            delay = (run_after - now).total_seconds()
+            await self.queue.put(job_id, max(0.0, delay))
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # keep the worker alive, the job is recovered on restart
+                print(f"[WARN] Generation job {job_id} failed:", e)
+
+    async def _run(self, job_id: str) -> None:
+        async with self.session_factory() as session:
+            job = await session.get(DBGenerationJob, job_id)
+        if job is None or job.status != QUEUED:
+            return
+        claimed = await self._transition(
+            job_id,
+            (QUEUED,),
+            RUNNING,
+            attempts=DBGenerationJob.attempts + 1,
+        )
+        if not claimed:
+            return
+        attempt = job.attempts + 1
+        task = asyncio.create_task(
+            asyncio.wait_for(
+                self.generator.generate(
+                    json.loads(job.ingredients), job.max_time
+                ),
+                self.timeout_seconds,
+            )
+        )
+        self._running[job_id] = task
+        try:
+            response = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                raise  # the worker itself is being stopped
+            self._cancelled.discard(job_id)
+            return
+        except Exception as e:
+            await self._retry_or_fail(job_id, attempt, e)
+            return
+        finally:
+            del self._running[job_id]
+        await self._transition(
+            job_id,
+            (RUNNING,),
+            SUCCEEDED,
+            result=response.model_dump_json(),
+            error=None,
+        )
+
+    async def _retry_or_fail(
+        self, job_id: str, attempt: int, error: Exception
+    ) -> None:
+        message = str(error) or type(error).__name__
+        if attempt >= self.max_attempts:
+            await self._transition(job_id, (RUNNING,), FAILED, error=message)
+            return
+        # jittered so jobs that failed together don't retry together
+        delay = min(
+            self.retry_seconds * 2 ** (attempt - 1),
+            GENERATION_JOB_MAX_RETRY_SECONDS,
+        ) * random.uniform(0.5, 1.0)
+        retried = await self._transition(
+            job_id,
+            (RUNNING,),
+            QUEUED,
+            error=message,
+            run_after=self._now() + timedelta(seconds=delay),
+        )
+        if retried:
+            await self.queue.put(job_id, delay)
+
+
+_jobs: GenerationJobs | None = None
+
+
+async def get_generation_jobs() -> GenerationJobs:
+    """
+    Dependency returning the worker's GenerationJobs, started on first use.
+    """
+    global _jobs
+    if _jobs is None:
+        _jobs = GenerationJobs(get_recipe_generator(), AsyncSessionLocal)
+    await _jobs.start()
+    return _jobs
+
+
+async def stop_generation_jobs() -> None:
+    if _jobs is not None:
+        await _jobs.stop()
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from shared.base_model import Base
+
+
+# Durable tier of the AI generation cache (see ai_cache). One row per
+# canonical request; response is the generated recipes as JSON.
+class DBGenerationCache(Base):
+    __tablename__ = "generation_cache"
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    ingredients: Mapped[str] = mapped_column(nullable=False)
+    max_time: Mapped[int] = mapped_column(nullable=False)
+    response: Mapped[str] = mapped_column(nullable=False)
+    hits: Mapped[int] = mapped_column(nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(), nullable=False)
+    # least recently used rows are evicted first
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now, index=True
+    )
+
+
+# Asynchronous generation jobs (see ai_jobs). ingredients is a JSON list
+# and result the GenerateRecipesResponse as JSON once the job succeeded.
+class DBGenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id: Mapped[str] = mapped_column(primary_key=True)
+    # queued, running, succeeded, failed or cancelled
+    status: Mapped[str] = mapped_column(nullable=False, index=True)
+    ingredients: Mapped[str] = mapped_column(nullable=False)
+    max_time: Mapped[int] = mapped_column(nullable=False)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(nullable=True)
+    result: Mapped[Optional[str]] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now
+    )
+    # earliest time a queued job may run, later than created_at on retries
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.now
+    )
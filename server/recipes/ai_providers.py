@@ -0,0 +1,380 @@
+"""
+LLM providers for recipe generation.
+
+A provider turns a prompt into response text, whole (generate) or in
+chunks (stream). LLM_PROVIDER selects which one the API uses:
+
+- "gemini": Google Gemini, model LLM_MODEL
+- "local": LocalLLMClient, a deterministic template-based generator for
+  offline development and load runs (optionally slowed down by
+  LOCAL_LLM_LATENCY_SECONDS)
+
+FakeLLMClient returns whatever the test tells it to. InstrumentedLLMClient
+wraps any provider and records every call in an LLMMetrics, and
+GuardedLLMClient gives every call a timeout and a circuit breaker (see
+shared/resilience).
+
+The google-genai SDK is only imported when a Gemini client is created.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import statistics
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+import dotenv
+from shared.resilience import CircuitBreaker, DeadlineExceeded, time_left
+
+dotenv.load_dotenv()
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-3-flash-preview")
+LOCAL_LLM_LATENCY_SECONDS = float(os.getenv("LOCAL_LLM_LATENCY_SECONDS", "0"))
+# longest a single model call may take, less if the request's deadline is
+# nearer
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "45"))
+
+
+class LLMClient(ABC):
+    """Something that turns a prompt into the model's text response."""
+
+    model: str = "unknown"
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        """Return the model's response text for prompt."""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield the response text in chunks as the model produces it. Clients
+        that cannot stream yield the whole response at once.
+        """
+        yield await self.generate(prompt)
+
+
+class GeminiClient(LLMClient):
+    def __init__(
+        self, api_key: str | None = GOOGLE_API_KEY, model: str = LLM_MODEL
+    ):
+        import google.genai as genai
+
+        self._client = genai.Client(api_key=api_key)
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+        )
+        return response.text or ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        chunks = await self._client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+        )
+        async for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
+
+
+FAKE_RECIPES = [
+    {
+        "name": "Fake recipe",
+        "ingredients": ["ingredient1", "ingredient2"],
+        "instructions": ["Step 1", "Step 2"],
+        "total_time": 10,
+    }
+]
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Stand-in for Gemini in tests and local runs. Waits latency seconds,
+    then returns response (a string, or a function of the prompt). When
+    streaming, the response comes in chunk_size pieces with the latency
+    spread evenly over them.
+    """
+
+    model = "fake"
+
+    def __init__(
+        self,
+        response: str | Callable[[str], str] = json.dumps(FAKE_RECIPES),
+        latency: float = 0.0,
+        chunk_size: int = 64,
+    ):
+        self.response = response
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        return self._text(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        text = self._text(prompt)
+        chunks = [
+            text[i : i + self.chunk_size]
+            for i in range(0, len(text), self.chunk_size)
+        ]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+
+    def _text(self, prompt: str) -> str:
+        if callable(self.response):
+            return self.response(prompt)
+        return self.response
+
+
+# Reads the fields back out of the prompt built by ai_api.build_prompt
+_PROMPT_INGREDIENTS = re.compile(r"User ingredients:\s*\n(.*)\n")
+_PROMPT_MAX_TIME = re.compile(r"per recipe:\s*\n(\d+) minutes")
+
+_TEMPLATES = [
+    (
+        "{first} Skillet",
+        [
+            "Heat a pan over medium heat.",
+            "Add the {all} and cook, stirring, until done.",
+            "Season to taste and serve hot.",
+        ],
+    ),
+    (
+        "{first} and {second} Bowl",
+        [
+            "Prepare the {first} and the {second}.",
+            "Combine everything with the {rest} in a bowl.",
+            "Serve right away.",
+        ],
+    ),
+    (
+        "Simple {first} Soup",
+        [
+            "Bring a pot of water to a simmer.",
+            "Add the {all} and simmer until tender.",
+            "Blend or serve as is.",
+        ],
+    ),
+]
+
+
+def template_recipes(prompt: str) -> str:
+    """
+    Three recipes built from templates around the prompt's ingredients.
+    The same prompt always gives the same answer.
+    """
+    match = _PROMPT_INGREDIENTS.search(prompt)
+    ingredients = [
+        name.strip()
+        for name in (match.group(1) if match else "").split(",")
+        if name.strip()
+    ] or ["pantry staples"]
+    match = _PROMPT_MAX_TIME.search(prompt)
+    max_time = int(match.group(1)) if match else 30
+    seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:4])
+
+    recipes = []
+    for i, (title, steps) in enumerate(_TEMPLATES):
+        rotated = ingredients[i:] + ingredients[:i]
+        words = {
+            "first": rotated[0],
+            "second": rotated[1] if len(rotated) > 1 else rotated[0],
+            "rest": ", ".join(rotated[2:]) or "seasoning",
+            "all": ", ".join(rotated),
+        }
+        recipes.append(
+            {
+                "name": title.format(
+                    **{k: v.title() for k, v in words.items()}
+                ),
+                "ingredients": rotated,
+                "instructions": [step.format(**words) for step in steps],
+                "total_time": max(1, max_time - (seed + 7 * i) % 10),
+            }
+        )
+    return json.dumps(recipes)
+
+
+class LocalLLMClient(FakeLLMClient):
+    """Deterministic template-based provider, no network needed."""
+
+    model = "local-template"
+
+    def __init__(
+        self, latency: float = LOCAL_LLM_LATENCY_SECONDS, chunk_size: int = 64
+    ):
+        super().__init__(template_recipes, latency, chunk_size)
+
+
+class LLMMetrics:
+    """
+    Per-call measurements of a provider. Latencies are kept for the last
+    window calls, the rest are running totals.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.errors = 0
+        self.parse_failures = 0
+        self.invalid_recipes = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.first_chunk_latencies: deque[float] = deque(maxlen=window)
+
+    def record_call(
+        self,
+        latency: float,
+        prompt_chars: int,
+        response_chars: int,
+        first_chunk_latency: float | None = None,
+    ) -> None:
+        self.calls += 1
+        self.latencies.append(latency)
+        self.prompt_chars += prompt_chars
+        self.response_chars += response_chars
+        if first_chunk_latency is not None:
+            self.first_chunk_latencies.append(first_chunk_latency)
+
+    def stats(self) -> dict:
+        def percentiles(values: deque[float]) -> dict:
+            if not values:
+                return {"p50_ms": None, "p95_ms": None}
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            return {
+                "p50_ms": statistics.median(ordered) * 1000,
+                "p95_ms": p95 * 1000,
+            }
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "parse_failures": self.parse_failures,
+            "invalid_recipes": self.invalid_recipes,
+            "avg_prompt_chars": (
+                self.prompt_chars / self.calls if self.calls else 0
+            ),
+            "avg_response_chars": (
+                self.response_chars / self.calls if self.calls else 0
+            ),
+            "latency": percentiles(self.latencies),
+            "first_chunk_latency": percentiles(self.first_chunk_latencies),
+        }
+
+
+class InstrumentedLLMClient(LLMClient):
+    """Wraps a provider and records latency and sizes of every call."""
+
+    def __init__(self, client: LLMClient, metrics: LLMMetrics):
+        self.client = client
+        self.metrics = metrics
+        self.model = client.model
+
+    async def generate(self, prompt: str) -> str:
+        started = time.perf_counter()
+        try:
+            text = await self.client.generate(prompt)
+        except Exception:
+            self.metrics.errors += 1
+            raise
+        self.metrics.record_call(
+            time.perf_counter() - started, len(prompt), len(text)
+        )
+        return text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        first_chunk_latency = None
+        size = 0
+        try:
+            async for chunk in self.client.stream(prompt):
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.perf_counter() - started
+                size += len(chunk)
+                yield chunk
+        except Exception:
+            self.metrics.errors += 1
+            raise
+        self.metrics.record_call(
+            time.perf_counter() - started,
+            len(prompt),
+            size,
+            first_chunk_latency,
+        )
+
+
+class GuardedLLMClient(LLMClient):
+    """
+    Wraps a provider so every call ends within its time_left() and is
+    refused at once while the breaker is open. Timeouts count as breaker
+    failures.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        breaker: CircuitBreaker,
+        timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.timeout_seconds = timeout_seconds
+        self.model = client.model
+
+    async def generate(self, prompt: str) -> str:
+        timeout = time_left(self.timeout_seconds)
+        with self.breaker.guard():
+            try:
+                return await asyncio.wait_for(
+                    self.client.generate(prompt), timeout
+                )
+            except TimeoutError:
+                raise DeadlineExceeded("LLM call timed out")
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + time_left(self.timeout_seconds)
+        with self.breaker.guard():
+            chunks = aiter(self.client.stream(prompt))
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            anext(chunks), ends_at - loop.time()
+                        )
+                    except StopAsyncIteration:
+                        return
+                    except TimeoutError:
+                        raise DeadlineExceeded("LLM call timed out")
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+
+def create_llm_client(
+    provider: str = LLM_PROVIDER, model: str = LLM_MODEL
+) -> LLMClient:
+    """The provider named by config."""
+    if provider == "gemini":
+        return GeminiClient(model=model)
+    if provider == "local":
+        return LocalLLMClient()
+    raise ValueError(f"Unknown LLM_PROVIDER {provider!r}")
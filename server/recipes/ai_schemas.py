@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 class GenerateRecipesRequest(BaseModel):
@@ -8,6 +9,8 @@ class GenerateRecipesRequest(BaseModel):
 
 
 class GeneratedRecipe(BaseModel):
+    # set when the recipe is a saved one instead of a generated one
+    recipe_id: Optional[int] = None
     name: str
     ingredients: List[str]
     instructions: List[str]
@@ -16,3 +19,32 @@ class GeneratedRecipe(BaseModel):
 
 class GenerateRecipesResponse(BaseModel):
     recipes: List[GeneratedRecipe]
+    # True when served from the generation cache instead of the model
+    cached: bool = False
+    # True when these are saved recipes similar to the pantry
+    saved: bool = False
+
+
+class GenerateRecipesBatchItem(BaseModel):
+    # exactly one of these is set
+    response: Optional[GenerateRecipesResponse] = None
+    error: Optional[str] = None
+
+
+class GenerateRecipesBatchResponse(BaseModel):
+    # one item per request, in request order
+    results: List[GenerateRecipesBatchItem]
+    # distinct requests after removing duplicates
+    unique: int
+
+
+class GenerationJobOut(BaseModel):
+    id: str
+    # queued, running, succeeded, failed or cancelled
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    # set once the job succeeded
+    result: Optional[GenerateRecipesResponse] = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,89 @@
+"""
+Streaming support for recipe generation.
+
+The model is asked for a JSON array of recipe objects. RecipeStreamParser
+is fed the response text chunk by chunk as the model produces it and hands
+back each top-level object of that array as soon as its closing brace
+arrives, so the first recipe can be shown while the others are still being
+written.
+"""
+
+import json
+
+
+class RecipeStreamParser:
+    """
+    Incremental parser for a JSON array of objects.
+
+    Anything before the opening "[" (such as a markdown fence) is skipped.
+    Only brace depth, strings and escapes are tracked while scanning; each
+    complete object is then decoded with json.loads.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+
+    @property
+    def done(self) -> bool:
+        """True once the closing "]" of the array has been read."""
+        return self._done
+
+    def feed(self, text: str) -> list[dict]:
+        """
+        Add the next chunk of response text. Returns the objects completed
+        by it, in order. Raises ValueError for an object that is not valid
+        JSON.
+        """
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self._done:
+            char = buffer[self._pos]
+            if not self._in_array:
+                self._in_array = char == "["
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = buffer[self._start : self._pos + 1]
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        raise ValueError(
+                            f"LLM did not return valid JSON:\n{raw}"
+                        )
+                    self._start = None
+            elif char == "]" and self._depth == 0:
+                self._done = True
+            self._pos += 1
+        # drop what is already consumed, keeping a partial object
+        keep_from = self._start if self._start is not None else self._pos
+        self._buffer = buffer[keep_from:]
+        self._pos -= keep_from
+        if self._start is not None:
+            self._start = 0
+        return completed
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
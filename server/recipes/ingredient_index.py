@@ -0,0 +1,200 @@
+"""
+Inverted index from normalized ingredient names to recipe ids.
+
+Answers "what can I cook with what I have": every recipe that shares at
+least one ingredient with the pantry is found by a union of posting sets,
+then ranked by how few of its ingredients are missing.
+
+The index is built from the database on first use and then kept up to
+date by add_recipe, add_recipes_bulk, update_recipe and delete_recipe in
+this process. Each worker process keeps its own copy, so writes made by
+the other workers are picked up by comparing catalog_state with the one
+the index was loaded at, at most every INDEX_REFRESH_SECONDS, and
+reloading when it moved.
+"""
+
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from .recipes_models import DBRecipe, DBIngredient
+
+INDEX_REFRESH_SECONDS = float(os.getenv("INDEX_REFRESH_SECONDS", "30"))
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+# Every write adds or deletes a recipe or bumps its version (children
+# included, see update_recipe), so this changes with any write, wherever
+# it was made. updated_at tells a deleted newest recipe from a new one
+# that got its id back.
+CATALOG_STATE_STATEMENT = select(
+    func.count(DBRecipe.id),
+    func.max(DBRecipe.id),
+    func.sum(DBRecipe.version),
+    func.max(DBRecipe.updated_at),
+)
+
+
+def catalog_state(session: Session) -> tuple:
+    """Cheap summary of the recipes table that any write changes."""
+    return tuple(session.execute(CATALOG_STATE_STATEMENT).one())
+
+
+def normalize_ingredient(name: str) -> str:
+    """
+    Canonical form of an ingredient name: lowercase, punctuation removed,
+    whitespace collapsed and a simple plural stripped ("Tomatoes" and
+    "tomato" both become "tomato").
+    """
+    name = _NON_WORD.sub(" ", name.lower())
+    name = _SPACES.sub(" ", name).strip()
+    if name.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return name[:-2]
+    if name.endswith("s") and not name.endswith("ss") and len(name) > 3:
+        return name[:-1]
+    return name
+
+
+class IngredientIndex:
+    """
+    Posting sets (normalized name -> recipe ids) plus, per recipe, its
+    normalized ingredients and total_time for ranking.
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: float = INDEX_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._postings: dict[str, set[int]] = {}
+        self._recipes: dict[int, dict[str, str]] = {}
+        self._total_time: dict[int, int] = {}
+        # catalog_state the contents were read at, and when it was checked
+        self._state: tuple | None = None
+        self._checked_at = 0.0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    def load(self, session: Session) -> None:
+        """(Re)build the whole index from the database."""
+        # read before the rows: a write committed while they are read, and
+        # missed here, changes the state and is loaded at the next check
+        state = catalog_state(session)
+        stmt = select(
+            DBRecipe.id, DBRecipe.total_time, DBIngredient.name
+        ).join(DBIngredient, DBIngredient.recipe_id == DBRecipe.id)
+        ingredients: dict[int, list[str]] = {}
+        total_time: dict[int, int] = {}
+        for row in session.execute(stmt):
+            ingredients.setdefault(row.id, []).append(row.name)
+            total_time[row.id] = row.total_time
+        with self._lock:
+            self._postings.clear()
+            self._recipes.clear()
+            self._total_time.clear()
+            for recipe_id, names in ingredients.items():
+                self._add(recipe_id, names, total_time[recipe_id])
+            self._state = state
+            self._checked_at = self._clock()
+            self.loaded = True
+
+    def refresh_due(self) -> bool:
+        return self._clock() - self._checked_at >= self.refresh_seconds
+
+    def ensure_loaded(self, session: Session) -> None:
+        """
+        Load on first use, and reload when a check (at most every
+        refresh_seconds) finds the catalog changed since the last load.
+        Writes made in this process change it too, so they cause a reload
+        as well.
+        """
+        if self.loaded:
+            if not self.refresh_due():
+                return
+            self._checked_at = self._clock()
+            if catalog_state(session) == self._state:
+                return
+        self.load(session)
+
+    # Updates before the first load are skipped, load reads them from the
+    # database anyway
+    def add(self, recipe_id: int, names: list[str], total_time: int) -> None:
+        """Index a recipe, replacing what was indexed for it before."""
+        with self._lock:
+            if not self.loaded:
+                return
+            self._remove(recipe_id)
+            self._add(recipe_id, names, total_time)
+
+    def remove(self, recipe_id: int) -> None:
+        with self._lock:
+            if self.loaded:
+                self._remove(recipe_id)
+
+    def _add(self, recipe_id: int, names: list[str], total_time: int) -> None:
+        terms = {normalize_ingredient(name): name for name in names}
+        terms.pop("", None)
+        self._recipes[recipe_id] = terms
+        self._total_time[recipe_id] = total_time
+        for term in terms:
+            self._postings.setdefault(term, set()).add(recipe_id)
+
+    def _remove(self, recipe_id: int) -> None:
+        terms = self._recipes.pop(recipe_id, None)
+        self._total_time.pop(recipe_id, None)
+        for term in terms or ():
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(recipe_id)
+                if not postings:
+                    del self._postings[term]
+
+    def search(
+        self,
+        pantry: list[str],
+        max_missing: int | None = None,
+        max_time: int | None = None,
+        limit: int = 20,
+    ) -> list[tuple[int, list[str], list[str]]]:
+        """
+        Rank recipes by pantry coverage. Returns up to limit
+        (recipe_id, have, missing) tuples, fewest missing ingredients first,
+        then highest share of ingredients covered, then quickest.
+        """
+        wanted = {normalize_ingredient(name) for name in pantry}
+        wanted.discard("")
+        with self._lock:
+            candidates: set[int] = set()
+            for term in wanted:
+                candidates |= self._postings.get(term, set())
+            scored = []
+            for recipe_id in candidates:
+                total_time = self._total_time[recipe_id]
+                if max_time is not None and total_time > max_time:
+                    continue
+                terms = self._recipes[recipe_id]
+                have = [name for term, name in terms.items() if term in wanted]
+                missing = [
+                    name for term, name in terms.items() if term not in wanted
+                ]
+                if max_missing is not None and len(missing) > max_missing:
+                    continue
+                rank = (len(missing), -len(have) / len(terms), total_time)
+                scored.append((rank, recipe_id, have, missing))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [
+            (recipe_id, have, missing)
+            for _, recipe_id, have, missing in scored[:limit]
+        ]
+
+
+ingredient_index = IngredientIndex()
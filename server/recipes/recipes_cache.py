@@ -0,0 +1,35 @@
+"""
+Cache in front of the recipe reads.
+
+Entries are keyed by the same versions the ETags are built from: a single
+recipe by its id and version column, a list page by its page fingerprint
+(see recipes_db.get_page_fingerprint). Every write bumps the version of
+the recipes it touches, which gives the affected entries new keys, so a
+cached body always matches the ETag sent with it and writes never need to
+invalidate anything. Entries for old versions age out of the LRU.
+
+With a shared backend configured, every process reads the entries the
+others loaded.
+"""
+
+import os
+from shared.cache import CacheBackend, ReadThroughCache
+
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "1024"))
+RECIPE_CACHE_TTL_SECONDS = float(os.getenv("RECIPE_CACHE_TTL_SECONDS", "60"))
+
+recipe_cache = ReadThroughCache(RECIPE_CACHE_SIZE, RECIPE_CACHE_TTL_SECONDS)
+
+
+def use_backend(backend: CacheBackend | None) -> None:
+    """Put a shared backend behind the local tier (None to remove it)."""
+    recipe_cache.backend = backend
+    recipe_cache.clear()
+
+
+def recipe_key(recipe_id: int, version: int) -> str:
+    return f"recipe:{recipe_id}:{version}"
+
+
+def page_key(fingerprint: str) -> str:
+    return f"page:{fingerprint}"
@@ -1,12 +1,42 @@
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+import asyncio
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Iterator
+from datetime import datetime
+from sqlalchemy import Select, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from .recipes_schemas import (
     RecipeOut,
     RecipeCreate,
+    RecipePage,
+    RecipeSummary,
+    RecipeSummaryPage,
+    PantryMatch,
+    RecipeSearchPage,
     IngredientOut,
     InstructionOut,
 )
+from .ai_schemas import GeneratedRecipe
 from .recipes_models import DBRecipe, DBIngredient, DBInstruction
+from .ingredient_index import catalog_state, ingredient_index
+from .similarity_index import LOAD_STATEMENT, similarity_index
+from .recipes_search import reindex_recipes, unindex_recipe, search_recipe_ids
+from .recipes_cache import recipe_cache, recipe_key, page_key
+
+
+# The in-memory indexes (pantry search, similarity) follow committed writes
+def _index_in_memory(
+    recipe_id: int, names: list[str], total_time: int
+) -> None:
+    ingredient_index.add(recipe_id, names, total_time)
+    similarity_index.add(recipe_id, names, total_time)
+
+
+def _unindex_in_memory(recipe_id: int) -> None:
+    ingredient_index.remove(recipe_id)
+    similarity_index.remove(recipe_id)
 
 
 def get_all_recipes(session: Session) -> list[RecipeOut]:
@@ -38,6 +68,7 @@ def get_all_recipes(session: Session) -> list[RecipeOut]:
             title=recipe.title,  # str
             image_url=recipe.image_url,  # Optional[str]
             total_time=recipe.total_time,  # int
+            version=recipe.version,
             ingredients=ingredients,  # List[IngredientOut]
             instructions=instructions,  # List[InstructionOut]
         )
@@ -48,68 +79,118 @@ def get_all_recipes(session: Session) -> list[RecipeOut]:
 def add_recipe(
     session: Session, recipe: RecipeCreate, user_id: int
 ) -> RecipeOut:
-    from .recipes_models import DBIngredient, DBInstruction
-
-    # Create the recipe (no id, SQLAlchemy will generate it)
+    # Create the recipe (no id, SQLAlchemy will generate it) together with
+    # its children, so one flush inserts everything and fills in the ids
+    db_ingredients = [
+        DBIngredient(name=ingredient.name) for ingredient in recipe.ingredients
+    ]
+    db_instructions = [
+        DBInstruction(
+            step_text=instruction.step_text,
+            step_number=instruction.step_number,
+        )
+        for instruction in recipe.instructions
+    ]
     recipe_model = DBRecipe(
         user_id=user_id,
         title=recipe.title,
         image_url=None,  # or set from recipe if available
         total_time=recipe.total_time,
+        ingredients=db_ingredients,
+        instructions=db_instructions,
     )
     session.add(recipe_model)
-    session.commit()
-    session.refresh(recipe_model)
+    session.flush()
+    reindex_recipes(session, [recipe_model.id])
 
-    # Add ingredients
-    db_ingredients = []
-    for ingredient in recipe.ingredients:
-        db_ingredient = DBIngredient(
-            recipe_id=recipe_model.id, name=ingredient.name
-        )
-        session.add(db_ingredient)
-        db_ingredients.append(db_ingredient)
-
-    # Add instructions
-    db_instructions = []
-    for instruction in recipe.instructions:
-        db_instruction = DBInstruction(
-            recipe_id=recipe_model.id,
-            step_text=instruction.step_text,
-            step_number=instruction.step_number,
-        )
-        session.add(db_instruction)
-        db_instructions.append(db_instruction)
-
-    session.commit()
-
-    # Refresh to get ids
-    session.refresh(recipe_model)
-    for db_ingredient in db_ingredients:
-        session.refresh(db_ingredient)
-    for db_instruction in db_instructions:
-        session.refresh(db_instruction)
-
-    # Build output lists
-    ingredients_out = [
-        IngredientOut(id=ing.id, name=ing.name) for ing in db_ingredients
-    ]
-    instructions_out = [
-        InstructionOut(
-            id=inst.id, step_text=inst.step_text, step_number=inst.step_number
-        )
-        for inst in db_instructions
-    ]
-
-    return RecipeOut(
+    # Build the output before commit, commit expires the loaded attributes
+    result = RecipeOut(
         id=recipe_model.id,
         user_id=recipe_model.user_id,
         title=recipe_model.title,
         image_url=recipe_model.image_url,
         total_time=recipe_model.total_time,
-        ingredients=ingredients_out,
-        instructions=instructions_out,
+        version=recipe_model.version,
+        ingredients=[
+            IngredientOut(id=ing.id, name=ing.name) for ing in db_ingredients
+        ],
+        instructions=[
+            InstructionOut(
+                id=inst.id,
+                step_text=inst.step_text,
+                step_number=inst.step_number,
+            )
+            for inst in db_instructions
+        ],
     )
+    session.commit()
+    _index_in_memory(
+        result.id, [i.name for i in result.ingredients], result.total_time
+    )
+    return result
+
+
+# Bulk import
+# Inserts go through SQLAlchemy's "insertmanyvalues" path: the recipes are
+# sent as multi-row INSERT ... RETURNING statements (ids come back in
+# payload order), then all ingredients and all instructions as multi-row
+# INSERTs, all in one transaction. Thousands of recipes take a handful of
+# round trips instead of several per row.
+MAX_BULK_RECIPES = 5000
+
+
+def add_recipes_bulk(
+    session: Session, recipes: list[RecipeCreate], user_id: int
+) -> list[int]:
+    """
+    Insert many recipes with their ingredients and instructions in one
+    transaction. Returns the new recipe ids in the order of recipes.
+    """
+    if not recipes:
+        return []
+    recipe_ids = list(
+        session.scalars(
+            insert(DBRecipe).returning(
+                DBRecipe.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "user_id": user_id,
+                    "title": recipe.title,
+                    "image_url": None,
+                    "total_time": recipe.total_time,
+                }
+                for recipe in recipes
+            ],
+        )
+    )
+    ingredient_rows = [
+        {"recipe_id": recipe_id, "name": ingredient.name}
+        for recipe_id, recipe in zip(recipe_ids, recipes)
+        for ingredient in recipe.ingredients
+    ]
+    instruction_rows = [
+        {
+            "recipe_id": recipe_id,
+            "step_text": instruction.step_text,
+            "step_number": instruction.step_number,
+        }
+        for recipe_id, recipe in zip(recipe_ids, recipes)
+        for instruction in recipe.instructions
+    ]
+    if ingredient_rows:
+        session.execute(insert(DBIngredient), ingredient_rows)
+    if instruction_rows:
+        session.execute(insert(DBInstruction), instruction_rows)
+    reindex_recipes(session, recipe_ids)
+    session.commit()
+    for recipe_id, recipe in zip(recipe_ids, recipes):
+        _index_in_memory(
+            recipe_id,
+            [ingredient.name for ingredient in recipe.ingredients],
+            recipe.total_time,
+        )
+    return recipe_ids
 
 
 def get_recipe_by_id(session: Session, recipe_id: int) -> RecipeOut | None:
@@ -151,15 +232,115 @@ def get_recipe_by_id(session: Session, recipe_id: int) -> RecipeOut | None:
         title=recipe.title,
         image_url=recipe.image_url,
         total_time=recipe.total_time,
+        version=recipe.version,
         ingredients=ingredients,
         instructions=instructions,
     )
 
 
+class RecipeVersionConflict(Exception):
+    """
+    Raised by update_recipe when the recipe was changed by someone else
+    since the version the client read.
+    """
+
+
+def _child_dict(item) -> dict:
+    # update_data items are dicts from model_dump, but stay lenient with
+    # plain values like the old clear-and-reinsert code was
+    return item if isinstance(item, dict) else {"value": str(item)}
+
+
+def _diff_ingredients(recipe: DBRecipe, new_items: list) -> None:
+    """
+    Apply an ingredient list to recipe.ingredients, touching only the rows
+    that changed. Rows are matched by id first, then by name; unmatched
+    existing rows are deleted and unmatched new items inserted.
+    """
+    existing = {ingredient.id: ingredient for ingredient in recipe.ingredients}
+    kept: list[DBIngredient] = []
+    unmatched: list[str] = []
+    for item in map(_child_dict, new_items):
+        name = item.get("name", item.get("value", ""))
+        row = existing.pop(item.get("id"), None)
+        if row is None:
+            unmatched.append(name)
+            continue
+        if row.name != name:
+            row.name = name
+        kept.append(row)
+    by_name = {}
+    for row in existing.values():
+        by_name.setdefault(row.name, []).append(row)
+    for name in unmatched:
+        rows = by_name.get(name)
+        if rows:
+            kept.append(rows.pop())
+        else:
+            kept.append(DBIngredient(name=name))
+    # Rows left out of the new list are deleted by the delete-orphan cascade
+    recipe.ingredients = kept
+
+
+def _diff_instructions(recipe: DBRecipe, new_items: list) -> None:
+    """
+    Apply an instruction list to recipe.instructions, touching only the
+    rows that changed. Rows are matched by id first, then by step_number.
+    """
+    existing = {
+        instruction.id: instruction for instruction in recipe.instructions
+    }
+    kept: list[DBInstruction] = []
+    unmatched: list[tuple[str, int]] = []
+    for item in map(_child_dict, new_items):
+        step_text = item.get("step_text", item.get("value", ""))
+        step_number = item.get("step_number", 1)
+        row = existing.pop(item.get("id"), None)
+        if row is None:
+            unmatched.append((step_text, step_number))
+            continue
+        if row.step_text != step_text:
+            row.step_text = step_text
+        if row.step_number != step_number:
+            row.step_number = step_number
+        kept.append(row)
+    by_step = {row.step_number: row for row in existing.values()}
+    for step_text, step_number in unmatched:
+        row = by_step.pop(step_number, None)
+        if row is None:
+            kept.append(
+                DBInstruction(step_text=step_text, step_number=step_number)
+            )
+            continue
+        if row.step_text != step_text:
+            row.step_text = step_text
+        kept.append(row)
+    recipe.instructions = kept
+
+
 def update_recipe(
-    session: Session, recipe_id: int, update_data: dict, user_id: int
+    session: Session,
+    recipe_id: int,
+    update_data: dict,
+    user_id: int,
+    expected_version: int | None = None,
 ) -> RecipeOut | None:
-    recipe = session.get(DBRecipe, recipe_id)
+    """
+    Update a recipe owned by user_id and return it, or None if it does not
+    exist or belongs to someone else. Ingredients and instructions are
+    diffed against the stored rows instead of being replaced. When
+    expected_version is given and the stored version differs (or another
+    edit commits first), raises RecipeVersionConflict.
+    """
+    stmt = (
+        select(DBRecipe)
+        .where(DBRecipe.id == recipe_id)
+        .options(
+            selectinload(DBRecipe.ingredients),
+            selectinload(DBRecipe.instructions),
+        )
+    )
+    recipe = session.scalars(stmt).first()
     if not recipe:
         return None
 
@@ -167,6 +348,12 @@ def update_recipe(
     if recipe.user_id != user_id:
         return None
 
+    if expected_version is not None and recipe.version != expected_version:
+        raise RecipeVersionConflict(
+            f"Recipe is at version {recipe.version}, "
+            f"not {expected_version}"
+        )
+
     # Update simple fields
     if "title" in update_data and update_data["title"] is not None:
         recipe.title = update_data["title"]
@@ -175,48 +362,54 @@ def update_recipe(
     if "total_time" in update_data and update_data["total_time"] is not None:
         recipe.total_time = update_data["total_time"]
 
-    # Update ingredients if provided
     if "ingredients" in update_data and update_data["ingredients"] is not None:
-        # Remove old ingredients
-        recipe.ingredients.clear()
-        session.flush()
-        # Add new ingredients (expecting list of dicts with 'name')
-        for ingredient in update_data["ingredients"]:
-            name = (
-                ingredient["name"]
-                if isinstance(ingredient, dict) and "name" in ingredient
-                else str(ingredient)
-            )
-            new_ingredient = DBIngredient(recipe_id=recipe.id, name=name)
-            session.add(new_ingredient)
-
-    # Update instructions if provided
+        _diff_ingredients(recipe, update_data["ingredients"])
     if (
         "instructions" in update_data
         and update_data["instructions"] is not None
     ):
-        # Remove old instructions
-        recipe.instructions.clear()
+        _diff_instructions(recipe, update_data["instructions"])
+
+    # Always write the recipe row so child-only edits bump the version too
+    recipe.updated_at = datetime.now()
+    try:
         session.flush()
-        # Add new instructions (expecting list of dicts with
-        # 'step_text' and 'step_number')
-        for instruction in update_data["instructions"]:
-            if isinstance(instruction, dict):
-                step_text = instruction.get("step_text", "")
-                step_number = instruction.get("step_number", 1)
-            else:
-                step_text = str(instruction)
-                step_number = 1
-            new_instruction = DBInstruction(
-                recipe_id=recipe.id,
-                step_text=step_text,
-                step_number=step_number,
-            )
-            session.add(new_instruction)
+    except StaleDataError as e:
+        session.rollback()
+        raise RecipeVersionConflict(
+            "Recipe was modified by another request"
+        ) from e
+    reindex_recipes(session, [recipe.id])
 
+    # Build the result from the flushed objects instead of querying again,
+    # commit expires the loaded attributes
+    result = RecipeOut(
+        id=recipe.id,
+        user_id=recipe.user_id,
+        title=recipe.title,
+        image_url=recipe.image_url,
+        total_time=recipe.total_time,
+        version=recipe.version,
+        ingredients=[
+            IngredientOut(id=ingredient.id, name=ingredient.name)
+            for ingredient in recipe.ingredients
+        ],
+        instructions=[
+            InstructionOut(
+                id=instruction.id,
+                step_text=instruction.step_text,
+                step_number=instruction.step_number,
+            )
+            for instruction in sorted(
+                recipe.instructions, key=lambda i: i.step_number
+            )
+        ],
+    )
     session.commit()
-    session.refresh(recipe)
-    return get_recipe_by_id(session, recipe_id)
+    _index_in_memory(
+        result.id, [i.name for i in result.ingredients], result.total_time
+    )
+    return result
 
 
 # Delete a recipe by ID
@@ -229,13 +422,11 @@ def delete_recipe(session: Session, recipe_id: int, user_id: int) -> None:
         raise ValueError("Recipe not found")
     if recipe.user_id != user_id:
         raise ValueError("Not authorized to delete this recipe")
-    # Delete related ingredients and instructions
-    for ingredient in list(recipe.ingredients):
-        session.delete(ingredient)
-    for instruction in list(recipe.instructions):
-        session.delete(instruction)
+    # ingredients and instructions go with it (delete-orphan cascade)
     session.delete(recipe)
+    unindex_recipe(session, recipe_id)
     session.commit()
+    _unindex_in_memory(recipe_id)
 
 
 # Get all recipes for a specific user
@@ -269,8 +460,505 @@ def get_recipes_by_user(session: Session, user_id: int) -> list[RecipeOut]:
                 title=recipe.title,
                 image_url=recipe.image_url,
                 total_time=recipe.total_time,
+                version=recipe.version,
                 ingredients=ingredients,
                 instructions=instructions,
             )
         )
     return recipes
+
+
+# Keyset (cursor) pagination
+# Pages are ordered newest first on (created_at, id). The cursor remembers
+# the last row of the previous page, so the database seeks straight to the
+# next page instead of counting past OFFSET rows, and page 500 costs the
+# same as page 1.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, recipe_id: int) -> str:
+    """
+    Pack a (created_at, id) position into an opaque, url-safe token.
+    """
+    raw = f"{created_at.isoformat()}|{recipe_id}"
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Unpack a token made by encode_cursor.
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = urlsafe_b64decode(padded.encode()).decode()
+        created_at, recipe_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def load_recipe_children(
+    session: Session, recipe_ids: list[int]
+) -> tuple[dict[int, list[IngredientOut]], dict[int, list[InstructionOut]]]:
+    """
+    Load ingredients and instructions for the given recipes with one
+    IN query per table. Instructions come back ordered by step_number.
+    """
+    ingredients: dict[int, list[IngredientOut]] = {
+        recipe_id: [] for recipe_id in recipe_ids
+    }
+    instructions: dict[int, list[InstructionOut]] = {
+        recipe_id: [] for recipe_id in recipe_ids
+    }
+    if not recipe_ids:
+        return ingredients, instructions
+
+    ingredient_stmt = (
+        select(DBIngredient.id, DBIngredient.recipe_id, DBIngredient.name)
+        .where(DBIngredient.recipe_id.in_(recipe_ids))
+        .order_by(DBIngredient.recipe_id, DBIngredient.id)
+    )
+    for row in session.execute(ingredient_stmt):
+        ingredients[row.recipe_id].append(
+            IngredientOut(id=row.id, name=row.name)
+        )
+
+    instruction_stmt = (
+        select(
+            DBInstruction.id,
+            DBInstruction.recipe_id,
+            DBInstruction.step_text,
+            DBInstruction.step_number,
+        )
+        .where(DBInstruction.recipe_id.in_(recipe_ids))
+        .order_by(DBInstruction.recipe_id, DBInstruction.step_number)
+    )
+    for row in session.execute(instruction_stmt):
+        instructions[row.recipe_id].append(
+            InstructionOut(
+                id=row.id,
+                step_text=row.step_text,
+                step_number=row.step_number,
+            )
+        )
+    return ingredients, instructions
+
+
+def keyset_page(
+    stmt: Select, limit: int, cursor: str | None, user_id: int | None
+) -> Select:
+    """
+    Filter and order a select over the recipes table for one keyset page.
+    Selects limit + 1 rows so callers can tell whether a next page exists.
+    Raises ValueError if the cursor is malformed.
+    """
+    if user_id is not None:
+        stmt = stmt.where(DBRecipe.user_id == user_id)
+    if cursor:
+        created_at, recipe_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(DBRecipe.created_at, DBRecipe.id)
+            < tuple_(created_at, recipe_id)
+        )
+    return stmt.order_by(DBRecipe.created_at.desc(), DBRecipe.id.desc()).limit(
+        limit + 1
+    )
+
+
+def get_recipes_page(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    user_id: int | None = None,
+) -> RecipePage:
+    """
+    Return one page of recipes, newest first, optionally only for one user.
+    Pass the next_cursor of a page back in as cursor to get the page after
+    it. Raises ValueError if the cursor is malformed.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = keyset_page(select(DBRecipe), limit, cursor, user_id)
+    recipe_objects = session.scalars(stmt).all()
+    has_more = len(recipe_objects) > limit
+    recipe_objects = recipe_objects[:limit]
+
+    # Children are only loaded for the rows on this page
+    ingredients, instructions = load_recipe_children(
+        session, [recipe.id for recipe in recipe_objects]
+    )
+    items = [
+        RecipeOut(
+            id=recipe.id,
+            user_id=recipe.user_id,
+            title=recipe.title,
+            image_url=recipe.image_url,
+            total_time=recipe.total_time,
+            version=recipe.version,
+            ingredients=ingredients[recipe.id],
+            instructions=instructions[recipe.id],
+        )
+        for recipe in recipe_objects
+    ]
+    next_cursor = None
+    if has_more:
+        last = recipe_objects[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return RecipePage(items=items, next_cursor=next_cursor)
+
+
+# Summary projection for list views
+# Selects plain columns and counts children with correlated aggregate
+# subqueries, so no ORM objects are built and no step_text is read.
+def summary_select() -> Select:
+    """Select the RecipeSummary columns of recipes."""
+    ingredient_count = (
+        select(func.count(DBIngredient.id))
+        .where(DBIngredient.recipe_id == DBRecipe.id)
+        .scalar_subquery()
+    )
+    step_count = (
+        select(func.count(DBInstruction.id))
+        .where(DBInstruction.recipe_id == DBRecipe.id)
+        .scalar_subquery()
+    )
+    return select(
+        DBRecipe.id,
+        DBRecipe.user_id,
+        DBRecipe.title,
+        DBRecipe.image_url,
+        DBRecipe.total_time,
+        ingredient_count.label("ingredient_count"),
+        step_count.label("step_count"),
+    )
+
+
+def get_recipe_summaries_page(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    user_id: int | None = None,
+) -> RecipeSummaryPage:
+    """
+    Same paging as get_recipes_page, but returns RecipeSummary rows with
+    ingredient and step counts instead of the full recipes.
+    Raises ValueError if the cursor is malformed.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = summary_select().add_columns(DBRecipe.created_at)
+    rows = session.execute(keyset_page(stmt, limit, cursor, user_id)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [RecipeSummary.model_validate(row) for row in rows]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return RecipeSummaryPage(items=items, next_cursor=next_cursor)
+
+
+# Cheap change detection for conditional GETs (ETag / If-None-Match)
+# Every edit bumps recipes.version (children included, see update_recipe),
+# so (id, version) of the rows on a page is enough to tell whether the page
+# changed, without loading any ingredients or instructions.
+def get_recipe_version(session: Session, recipe_id: int) -> int | None:
+    """
+    Return the version of a recipe, or None if it does not exist.
+    """
+    stmt = select(DBRecipe.version).where(DBRecipe.id == recipe_id)
+    return session.scalar(stmt)
+
+
+def get_page_fingerprint(
+    session: Session,
+    view: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    user_id: int | None = None,
+) -> str:
+    """
+    Return a hash of the (id, version) pairs on a keyset page. It changes
+    whenever a recipe on the page is added, edited or deleted. view keeps
+    different representations of the same page apart.
+    Raises ValueError if the cursor is malformed.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = keyset_page(
+        select(DBRecipe.id, DBRecipe.version), limit, cursor, user_id
+    )
+    digest = hashlib.sha1(f"{view}|{limit}|{cursor}|{user_id}".encode())
+    for row in session.execute(stmt):
+        digest.update(f"{row.id}:{row.version};".encode())
+    return digest.hexdigest()
+
+
+# Cached reads
+# Same results as the functions above, served from recipe_cache when
+# possible. The keys carry the version or page fingerprint the ETag is
+# made of; callers that already have it for the ETag pass it in.
+def get_recipe_by_id_cached(
+    session: Session, recipe_id: int, version: int | None = None
+) -> RecipeOut | None:
+    if version is None:
+        version = get_recipe_version(session, recipe_id)
+        if version is None:
+            return None
+    return recipe_cache.get_or_load(
+        recipe_key(recipe_id, version),
+        RecipeOut,
+        lambda: get_recipe_by_id(session, recipe_id),
+    )
+
+
+def get_recipes_page_cached(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    user_id: int | None = None,
+    fingerprint: str | None = None,
+) -> RecipePage:
+    """Raises ValueError if the cursor is malformed."""
+    if fingerprint is None:
+        fingerprint = get_page_fingerprint(
+            session, "full", limit, cursor, user_id
+        )
+    return recipe_cache.get_or_load(
+        page_key(fingerprint),
+        RecipePage,
+        lambda: get_recipes_page(session, limit, cursor, user_id),
+    )
+
+
+def get_recipe_summaries_page_cached(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    user_id: int | None = None,
+    fingerprint: str | None = None,
+) -> RecipeSummaryPage:
+    """Raises ValueError if the cursor is malformed."""
+    if fingerprint is None:
+        fingerprint = get_page_fingerprint(
+            session, "summary", limit, cursor, user_id
+        )
+    return recipe_cache.get_or_load(
+        page_key(fingerprint),
+        RecipeSummaryPage,
+        lambda: get_recipe_summaries_page(session, limit, cursor, user_id),
+    )
+
+
+# Full-text search
+def search_recipes(
+    session: Session,
+    q: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+) -> RecipeSearchPage:
+    """
+    Full-text search over titles, ingredients and instructions, best match
+    first. Pass next_offset back in as offset to get the next page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    recipe_ids = search_recipe_ids(session, q, limit + 1, offset)
+    has_more = len(recipe_ids) > limit
+    recipe_ids = recipe_ids[:limit]
+    rows = {}
+    if recipe_ids:
+        stmt = summary_select().where(DBRecipe.id.in_(recipe_ids))
+        rows = {row.id: row for row in session.execute(stmt)}
+    return RecipeSearchPage(
+        items=[
+            RecipeSummary.model_validate(rows[recipe_id])
+            for recipe_id in recipe_ids
+            if recipe_id in rows
+        ],
+        next_offset=offset + limit if has_more else None,
+    )
+
+
+# Pantry search
+def search_recipes_by_pantry(
+    session: Session,
+    pantry: list[str],
+    max_missing: int | None = None,
+    max_time: int | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> list[PantryMatch]:
+    """
+    Rank saved recipes by how many of their ingredients are in the pantry,
+    using the in-memory ingredient index. Only the display columns of the
+    returned recipes are read from the database.
+    """
+    ingredient_index.ensure_loaded(session)
+    hits = ingredient_index.search(pantry, max_missing, max_time, limit)
+    if not hits:
+        return []
+    stmt = select(
+        DBRecipe.id, DBRecipe.title, DBRecipe.image_url, DBRecipe.total_time
+    ).where(DBRecipe.id.in_([recipe_id for recipe_id, _, _ in hits]))
+    rows = {row.id: row for row in session.execute(stmt)}
+    return [
+        PantryMatch(
+            recipe_id=recipe_id,
+            title=rows[recipe_id].title,
+            image_url=rows[recipe_id].image_url,
+            total_time=rows[recipe_id].total_time,
+            have=have,
+            missing=missing,
+        )
+        for recipe_id, have, missing in hits
+        # skip recipes deleted by another process since the index loaded
+        if recipe_id in rows
+    ]
+
+
+# Saved recipes that fit a pantry, so /api/generate can answer without
+# calling the model
+def find_similar_recipes(
+    session: Session,
+    pantry: list[str],
+    max_time: int,
+    limit: int,
+    min_score: float,
+) -> list[GeneratedRecipe]:
+    """
+    Up to limit saved recipes within max_time whose ingredients are at
+    least min_score cosine-similar to the pantry, most similar first.
+    """
+    similarity_index.ensure_loaded(session)
+    hits = similarity_index.search(pantry, max_time, limit, min_score)
+    return load_similar_recipes(session, hits)
+
+
+def load_similar_recipes(
+    session: Session, hits: list[tuple[int, float]]
+) -> list[GeneratedRecipe]:
+    """The recipes of similarity_index.search hits, in the same order."""
+    if not hits:
+        return []
+    recipe_ids = [recipe_id for recipe_id, _ in hits]
+    stmt = select(DBRecipe.id, DBRecipe.title, DBRecipe.total_time).where(
+        DBRecipe.id.in_(recipe_ids)
+    )
+    rows = {row.id: row for row in session.execute(stmt)}
+    ingredients, instructions = load_recipe_children(session, recipe_ids)
+    return [
+        GeneratedRecipe(
+            recipe_id=recipe_id,
+            name=rows[recipe_id].title,
+            ingredients=[i.name for i in ingredients[recipe_id]],
+            instructions=[i.step_text for i in instructions[recipe_id]],
+            total_time=rows[recipe_id].total_time,
+        )
+        for recipe_id in recipe_ids
+        # skip recipes deleted by another process since the index loaded
+        if recipe_id in rows
+    ]
+
+
+# Streaming export
+# Recipe rows are read through a server-side cursor (yield_per), and the
+# children of each batch are loaded with load_recipe_children, so memory
+# stays bounded by the batch size instead of the catalog size.
+EXPORT_BATCH_SIZE = 500
+
+
+def iter_recipes(
+    session: Session, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[RecipeOut]:
+    """
+    Yield every recipe ordered by id, reading batch_size rows at a time.
+    """
+    stmt = (
+        select(
+            DBRecipe.id,
+            DBRecipe.user_id,
+            DBRecipe.title,
+            DBRecipe.image_url,
+            DBRecipe.total_time,
+            DBRecipe.version,
+        )
+        .order_by(DBRecipe.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for batch in session.execute(stmt).partitions():
+        ingredients, instructions = load_recipe_children(
+            session, [row.id for row in batch]
+        )
+        for row in batch:
+            yield RecipeOut(
+                id=row.id,
+                user_id=row.user_id,
+                title=row.title,
+                image_url=row.image_url,
+                total_time=row.total_time,
+                version=row.version,
+                ingredients=ingredients[row.id],
+                instructions=instructions[row.id],
+            )
+
+
+def iter_recipes_ndjson(
+    session: Session, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[str]:
+    """
+    Yield every recipe as one line of newline-delimited JSON.
+    """
+    for recipe in iter_recipes(session, batch_size):
+        yield recipe.model_dump_json() + "\n"
+
+
+# Async variants
+# For async def endpoints. run_sync drives the functions above on the
+# AsyncSession's connection, so every round trip is awaited on the event
+# loop instead of blocking it, and the query logic stays in one place.
+async def add_recipe_async(
+    session: AsyncSession, recipe: RecipeCreate, user_id: int
+) -> RecipeOut:
+    return await session.run_sync(add_recipe, recipe, user_id)
+
+
+async def get_recipe_version_async(
+    session: AsyncSession, recipe_id: int
+) -> int | None:
+    return await session.run_sync(get_recipe_version, recipe_id)
+
+
+async def update_recipe_async(
+    session: AsyncSession,
+    recipe_id: int,
+    update_data: dict,
+    user_id: int,
+    expected_version: int | None = None,
+) -> RecipeOut | None:
+    return await session.run_sync(
+        update_recipe, recipe_id, update_data, user_id, expected_version
+    )
+
+
+async def find_similar_recipes_async(
+    session: AsyncSession,
+    pantry: list[str],
+    max_time: int,
+    limit: int,
+    min_score: float,
+) -> list[GeneratedRecipe]:
+    # Building and searching the index is CPU work, keep it off the event
+    # loop; only the database reads go through the session
+    if similarity_index.refresh_due():
+        state = await session.run_sync(catalog_state)
+        if not similarity_index.is_current(state):
+            rows = (await session.execute(LOAD_STATEMENT)).all()
+            await asyncio.to_thread(similarity_index.load_rows, rows, state)
+    hits = await asyncio.to_thread(
+        similarity_index.search, pantry, max_time, limit, min_score
+    )
+    return await session.run_sync(load_similar_recipes, hits)
+
+
+async def delete_recipe_async(
+    session: AsyncSession, recipe_id: int, user_id: int
+) -> None:
+    await session.run_sync(delete_recipe, recipe_id, user_id)
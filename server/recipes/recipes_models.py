@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, DateTime
+from sqlalchemy import DDL, ForeignKey, DateTime, Index, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
 from shared.base_model import Base
@@ -33,6 +33,9 @@ class DBRecipe(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(), nullable=False, default=datetime.now, onupdate=datetime.now
     )
+    # bumped by SQLAlchemy on every UPDATE of the row, used for optimistic
+    # concurrency (If-Match) on edits
+    version: Mapped[int] = mapped_column(nullable=False, default=1)
 
     user: Mapped["DBUser"] = relationship(back_populates="recipes")
     ingredients: Mapped[list["DBIngredient"]] = relationship(
@@ -42,6 +45,50 @@ class DBRecipe(Base):
         back_populates="recipe", cascade="all, delete-orphan"
     )
 
+    # UPDATE ... WHERE id = ? AND version = ?, a concurrent edit that already
+    # bumped the version makes the flush fail with StaleDataError
+    __mapper_args__ = {"version_id_col": version}
+    # keyset pagination (newest first), globally and per user
+    __table_args__ = (
+        Index("ix_recipes_created_at_id", "created_at", "id"),
+        Index(
+            "ix_recipes_user_id_created_at_id", "user_id", "created_at", "id"
+        ),
+    )
+
+
+# Full-text search storage (see recipes_search): a tsvector column with a
+# GIN index on Postgres, an FTS5 table keyed by recipe id on SQLite. It is
+# not mapped, only raw SQL in recipes_search touches it.
+event.listen(
+    DBRecipe.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    DBRecipe.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector "
+        "ON recipes USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    DBRecipe.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts "
+        "USING fts5(title, ingredients, steps)"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    DBRecipe.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS recipes_fts").execute_if(dialect="sqlite"),
+)
+
 
 # user → gives access to the recipe’s user via recipe.user (Show the username
 # who created the recipe) ingredients → list of all ingredients for this
@@ -55,7 +102,7 @@ class DBIngredient(Base):
     __tablename__ = "ingredients"
     id: Mapped[int] = mapped_column(primary_key=True)
     recipe_id: Mapped[int] = mapped_column(
-        ForeignKey("recipes.id"), nullable=False
+        ForeignKey("recipes.id"), nullable=False, index=True
     )
     name: Mapped[str] = mapped_column(nullable=False)
     created_at: Mapped[datetime] = mapped_column(
@@ -91,6 +138,13 @@ class DBInstruction(Base):
     )
     recipe = relationship("DBRecipe", back_populates="instructions")
 
+    # lookups by recipe, already in step order
+    __table_args__ = (
+        Index(
+            "ix_instructions_recipe_id_step_number", "recipe_id", "step_number"
+        ),
+    )
+
 
 # lets you access the DBRecipe object that the instruction belongs to
 # via instruction.recipe maybe for if youre editing or
@@ -1,25 +1,77 @@
 # import json
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import math
+from collections.abc import AsyncIterator, Iterator
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from shared.database import get_session
+from shared.database import get_async_session, get_session, SessionLocal
 from .recipes_db import (
-    get_all_recipes,
-    add_recipe,
-    get_recipe_by_id,
-    update_recipe,
-    delete_recipe,
-    get_recipes_by_user,
+    add_recipe_async,
+    add_recipes_bulk,
+    MAX_BULK_RECIPES,
+    get_recipe_by_id_cached,
+    get_recipe_version,
+    get_recipe_version_async,
+    get_page_fingerprint,
+    update_recipe_async,
+    RecipeVersionConflict,
+    delete_recipe_async,
+    find_similar_recipes_async,
+    get_recipes_page_cached,
+    get_recipe_summaries_page_cached,
+    iter_recipes_ndjson,
+    search_recipes_by_pantry,
+    search_recipes,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+from .recipes_schemas import (
+    PantrySearchRequest,
+    PantrySearchResponse,
+    RecipeBulkCreateResponse,
+    RecipeCreate,
+    RecipeOut,
+    RecipePage,
+    RecipeSearchPage,
+    RecipeSummaryPage,
+    RecipeUpdate,
 )
-from .recipes_schemas import RecipeCreate, RecipeOut, RecipeUpdate
 from .ai_schemas import (
+    GenerateRecipesBatchItem,
+    GenerateRecipesBatchResponse,
     GenerateRecipesResponse,
     GeneratedRecipe,
     GenerateRecipesRequest,
+    GenerationJobOut,
 )
 from shared.auth import require_auth
+from shared.rate_limit import AdmissionController
 from authentication.auth_schemas import AuthenticatedUser
 
-from recipes.ai_api import generate_recipes_with_gemini
+from recipes.ai_api import (
+    MAX_GENERATE_BATCH,
+    RecipeGenerator,
+    SIMILAR_RECIPES_COUNT,
+    SIMILAR_RECIPES_MIN_SCORE,
+    generation_client,
+    get_generation_limiter,
+    get_recipe_generator,
+    request_key,
+    time_bucket,
+)
+from recipes.ai_jobs import GenerationJobs, get_generation_jobs
+from recipes.ai_stream import sse_event
 
 
 recipes_router = APIRouter(prefix="/api/recipes", tags=["recipes"])
@@ -28,36 +80,357 @@ recipes_router = APIRouter(prefix="/api/recipes", tags=["recipes"])
 ai_router = APIRouter(prefix="/api", tags=["ai"])
 
 
-# POST /api/generate: Generate recipes using Gemini API
-@ai_router.post("/generate", response_model=GenerateRecipesResponse)
-async def endpoint_generate_recipes(request: GenerateRecipesRequest):
+async def admit_generation(
+    request: Request,
+    limiter: AdmissionController = Depends(get_generation_limiter),
+) -> AsyncIterator[None]:
+    """
+    Dependency of the generation endpoints: 429 when the caller is over
+    its rate, 503 when too many generation requests are in flight.
+    """
+    key, limit = generation_client(request)
+    limiter.admit(key, limit)
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+async def similar_saved_recipes(
+    session: AsyncSession, request: GenerateRecipesRequest
+) -> list[GeneratedRecipe]:
+    """
+    Saved recipes that fit the request well enough to skip the model, or
+    an empty list when there are too few of them.
+    """
+    try:
+        recipes = await find_similar_recipes_async(
+            session,
+            request.ingredients,
+            request.max_time,
+            SIMILAR_RECIPES_COUNT,
+            SIMILAR_RECIPES_MIN_SCORE,
+        )
+    except SQLAlchemyError as e:
+        print("[WARN] Similar recipe lookup failed:", e)
+        return []
+    return recipes if len(recipes) >= SIMILAR_RECIPES_COUNT else []
+
+
+# POST /api/generate: Generate recipes using Gemini API. Saved recipes that
+# already fit the pantry and time limit are returned instead when there are
+# enough of them (saved=true).
+@ai_router.post(
+    "/generate",
+    response_model=GenerateRecipesResponse,
+    dependencies=[Depends(admit_generation)],
+)
+async def endpoint_generate_recipes(
+    request: GenerateRecipesRequest,
+    generator: RecipeGenerator = Depends(get_recipe_generator),
+    session: AsyncSession = Depends(get_async_session),
+):
     print(request.ingredients)
     print(request.max_time)
+    if saved := await similar_saved_recipes(session, request):
+        return GenerateRecipesResponse(recipes=saved, saved=True)
     try:
-        recipes_data = generate_recipes_with_gemini(
-            request.ingredients, request.max_time
-        )
-        recipes = [
-            GeneratedRecipe.model_validate(recipe) for recipe in recipes_data
-        ]
-        return GenerateRecipesResponse(recipes=recipes)
+        return await generator.generate(request.ingredients, request.max_time)
+    except HTTPException:
+        raise  # timeouts and open breakers keep their 504/503
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@recipes_router.get("")
-def endpoint_get_all_recipes(session: Session = Depends(get_session)):
-    return get_all_recipes(session)
+# POST /api/generate/batch: /api/generate for a list of pantries at once.
+# Identical entries are answered once, the rest are generated concurrently
+# (the generator's concurrency limit still applies). Each result has either
+# a response or the error for that entry, so one failure does not fail the
+# batch.
+@ai_router.post(
+    "/generate/batch",
+    response_model=GenerateRecipesBatchResponse,
+    dependencies=[Depends(admit_generation)],
+)
+async def endpoint_generate_recipes_batch(
+    requests: list[GenerateRecipesRequest],
+    http_request: Request,
+    generator: RecipeGenerator = Depends(get_recipe_generator),
+    session: AsyncSession = Depends(get_async_session),
+    limiter: AdmissionController = Depends(get_generation_limiter),
+):
+    if len(requests) > MAX_GENERATE_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_GENERATE_BATCH} pantries per request",
+        )
+    # same key as the generation cache, so pantries whose time limits
+    # share a bucket are generated once
+    keys = [
+        request_key(request.ingredients, time_bucket(request.max_time))
+        for request in requests
+    ]
+    unique: dict[tuple, GenerateRecipesRequest] = {}
+    for key, request in zip(keys, requests):
+        # the saved-recipe lookup must fit every limit in the bucket
+        unique.setdefault(key, request.model_copy(update={"max_time": key[1]}))
+    answers: dict[tuple, GenerateRecipesBatchItem] = {}
+    to_generate: dict[tuple, GenerateRecipesRequest] = {}
+    # one session, so the saved-recipe lookups run one after another
+    for key, request in unique.items():
+        if saved := await similar_saved_recipes(session, request):
+            answers[key] = GenerateRecipesBatchItem(
+                response=GenerateRecipesResponse(recipes=saved, saved=True)
+            )
+        else:
+            to_generate[key] = request
+    # admission took one token, the other pantries cost one each; more
+    # than a full bucket could never be admitted, however long the wait
+    client_key, limit = generation_client(http_request)
+    if len(to_generate) > limit.burst:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"At most {math.floor(limit.burst)} pantries without saved "
+                "recipes per request"
+            ),
+        )
+    if len(to_generate) > 1:
+        limiter.charge(client_key, limit, len(to_generate) - 1)
+    results = await asyncio.gather(
+        *(
+            generator.generate(request.ingredients, request.max_time)
+            for request in to_generate.values()
+        ),
+        return_exceptions=True,
+    )
+    for key, result in zip(to_generate, results):
+        if isinstance(result, Exception):
+            answers[key] = GenerateRecipesBatchItem(error=str(result))
+        else:
+            answers[key] = GenerateRecipesBatchItem(response=result)
+    return GenerateRecipesBatchResponse(
+        results=[answers[key] for key in keys], unique=len(unique)
+    )
+
+
+# POST /api/generate/stream: same as /api/generate, as Server-Sent Events.
+# Sends a "recipe" event per recipe as soon as the model has written it,
+# then "done" (with the count and whether it came from the cache or saved
+# recipes), or "error" if generation failed part way.
+@ai_router.post("/generate/stream", dependencies=[Depends(admit_generation)])
+async def endpoint_generate_recipes_stream(
+    request: GenerateRecipesRequest,
+    generator: RecipeGenerator = Depends(get_recipe_generator),
+    session: AsyncSession = Depends(get_async_session),
+) -> StreamingResponse:
+    saved = await similar_saved_recipes(session, request)
+
+    async def events():
+        if saved:
+            for recipe in saved:
+                yield sse_event("recipe", recipe.model_dump(exclude_none=True))
+            done = {"count": len(saved), "cached": False, "saved": True}
+            yield sse_event("done", done)
+            return
+        count = 0
+        from_cache = False
+        try:
+            async for recipe, from_cache in generator.stream(
+                request.ingredients, request.max_time
+            ):
+                count += 1
+                yield sse_event("recipe", recipe.model_dump(exclude_none=True))
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        done = {"count": count, "cached": from_cache, "saved": False}
+        yield sse_event("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# POST /api/generate/jobs: same as /api/generate, but returns a queued job
+# at once instead of waiting for the model. Poll
+# GET /api/generate/jobs/{job_id} until it has succeeded or failed.
+@ai_router.post(
+    "/generate/jobs",
+    response_model=GenerationJobOut,
+    status_code=202,
+    dependencies=[Depends(admit_generation)],
+)
+async def endpoint_submit_generation_job(
+    request: GenerateRecipesRequest,
+    jobs: GenerationJobs = Depends(get_generation_jobs),
+):
+    return await jobs.submit(request.ingredients, request.max_time)
+
+
+# GET /api/generate/jobs/{job_id}: status, and the recipes once done
+@ai_router.get("/generate/jobs/{job_id}", response_model=GenerationJobOut)
+async def endpoint_get_generation_job(
+    job_id: str,
+    jobs: GenerationJobs = Depends(get_generation_jobs),
+):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# DELETE /api/generate/jobs/{job_id}: cancel a queued or running job
+@ai_router.delete("/generate/jobs/{job_id}", response_model=GenerationJobOut)
+async def endpoint_cancel_generation_job(
+    job_id: str,
+    jobs: GenerationJobs = Depends(get_generation_jobs),
+):
+    job = await jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# GET /api/generate/stats: generation counters, cache hit rate and
+# admitted vs rejected requests
+@ai_router.get("/generate/stats")
+async def endpoint_generate_stats(
+    generator: RecipeGenerator = Depends(get_recipe_generator),
+    limiter: AdmissionController = Depends(get_generation_limiter),
+) -> dict:
+    return {**generator.stats(), "admission": limiter.stats()}
+
+
+def recipe_etag(version: int) -> str:
+    """ETag of a single recipe, derived from its version column."""
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    """
+    Return the recipe version an If-Match header asks for, or None when
+    the header is missing or "*". Raises HTTP 400 if it is malformed.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid If-Match")
+    return int(value)
+
+
+def page_etag(fingerprint: str) -> str:
+    """ETag of one page of a list endpoint, from get_page_fingerprint."""
+    return f'W/"{fingerprint}"'
+
+
+def not_modified(
+    if_none_match: str | None, etag: str, response: Response
+) -> Response | None:
+    """
+    Set the ETag header on response. Return a 304 response if the
+    If-None-Match header already names that ETag, else None.
+    """
+    response.headers["ETag"] = etag
+    if if_none_match is None:
+        return None
+    bare = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == bare:
+            return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+# GET /api/recipes?limit=20&cursor=...: one page of recipes, newest first.
+# Pass next_cursor from the response as cursor to get the next page.
+# Every list endpoint sends an ETag and answers If-None-Match with 304.
+@recipes_router.get("", response_model=RecipePage)
+def endpoint_get_all_recipes(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    session: Session = Depends(get_session),
+):
+    try:
+        fingerprint = get_page_fingerprint(session, "full", limit, cursor)
+        etag = page_etag(fingerprint)
+        if cached := not_modified(if_none_match, etag, response):
+            return cached
+        return get_recipes_page_cached(
+            session, limit, cursor, fingerprint=fingerprint
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# GET /api/recipes/summary: same paging as above, but only the fields the
+# browse grid needs plus ingredient and step counts
+@recipes_router.get("/summary", response_model=RecipeSummaryPage)
+def endpoint_get_recipe_summaries(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    session: Session = Depends(get_session),
+):
+    try:
+        fingerprint = get_page_fingerprint(session, "summary", limit, cursor)
+        etag = page_etag(fingerprint)
+        if cached := not_modified(if_none_match, etag, response):
+            return cached
+        return get_recipe_summaries_page_cached(
+            session, limit, cursor, fingerprint=fingerprint
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# GET /api/recipes/search?q=garlic pasta: ranked full-text search over
+# titles, ingredients and instructions
+@recipes_router.get("/search", response_model=RecipeSearchPage)
+def endpoint_search_recipes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    session: Session = Depends(get_session),
+) -> RecipeSearchPage:
+    return search_recipes(session, q, limit, offset)
+
+
+# GET /api/recipes/export: stream the whole catalog as NDJSON, one recipe
+# per line. Declared before /{recipe_id} so "export" is not parsed as an id.
+@recipes_router.get("/export")
+def endpoint_export_recipes(
+    auth_user: AuthenticatedUser = Depends(require_auth),
+) -> StreamingResponse:
+    # The stream outlives the request handler, so it opens (and closes)
+    # its own session instead of using the get_session dependency.
+    def export_lines() -> Iterator[str]:
+        with SessionLocal() as session:
+            yield from iter_recipes_ndjson(session)
+
+    return StreamingResponse(
+        export_lines(),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": 'attachment; filename="recipes.ndjson"'
+        },
+    )
 
 
 # Save recipe from AI results
 @recipes_router.post("", response_model=RecipeOut)
 async def endpoint_new_recipe(
     recipe: RecipeCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
 ) -> RecipeOut:
-    return add_recipe(session, recipe, auth_user.user_id)
+    return await add_recipe_async(session, recipe, auth_user.user_id)
 
     # TODO: Decision discussion:
     # Using response_model in FastAPI is better than just using a type hint
@@ -75,36 +448,90 @@ async def endpoint_new_recipe(
     # clarity, validation, and documentation.
 
 
+# Save many recipes at once (e.g. a batch of AI generated recipes)
+@recipes_router.post("/bulk", response_model=RecipeBulkCreateResponse)
+def endpoint_new_recipes_bulk(
+    recipes: list[RecipeCreate],
+    session: Session = Depends(get_session),
+    auth_user: AuthenticatedUser = Depends(require_auth),
+) -> RecipeBulkCreateResponse:
+    if len(recipes) > MAX_BULK_RECIPES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BULK_RECIPES} recipes per request",
+        )
+    recipe_ids = add_recipes_bulk(session, recipes, auth_user.user_id)
+    return RecipeBulkCreateResponse(
+        created=len(recipe_ids), recipe_ids=recipe_ids
+    )
+
+
+# Rank saved recipes by how much of the pantry they use, no AI call needed
+@recipes_router.post("/pantry-search", response_model=PantrySearchResponse)
+def endpoint_pantry_search(
+    search: PantrySearchRequest, session: Session = Depends(get_session)
+) -> PantrySearchResponse:
+    results = search_recipes_by_pantry(
+        session,
+        search.ingredients,
+        max_missing=search.max_missing,
+        max_time=search.max_time,
+        limit=search.limit,
+    )
+    return PantrySearchResponse(results=results)
+
+
+# The ETag is the recipe version, so If-None-Match is answered from a
+# single-column lookup without loading the ingredients and instructions
 @recipes_router.get("/{recipe_id}", response_model=RecipeOut)
 def endpoint_get_recipe_by_id(
-    recipe_id: int, session: Session = Depends(get_session)
-) -> RecipeOut:
-    recipe = get_recipe_by_id(session, recipe_id)
+    recipe_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    session: Session = Depends(get_session),
+):
+    version = get_recipe_version(session, recipe_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if cached := not_modified(if_none_match, recipe_etag(version), response):
+        return cached
+    recipe = get_recipe_by_id_cached(session, recipe_id, version)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return recipe
 
 
 # Update a recipe by ID
+# Send If-Match: "<version>" to reject the edit with 412 when someone else
+# saved the recipe since it was loaded.
 @recipes_router.put("/{recipe_id}", response_model=RecipeOut)
 async def endpoint_update_recipe(
     recipe_id: int,
     update: RecipeUpdate,
-    session: Session = Depends(get_session),
+    response: Response,
+    if_match: str | None = Header(None),
+    session: AsyncSession = Depends(get_async_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
 ) -> RecipeOut:
     # Convert Pydantic model to dict, skipping unset fields
     update_data = update.model_dump(exclude_unset=True)
-    print("[DEBUG] update_data:", update_data)
+    expected_version = parse_if_match(if_match)
     try:
-        # update_recipe expects only 3 arguments: session, recipe_id,
-        # update_data
-        updated_recipe = update_recipe(
-            session, recipe_id, update_data, auth_user.user_id
+        updated_recipe = await update_recipe_async(
+            session,
+            recipe_id,
+            update_data,
+            auth_user.user_id,
+            expected_version=expected_version,
         )
         if not updated_recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
+        response.headers["ETag"] = recipe_etag(updated_recipe.version)
         return updated_recipe
+    except HTTPException:
+        raise
+    except RecipeVersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         import traceback
 
@@ -117,15 +544,14 @@ async def endpoint_update_recipe(
 @recipes_router.delete("/{recipe_id}")
 async def endpoint_delete_recipe_by_id(
     recipe_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
 ):
-    recipe = get_recipe_by_id(session, recipe_id)
-    if not recipe:
+    if await get_recipe_version_async(session, recipe_id) is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     try:
 
-        delete_recipe(session, recipe_id, auth_user.user_id)
+        await delete_recipe_async(session, recipe_id, auth_user.user_id)
         return {"detail": "Recipe deleted successfully"}
     except Exception as e:
         import traceback
@@ -136,11 +562,51 @@ async def endpoint_delete_recipe_by_id(
 
 
 # Get all recipes for a specific user
-@recipes_router.get("/user/{user_id}", response_model=list[RecipeOut])
+@recipes_router.get("/user/{user_id}", response_model=RecipePage)
 def endpoint_get_recipes_by_user(
     user_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
     session: Session = Depends(get_session),
     auth_user: AuthenticatedUser = Depends(require_auth),
 ):
+    try:
+        fingerprint = get_page_fingerprint(
+            session, "full", limit, cursor, user_id
+        )
+        etag = page_etag(fingerprint)
+        if cached := not_modified(if_none_match, etag, response):
+            return cached
+        return get_recipes_page_cached(
+            session, limit, cursor, user_id, fingerprint
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-    return get_recipes_by_user(session, user_id)
+@recipes_router.get(
+    "/user/{user_id}/summary", response_model=RecipeSummaryPage
+)
+def endpoint_get_recipe_summaries_by_user(
+    user_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    session: Session = Depends(get_session),
+    auth_user: AuthenticatedUser = Depends(require_auth),
+):
+    try:
+        fingerprint = get_page_fingerprint(
+            session, "summary", limit, cursor, user_id
+        )
+        etag = page_etag(fingerprint)
+        if cached := not_modified(if_none_match, etag, response):
+            return cached
+        return get_recipe_summaries_page_cached(
+            session, limit, cursor, user_id, fingerprint
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -34,13 +34,53 @@ class RecipeCreate(BaseSchema):
     instructions: List[InstructionCreate]
 
 
+# "what can I cook with what I have" search over saved recipes
+class PantrySearchRequest(BaseSchema):
+    ingredients: List[str]
+    max_missing: Optional[int] = Field(None, ge=0)
+    max_time: Optional[int] = Field(None, gt=0)
+    limit: int = Field(20, ge=1, le=100)
+
+
+class PantryMatch(BaseSchema):
+    recipe_id: int
+    title: str
+    image_url: Optional[str]
+    total_time: int
+    have: List[str]
+    missing: List[str]
+
+
+class PantrySearchResponse(BaseSchema):
+    results: List[PantryMatch]
+
+
+# result of POST /api/recipes/bulk, ids are in the order of the payload
+class RecipeBulkCreateResponse(BaseSchema):
+    created: int
+    recipe_ids: List[int]
+
+
+# ingredients and instructions in an update may carry the id of the row
+# they edit, rows without an id are matched by name / step_number
+class IngredientUpdate(BaseSchema):
+    id: Optional[int] = None
+    name: str
+
+
+class InstructionUpdate(BaseSchema):
+    id: Optional[int] = None
+    step_text: str
+    step_number: int
+
+
 # when user updates an existing recipe
 class RecipeUpdate(BaseSchema):
     title: Optional[str] = None
     image_url: Optional[str] = None
     total_time: Optional[int] = Field(None, gt=0)
-    ingredients: Optional[List[IngredientCreate]] = None
-    instructions: Optional[List[InstructionCreate]] = None
+    ingredients: Optional[List[IngredientUpdate]] = None
+    instructions: Optional[List[InstructionUpdate]] = None
 
 
 # returning recipe data back to client
@@ -50,10 +90,41 @@ class RecipeOut(BaseSchema):
     title: str
     image_url: Optional[str]
     total_time: int
+    version: int
     ingredients: List[IngredientOut]
     instructions: List[InstructionOut]
 
 
+# one page of recipes for the list endpoints, next_cursor is None on the
+# last page
+class RecipePage(BaseSchema):
+    items: List[RecipeOut]
+    next_cursor: Optional[str] = None
+
+
+# lightweight recipe for list views (browse grid, cookbook), without the
+# ingredient and instruction text
+class RecipeSummary(BaseSchema):
+    id: int
+    user_id: int
+    title: str
+    image_url: Optional[str]
+    total_time: int
+    ingredient_count: int
+    step_count: int
+
+
+class RecipeSummaryPage(BaseSchema):
+    items: List[RecipeSummary]
+    next_cursor: Optional[str] = None
+
+
+# full-text search results, best match first
+class RecipeSearchPage(BaseSchema):
+    items: List[RecipeSummary]
+    next_offset: Optional[int] = None
+
+
 # RecipeCreate:
 # example json when user sends a request to create a recipe in frontend
 # {
@@ -0,0 +1,108 @@
+"""
+Full-text search over recipe titles, ingredient names and instructions.
+
+On Postgres every recipe row carries a search_vector tsvector (title
+weighted above ingredients above steps) with a GIN index on it. On SQLite,
+which the tests use, the same documents live in an FTS5 table keyed by
+recipe id. Both are created together with the recipes table (see
+recipes_models) and are refreshed by the write functions in recipes_db,
+inside their transaction.
+"""
+
+import re
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+_PG_REINDEX = text("""
+UPDATE recipes SET search_vector =
+    setweight(to_tsvector('english', title), 'A')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(name, ' ') FROM ingredients
+         WHERE ingredients.recipe_id = recipes.id), '')), 'B')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(step_text, ' ') FROM instructions
+         WHERE instructions.recipe_id = recipes.id), '')), 'C')
+WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+_PG_SEARCH = text("""
+SELECT id FROM recipes, websearch_to_tsquery('english', :q) AS query
+WHERE search_vector @@ query
+ORDER BY ts_rank(search_vector, query) DESC, id DESC
+LIMIT :limit OFFSET :offset
+""")
+
+_SQLITE_DELETE = text(
+    "DELETE FROM recipes_fts WHERE rowid IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+_SQLITE_INSERT = text("""
+INSERT INTO recipes_fts (rowid, title, ingredients, steps)
+SELECT id, title,
+    coalesce((SELECT group_concat(name, ' ') FROM ingredients
+              WHERE ingredients.recipe_id = recipes.id), ''),
+    coalesce((SELECT group_concat(step_text, ' ') FROM instructions
+              WHERE instructions.recipe_id = recipes.id), '')
+FROM recipes WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+# bm25 weights per column: title, ingredients, steps
+_SQLITE_SEARCH = text("""
+SELECT rowid AS id FROM recipes_fts
+WHERE recipes_fts MATCH :q
+ORDER BY bm25(recipes_fts, 10.0, 4.0, 1.0), rowid DESC
+LIMIT :limit OFFSET :offset
+""")
+
+
+def _dialect(session: Session) -> str:
+    return session.get_bind().dialect.name
+
+
+def reindex_recipes(session: Session, recipe_ids: list[int]) -> None:
+    """
+    Recompute the search documents of the given recipes from the rows in
+    the current transaction. Does not commit.
+    """
+    if not recipe_ids:
+        return
+    if _dialect(session) == "postgresql":
+        session.execute(_PG_REINDEX, {"ids": recipe_ids})
+    else:
+        session.execute(_SQLITE_DELETE, {"ids": recipe_ids})
+        session.execute(_SQLITE_INSERT, {"ids": recipe_ids})
+
+
+def unindex_recipe(session: Session, recipe_id: int) -> None:
+    """
+    Drop a recipe's search document. Only needed on SQLite, on Postgres it
+    goes away with the recipe row. Does not commit.
+    """
+    if _dialect(session) != "postgresql":
+        session.execute(_SQLITE_DELETE, {"ids": [recipe_id]})
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every word so user input can't use FTS5 query syntax, and let
+    # the last word match as a prefix for search-as-you-type
+    words = re.findall(r"\w+", q)
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_recipe_ids(
+    session: Session, q: str, limit: int, offset: int = 0
+) -> list[int]:
+    """
+    Return ids of recipes matching q, best match first.
+    """
+    params = {"limit": limit, "offset": offset}
+    if _dialect(session) == "postgresql":
+        if not q.strip():
+            return []
+        return list(session.scalars(_PG_SEARCH, {"q": q, **params}))
+    fts_query = _fts5_query(q)
+    if not fts_query:
+        return []
+    return list(session.scalars(_SQLITE_SEARCH, {"q": fts_query, **params}))
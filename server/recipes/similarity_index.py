@@ -0,0 +1,251 @@
+"""
+Similarity index over the ingredient sets of saved recipes.
+
+Every recipe is a hashed-feature vector: each normalized ingredient name,
+and at half weight each word in it ("chicken breast" also counts as
+"chicken" and "breast"), is hashed to one of SIMILARITY_DIMENSIONS columns
+with a hashed sign, and the row is L2-normalized. A pantry is encoded the
+same way, so one matrix-vector product gives the cosine similarity of the
+pantry to every recipe.
+
+Used by /api/generate to answer from saved recipes before asking the
+model. Like the ingredient index it is built from the database on first
+use, kept up to date by the write functions in recipes_db, and each worker
+process keeps its own copy, reloaded when catalog_state shows other
+workers' writes (checked at most every INDEX_REFRESH_SECONDS). Building it
+takes seconds for a large catalog and every search is a matrix product,
+so async code does both in a thread.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Callable
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .ingredient_index import (
+    INDEX_REFRESH_SECONDS,
+    catalog_state,
+    normalize_ingredient,
+)
+from .recipes_models import DBRecipe, DBIngredient
+
+SIMILARITY_DIMENSIONS = int(os.getenv("SIMILARITY_DIMENSIONS", "256"))
+WORD_WEIGHT = 0.5
+
+# every (recipe, ingredient) pair the index is built from
+LOAD_STATEMENT = select(
+    DBRecipe.id, DBRecipe.total_time, DBIngredient.name
+).join(DBIngredient, DBIngredient.recipe_id == DBRecipe.id)
+
+
+@functools.lru_cache(maxsize=65536)
+def _feature(token: str, dimensions: int) -> tuple[int, float]:
+    digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dimensions, 1.0 if value >> 63 else -1.0
+
+
+def ingredient_vector(
+    names: list[str], dimensions: int = SIMILARITY_DIMENSIONS
+) -> np.ndarray:
+    """Unit-length hashed-feature vector of a set of ingredient names."""
+    weights: dict[str, float] = {}
+    for name in names:
+        term = normalize_ingredient(name)
+        if not term:
+            continue
+        weights[term] = 1.0
+        for word in term.split():
+            if word != term:
+                weights.setdefault(word, WORD_WEIGHT)
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token, weight in weights.items():
+        column, sign = _feature(token, dimensions)
+        vector[column] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarityIndex:
+    """
+    Rows of recipe vectors in a growable matrix. Deleted recipes leave a
+    free row that the next insert reuses.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = SIMILARITY_DIMENSIONS,
+        refresh_seconds: float = INDEX_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.dimensions = dimensions
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        # -1 marks a free row so it never passes the max_time filter
+        self._total_time = np.zeros(0, dtype=np.int64)
+        self._row_of: dict[int, int] = {}
+        self._free: list[int] = []
+        self._size = 0
+        # catalog_state the contents were read at, and when it was checked
+        self._state: tuple | None = None
+        self._checked_at = 0.0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def load(self, session: Session) -> None:
+        """(Re)build the whole index from the database."""
+        # read before the rows: a write committed while they are read, and
+        # missed here, changes the state and is loaded at the next check
+        state = catalog_state(session)
+        self.load_rows(session.execute(LOAD_STATEMENT).all(), state)
+
+    def load_rows(self, rows, state: tuple | None = None) -> None:
+        """
+        (Re)build the whole index from rows of LOAD_STATEMENT, read after
+        catalog_state returned state. Builds every vector, so async callers
+        run it in a thread.
+        """
+        ingredients: dict[int, list[str]] = {}
+        total_time: dict[int, int] = {}
+        for row in rows:
+            ingredients.setdefault(row.id, []).append(row.name)
+            total_time[row.id] = row.total_time
+        self.load_recipes(
+            (
+                (recipe_id, names, total_time[recipe_id])
+                for recipe_id, names in ingredients.items()
+            ),
+            state,
+        )
+
+    def load_recipes(self, recipes, state: tuple | None = None) -> None:
+        """
+        Replace the contents with (recipe_id, names, total_time)s. Without
+        a state the next check reloads from the database.
+        """
+        recipes = list(recipes)
+        vectors = np.zeros((len(recipes), self.dimensions), dtype=np.float32)
+        for row, (_, names, _) in enumerate(recipes):
+            vectors[row] = ingredient_vector(names, self.dimensions)
+        with self._lock:
+            self._vectors = vectors
+            self._ids = np.array([r[0] for r in recipes], dtype=np.int64)
+            self._total_time = np.array(
+                [r[2] for r in recipes], dtype=np.int64
+            )
+            self._row_of = {r[0]: row for row, r in enumerate(recipes)}
+            self._free = []
+            self._size = len(recipes)
+            self._state = state
+            self._checked_at = self._clock()
+            self.loaded = True
+
+    def refresh_due(self) -> bool:
+        """Whether to check catalog_state for other workers' writes."""
+        return (
+            not self.loaded
+            or self._clock() - self._checked_at >= self.refresh_seconds
+        )
+
+    def is_current(self, state: tuple) -> bool:
+        """
+        Whether the index was loaded at catalog_state state; the next
+        check is due refresh_seconds from now.
+        """
+        self._checked_at = self._clock()
+        return self.loaded and state == self._state
+
+    def ensure_loaded(self, session: Session) -> None:
+        """
+        Load on first use, and reload when a check (at most every
+        refresh_seconds) finds the catalog changed since the last load.
+        """
+        if not self.refresh_due():
+            return
+        state = catalog_state(session)
+        if not self.is_current(state):
+            self.load_rows(session.execute(LOAD_STATEMENT).all(), state)
+
+    # Updates before the first load are skipped, load reads them from the
+    # database anyway
+    def add(self, recipe_id: int, names: list[str], total_time: int) -> None:
+        """Index a recipe, replacing what was indexed for it before."""
+        vector = ingredient_vector(names, self.dimensions)
+        with self._lock:
+            if not self.loaded:
+                return
+            row = self._row_of.get(recipe_id)
+            if row is None:
+                row = self._free.pop() if self._free else self._append_row()
+                self._row_of[recipe_id] = row
+            self._vectors[row] = vector
+            self._ids[row] = recipe_id
+            self._total_time[row] = total_time
+
+    def remove(self, recipe_id: int) -> None:
+        with self._lock:
+            row = self._row_of.pop(recipe_id, None)
+            if row is None:
+                return
+            self._vectors[row] = 0
+            self._total_time[row] = -1
+            self._free.append(row)
+
+    def _append_row(self) -> int:
+        if self._size == len(self._vectors):
+            capacity = max(64, 2 * len(self._vectors))
+            vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            vectors[: self._size] = self._vectors[: self._size]
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[: self._size] = self._ids[: self._size]
+            total_time = np.full(capacity, -1, dtype=np.int64)
+            total_time[: self._size] = self._total_time[: self._size]
+            self._vectors, self._ids, self._total_time = (
+                vectors,
+                ids,
+                total_time,
+            )
+        self._size += 1
+        return self._size - 1
+
+    def search(
+        self,
+        pantry: list[str],
+        max_time: int | None = None,
+        limit: int = 3,
+        min_score: float = 0.0,
+    ) -> list[tuple[int, float]]:
+        """
+        Up to limit (recipe_id, cosine similarity) pairs for recipes within
+        max_time scoring above 0 and at least min_score, most similar first.
+        """
+        query = ingredient_vector(pantry, self.dimensions)
+        with self._lock:
+            size = self._size
+            if not size or not query.any():
+                return []
+            scores = self._vectors[:size] @ query
+            total_time = self._total_time[:size].copy()
+            ids = self._ids[:size].copy()
+        # recipes sharing nothing with the pantry score about 0
+        eligible = (scores > 0) & (scores >= min_score) & (total_time >= 0)
+        if max_time is not None:
+            eligible &= total_time <= max_time
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(ids[row]), float(scores[row])) for row in order]
+
+
+similarity_index = SimilarityIndex()
@@ -1,12 +1,22 @@
 from fastapi import Request, Depends, HTTPException
-from .database import get_session
-from sqlalchemy.orm import Session
-from authentication.auth_db import validate_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_session
+from authentication.auth_db import (
+    SESSION_LIFE_MINUTES,
+    validate_session_async,
+)
 from authentication.auth_schemas import AuthenticatedUser
+from authentication.session_cache import SESSION_REFRESH_MINUTES
+from authentication.signed_tokens import (
+    renewed_token,
+    revocations,
+    signed_tokens_enabled,
+    verify_token,
+)
 
 
-def require_auth(
-    request: Request, session: Session = Depends(get_session)
+async def require_auth(
+    request: Request, session: AsyncSession = Depends(get_async_session)
 ) -> AuthenticatedUser:
     """
     Dependency to get the authenticated user data from the session.
@@ -20,7 +30,12 @@ def require_auth(
     if not username or not session_token or not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    is_valid = validate_session(session, username, session_token)
+    if signed_tokens_enabled():
+        return await require_signed_token(
+            request, session, username, session_token, user_id
+        )
+
+    is_valid = await validate_session_async(session, username, session_token)
 
     if not is_valid:
         raise HTTPException(
@@ -28,3 +43,34 @@ def require_auth(
         )
 
     return AuthenticatedUser(username=username, user_id=user_id)
+
+
+async def require_signed_token(
+    request: Request,
+    session: AsyncSession,
+    username: str,
+    session_token: str,
+    user_id: int,
+) -> AuthenticatedUser:
+    """
+    require_auth for signed session tokens: checked against the signature
+    and the in-memory revocation list, the database is only read when the
+    list is due for a reload.
+    """
+    await revocations.refresh_if_due(session)
+    claims = verify_token(session_token)
+    if (
+        claims is None
+        or claims.username != username
+        or claims.user_id != user_id
+        or revocations.is_revoked(claims)
+    ):
+        raise HTTPException(
+            status_code=403, detail="Invalid or expired session"
+        )
+    renewed = renewed_token(
+        claims, SESSION_LIFE_MINUTES * 60, SESSION_REFRESH_MINUTES * 60
+    )
+    if renewed is not None:
+        request.session["session_token"] = renewed
+    return AuthenticatedUser(username=username, user_id=user_id)
@@ -0,0 +1,191 @@
+"""
+Read-through caching.
+
+A ReadThroughCache keeps a bounded in-process LRU tier (with TTL) in front
+of an optional shared CacheBackend. Values in the local tier are the
+pydantic models themselves; the shared tier stores their JSON so any
+key/value store can implement CacheBackend.
+
+Callers build keys from a version or fingerprint of what the value was
+read from (see recipes_cache), so a write gives the affected values new
+keys rather than invalidating anything. Entries under old keys are no
+longer looked up and age out by TTL (the LRU may evict them sooner).
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, TypeVar
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class CacheBackend(ABC):
+    """Interface for a cache shared between processes (Redis, memcached)."""
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        """Return the value for key, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        """Store value under key for ttl_seconds."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Dict-backed CacheBackend. Stands in for a shared store in tests and
+    single-process setups.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: dict[str, tuple[str, float | None]] = {}
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._data[key] = (value, self._clock() + ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with a size bound and a TTL per entry.
+    A max_size of 0 disables caching.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ReadThroughCache:
+    """
+    Local LRU tier plus an optional shared backend in front of a loader.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        backend: CacheBackend | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.local = LRUCache(max_size, ttl_seconds, clock)
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.loads = 0
+
+    def get_or_load(
+        self,
+        key: str,
+        model: type[ModelT],
+        loader: Callable[[], ModelT | None],
+    ) -> ModelT | None:
+        """
+        Return the cached value for key, or call loader and cache what it
+        returns. None results are not cached.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        if self.backend is not None:
+            raw = self.backend.get(key)
+            if raw is not None:
+                value = model.model_validate_json(raw)
+                self.local.set(key, value)
+                return value
+        self.loads += 1
+        value = loader()
+        if value is None:
+            return None
+        self.local.set(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value.model_dump_json(), self.ttl_seconds)
+        return value
+
+    def clear(self) -> None:
+        """Drop the local tier."""
+        self.local.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "size": len(self.local),
+            "hits": self.local.hits,
+            "misses": self.local.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "loads": self.loads,
+        }
@@ -1,14 +1,26 @@
 import os
-from sqlalchemy import create_engine
+import sys
+from sqlalchemy import Connection, Engine, create_engine, event, exc
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from dotenv import load_dotenv
+from .resilience import CircuitOpenError, circuit_breaker, time_left
 
 # Load environment variable from .env file
 # load environment variable from .env file
 success = load_dotenv()
 if not success:
-    print("Warning: .env file not found or couldn't be loaded.")
+    # stderr, so scripts that write data to stdout stay clean
+    print(
+        "Warning: .env file not found or couldn't be loaded.",
+        file=sys.stderr,
+    )
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -24,7 +36,84 @@ BUCKET_NAME = os.environ.get("BUCKET_NAME", "recipes-photos")
 REGION_NAME = os.environ.get("REGION_NAME", "auto")
 
 
-engine = create_engine(DATABASE_URL, echo=True)
+def to_async_url(url: str) -> str:
+    """
+    Database URL for the async engine. psycopg 3 does asyncio itself, so
+    Postgres URLs are used as-is; SQLite goes through aiosqlite.
+    """
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.removeprefix("sqlite://")
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url.removeprefix("postgresql://")
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", to_async_url(DATABASE_URL)
+)
+
+# Postgres cancels statements running longer than this. A transaction
+# started with less of its request's deadline left gets that instead.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+
+
+def connect_args(url: str) -> dict:
+    if url.startswith("postgresql"):
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+def limit_statement_time(connection: Connection) -> None:
+    """
+    "begin" listener: shorten statement_timeout for this transaction when
+    the request's deadline is nearer than DB_STATEMENT_TIMEOUT_MS.
+    """
+    default = DB_STATEMENT_TIMEOUT_MS / 1000
+    left = time_left(default)
+    if left < default:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}"
+        )
+
+
+# Connection failures and cancelled statements trip the breaker; new
+# connections and statements fail fast while it is open
+db_breaker = circuit_breaker(
+    "database", failure_types=(exc.OperationalError, exc.TimeoutError)
+)
+
+
+# Every new connection and every statement is one call of db_breaker, so
+# the half-open probe is a single round trip, not a whole request that may
+# spend most of its time waiting on something else (the LLM)
+def _call_started(*args) -> None:
+    db_breaker.before_call()
+
+
+def _call_succeeded(*args) -> None:
+    db_breaker.after_call()
+
+
+def _call_failed(context: ExceptionContext) -> None:
+    if isinstance(context.original_exception, CircuitOpenError):
+        return  # refused, no call was started
+    db_breaker.after_call(
+        context.sqlalchemy_exception or context.original_exception
+    )
+
+
+def guard_with_breaker(engine: Engine) -> None:
+    """Count engine's connects and statements as db_breaker calls."""
+    event.listen(engine, "do_connect", _call_started)
+    event.listen(engine, "connect", _call_succeeded)
+    event.listen(engine, "before_cursor_execute", _call_started)
+    event.listen(engine, "after_cursor_execute", _call_succeeded)
+    event.listen(engine, "handle_error", _call_failed)
+
+
+engine = create_engine(
+    DATABASE_URL, echo=True, connect_args=connect_args(DATABASE_URL)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -32,3 +121,26 @@ def get_session() -> Generator[Session, None, None]:
     """Dependency to get database session."""
     with SessionLocal() as session:
         yield session
+
+
+# Async engine for async def endpoints, so their queries await the database
+# instead of blocking the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=connect_args(ASYNC_DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+guard_with_breaker(engine)
+guard_with_breaker(async_engine.sync_engine)
+if engine.dialect.name == "postgresql":
+    event.listen(engine, "begin", limit_statement_time)
+if async_engine.dialect.name == "postgresql":
+    event.listen(async_engine.sync_engine, "begin", limit_statement_time)
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session."""
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -0,0 +1,86 @@
+"""
+Versioned schema migrations.
+
+Each module in the migrations package is one migration, named
+NNNN_description.py, with an upgrade(connection) function. They run in
+name order, each in its own transaction, and the applied names are
+recorded in the schema_migrations table so every migration runs once.
+
+Run pending migrations with `python -m data.migrate`; the API also runs
+them on startup unless RUN_MIGRATIONS_ON_STARTUP=false.
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    MetaData,
+    String,
+    Table,
+    select,
+    text,
+)
+
+# arbitrary constant so concurrent workers serialize on Postgres
+MIGRATION_LOCK_KEY = 4204204201
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(255), primary_key=True),
+    Column("applied_at", DateTime(), nullable=False, default=datetime.now),
+)
+
+
+def discover(package: str = "migrations") -> list[tuple[str, ModuleType]]:
+    """Return (name, module) for every migration, in the order to run."""
+    root = importlib.import_module(package)
+    names = sorted(
+        info.name
+        for info in pkgutil.iter_modules(root.__path__)
+        if info.name[:4].isdigit()
+    )
+    return [
+        (name, importlib.import_module(f"{package}.{name}")) for name in names
+    ]
+
+
+def applied_versions(engine: Engine) -> set[str]:
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def run_migrations(engine: Engine, package: str = "migrations") -> list[str]:
+    """
+    Apply every pending migration. Returns the names that were applied.
+    """
+    done = applied_versions(engine)
+    applied = []
+    for name, module in discover(package):
+        if name in done:
+            continue
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": MIGRATION_LOCK_KEY},
+                )
+                # another worker may have applied it while we waited
+                already = connection.scalar(
+                    select(schema_migrations.c.version).where(
+                        schema_migrations.c.version == name
+                    )
+                )
+                if already:
+                    continue
+            module.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(version=name))
+        print(f"Applied migration {name}")
+        applied.append(name)
+    return applied
@@ -0,0 +1,147 @@
+"""
+Token-bucket rate limiting and admission control.
+
+A token bucket holds up to burst tokens and refills at a steady rate; a
+call takes its cost in tokens or is refused with the time until enough
+have refilled. Buckets live in a RateLimitStore. InMemoryRateLimitStore
+keeps them in the process, so every worker limits on its own; a store
+shared by the workers (Redis running take() as a Lua script, say) can
+implement the interface instead.
+
+AdmissionController puts per-client buckets and a cap on concurrent calls
+in front of something expensive. Refusals are immediate HTTP errors with
+Retry-After (429 for a client over its rate, 503 when the server is at
+capacity) rather than more requests waiting in line.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from fastapi import HTTPException
+
+
+class RateLimit:
+    """Refill rate (tokens per minute) and size of a bucket."""
+
+    def __init__(self, per_minute: float, burst: float):
+        self.per_second = per_minute / 60
+        self.burst = burst
+
+
+class RateLimitStore(ABC):
+    """Interface for the storage of token buckets."""
+
+    @abstractmethod
+    def take(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """
+        Take cost tokens from the bucket under key, creating it full if
+        missing. Returns 0 when they were taken, otherwise the seconds
+        until they would be available (and takes nothing).
+        """
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Buckets in a dict. Beyond max_keys the least recently used bucket is
+    dropped, which only ever makes that client's bucket full again.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (tokens, time they were counted)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        with self._lock:
+            now = self._clock()
+            tokens, counted_at = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(
+                limit.burst, tokens + (now - counted_at) * limit.per_second
+            )
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / limit.per_second
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Rate limits per client key plus at most max_in_flight admitted calls
+    at a time. Use from one event loop; release() every admitted call.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        max_in_flight: int,
+        busy_retry_seconds: float = 1.0,
+    ):
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.busy_retry_seconds = busy_retry_seconds
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.over_capacity = 0
+
+    def admit(self, key: str, limit: RateLimit, cost: float = 1.0) -> None:
+        """
+        Take a slot and cost tokens from key's bucket, or raise 503 when
+        all slots are taken and 429 when the bucket is short.
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.over_capacity += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, try again shortly",
+                headers={
+                    "Retry-After": str(math.ceil(self.busy_retry_seconds))
+                },
+            )
+        self.charge(key, limit, cost)
+        self.in_flight += 1
+        self.admitted += 1
+
+    def charge(self, key: str, limit: RateLimit, cost: float) -> None:
+        """
+        Take cost more tokens from an admitted caller, or raise 429. A cost
+        above the bucket size takes the whole bucket.
+        """
+        wait = self.store.take(key, limit, min(cost, limit.burst))
+        if wait > 0:
+            self.rate_limited += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "over_capacity": self.over_capacity,
+            "rejected": self.rate_limited + self.over_capacity,
+            "in_flight": self.in_flight,
+        }
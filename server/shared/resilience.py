@@ -0,0 +1,220 @@
+"""
+Deadlines and circuit breakers for calls to upstream services.
+
+Every HTTP request gets a deadline (REQUEST_DEADLINE_SECONDS from when it
+arrives, see DeadlineMiddleware). Code about to call an upstream asks
+time_left() how long the call may take: the upstream's own timeout, or
+less when the request's deadline is nearer. Past the deadline it raises
+DeadlineExceeded (504) instead of starting the call. Outside a request
+(jobs, scripts) only the upstream timeouts apply.
+
+Each upstream (the LLM, S3, the database) has a CircuitBreaker. After
+BREAKER_FAILURE_THRESHOLD consecutive failures it opens and calls fail at
+once with CircuitOpenError (503 with Retry-After) instead of waiting on a
+service that is down. After BREAKER_RESET_SECONDS one probe call is let
+through (half-open): success closes the breaker, failure opens it again.
+
+Both errors are HTTPExceptions, so an endpoint that lets them through
+answers with the right status without handling them.
+"""
+
+import contextvars
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# time.monotonic() by which the current request must be answered
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, detail: str = "Request deadline exceeded"):
+        super().__init__(status_code=504, detail=detail)
+
+
+class CircuitOpenError(HTTPException):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is unavailable, try again shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Code in the block must finish within seconds, or sooner if an outer
+    deadline says so.
+    """
+    new = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left(timeout: float) -> float:
+    """
+    Seconds an upstream call may take: timeout, or what is left of the
+    current deadline if that is less. Raises DeadlineExceeded when the
+    deadline has passed.
+    """
+    current = _deadline.get()
+    if current is None:
+        return timeout
+    left = current - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(timeout, left)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving every HTTP request a deadline."""
+
+    def __init__(self, app, seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.seconds):
+            await self.app(scope, receive, send)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. Wrap each call in guard(), or call
+    before_call() and after_call() around it when the start and end are in
+    different places (event hooks); exceptions of failure_types count as
+    failures, other exceptions count for nothing. Thread safe, so sync
+    code in the threadpool can share it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+        failure_types: tuple[type[BaseException], ...] = (Exception,),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failure_types = failure_types
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run the block as one call, or raise CircuitOpenError."""
+        self.before_call()
+        try:
+            yield
+        except BaseException as e:
+            self.after_call(e)
+            raise
+        else:
+            self.after_call()
+
+    def before_call(self) -> None:
+        """Start a call, or raise CircuitOpenError. End it with after_call."""
+        self._acquire()
+
+    def after_call(self, error: BaseException | None = None) -> None:
+        """End a call started by before_call, with the error it raised."""
+        if error is None:
+            self._record(success=True)
+        elif isinstance(error, self.failure_types):
+            self._record(success=False)
+        else:
+            with self._lock:
+                self._probing = False
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                waited = self._clock() - self._opened_at
+                if waited < self.reset_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(
+                        self.name, self.reset_seconds - waited
+                    )
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # a probe that never reported back doesn't block forever
+                if (
+                    self._probing
+                    and self._clock() - self._probe_started
+                    < self.reset_seconds
+                ):
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 1)
+                self._probing = True
+                self._probe_started = self._clock()
+
+    def _record(self, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if (
+                self.state == HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+
+    def stats(self) -> dict:
+        """State and counters for monitoring."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """The process-wide breaker for an upstream, created on first use."""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, **kwargs)
+    return _breakers[name]
+
+
+def breaker_stats() -> dict[str, dict]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import subprocess
+import sys
+import pytest
+from recipes.ai_api import RecipeGenerator, build_prompt
+from recipes.ai_providers import (
+    FakeLLMClient,
+    LocalLLMClient,
+    create_llm_client,
+    template_recipes,
+)
+from recipes.ai_schemas import GeneratedRecipe
+
+
+def test_template_recipes_are_deterministic_and_valid():
+    prompt = build_prompt(["chicken", "rice", "peas"], 20)
+    assert template_recipes(prompt) == template_recipes(prompt)
+    recipes = [
+        GeneratedRecipe.model_validate(recipe)
+        for recipe in json.loads(template_recipes(prompt))
+    ]
+    assert len(recipes) == 3
+    for recipe in recipes:
+        assert 1 <= recipe.total_time <= 20
+        assert set(recipe.ingredients) == {"chicken", "rice", "peas"}
+    assert recipes[0].name == "Chicken Skillet"
+
+
+def test_provider_is_selected_by_config():
+    assert isinstance(create_llm_client("local"), LocalLLMClient)
+    with pytest.raises(ValueError):
+        create_llm_client("nope")
+
+
+def test_gemini_sdk_is_not_imported_at_startup():
+    code = "import main, sys; assert 'google.genai' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_calls_are_measured():
+    client = FakeLLMClient(latency=0.02)
+    generator = RecipeGenerator(client)
+
+    async def scenario():
+        await generator.generate(["egg"], 10)
+        async for _ in generator.stream(["rice"], 10):
+            pass
+
+    asyncio.run(scenario())
+    stats = generator.stats()["llm"]
+    assert stats["calls"] == 2
+    assert stats["avg_prompt_chars"] > 0
+    assert stats["avg_response_chars"] == len(client.response)
+    assert stats["latency"]["p50_ms"] >= 20
+    assert stats["first_chunk_latency"]["p50_ms"] is not None
+    assert stats["parse_failures"] == 0
+
+
+def test_parse_failures_are_counted():
+    generator = RecipeGenerator(FakeLLMClient(response="not json"))
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await generator.generate(["egg"], 10)
+        with pytest.raises(ValueError):
+            async for _ in generator.stream(["egg"], 10):
+                pass
+
+    asyncio.run(scenario())
+    assert generator.stats()["llm"]["parse_failures"] == 2
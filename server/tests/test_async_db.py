@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from authentication.auth_db import (
+    create_user_account_async,
+    get_user_by_username_async,
+    get_user_public_details_async,
+    invalidate_session_async,
+    update_user_async,
+    validate_session_async,
+    validate_username_password_async,
+)
+from recipes.recipes_db import (
+    add_recipe_async,
+    delete_recipe_async,
+    get_recipe_version_async,
+    update_recipe_async,
+)
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Import all models to register with SQLAlchemy metadata
+from recipes.recipes_models import DBRecipe, DBIngredient, DBInstruction
+from authentication.auth_models import DBUser
+
+USER_ID = 1
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database, so every connection aiosqlite opens sees the schema
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_user_session_lifecycle(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            assert await create_user_account_async(session, "ana", "pw", None)
+            user = await get_user_by_username_async(session, "ana")
+            assert (
+                await validate_username_password_async(session, user, "wrong")
+                is None
+            )
+            token = await validate_username_password_async(session, user, "pw")
+            assert await validate_session_async(session, "ana", token)
+
+            details = await update_user_async(session, "ana", "bea", None)
+            assert details.username == "bea"
+            assert await get_user_public_details_async(session, "ana") is None
+
+            await invalidate_session_async(session, "bea", token)
+            assert not await validate_session_async(session, "bea", token)
+
+    asyncio.run(scenario())
+
+
+def test_recipe_lifecycle(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            recipe = await add_recipe_async(
+                session,
+                RecipeCreate(
+                    title="Toast",
+                    total_time=5,
+                    ingredients=[IngredientCreate(name="Bread")],
+                    instructions=[
+                        InstructionCreate(step_text="Toast", step_number=1)
+                    ],
+                ),
+                USER_ID,
+            )
+            assert await get_recipe_version_async(session, recipe.id) == 1
+
+            updated = await update_recipe_async(
+                session, recipe.id, {"title": "Buttered toast"}, USER_ID
+            )
+            assert updated.title == "Buttered toast"
+            assert updated.version == 2
+
+            await delete_recipe_async(session, recipe.id, USER_ID)
+            assert await get_recipe_version_async(session, recipe.id) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import add_recipes_bulk, get_recipe_by_id
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def test_bulk_insert_keeps_children_with_their_recipe(session):
+    recipes = [
+        RecipeCreate(
+            title=f"Bulk {i}",
+            total_time=10 + i,
+            ingredients=[
+                IngredientCreate(name=f"Ingredient {i}a"),
+                IngredientCreate(name=f"Ingredient {i}b"),
+            ],
+            instructions=[
+                InstructionCreate(step_text=f"Step {i}", step_number=1)
+            ],
+        )
+        for i in range(3)
+    ]
+    recipe_ids = add_recipes_bulk(session, recipes, user_id=1)
+    assert len(recipe_ids) == 3
+
+    for i, recipe_id in enumerate(recipe_ids):
+        saved = get_recipe_by_id(session, recipe_id)
+        assert saved.title == f"Bulk {i}"
+        assert saved.total_time == 10 + i
+        assert sorted(ing.name for ing in saved.ingredients) == [
+            f"Ingredient {i}a",
+            f"Ingredient {i}b",
+        ]
+        assert saved.instructions[0].step_text == f"Step {i}"
+
+
+def test_bulk_insert_empty(session):
+    assert add_recipes_bulk(session, [], user_id=1) == []
@@ -0,0 +1,96 @@
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from shared.base_model import Base
+from shared.cache import InMemoryCacheBackend, LRUCache, ReadThroughCache
+from recipes.recipes_cache import recipe_cache
+from recipes.recipes_db import (
+    add_recipe,
+    get_recipe_by_id_cached,
+    get_recipe_summaries_page_cached,
+)
+from recipes.recipes_models import DBRecipe
+from recipes.recipes_schemas import IngredientOut, RecipeCreate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_lru_entries_expire():
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_read_through_loads_once():
+    cache = ReadThroughCache(max_size=10, ttl_seconds=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return IngredientOut(id=1, name="Eggs")
+
+    assert cache.get_or_load("k", IngredientOut, loader).name == "Eggs"
+    assert cache.get_or_load("k", IngredientOut, loader).name == "Eggs"
+    assert len(calls) == 1
+    assert cache.stats()["loads"] == 1
+
+
+def test_shared_backend_is_read_after_local_miss():
+    backend = InMemoryCacheBackend()
+    writer = ReadThroughCache(max_size=10, ttl_seconds=60, backend=backend)
+    reader = ReadThroughCache(max_size=10, ttl_seconds=60, backend=backend)
+    writer.get_or_load(
+        "k", IngredientOut, lambda: IngredientOut(id=1, name="A")
+    )
+    value = reader.get_or_load("k", IngredientOut, lambda: None)
+    assert value == IngredientOut(id=1, name="A")
+
+
+def test_recipe_cache_follows_the_version():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    recipe_cache.clear()
+    with sessionmaker(bind=engine)() as session:
+        recipe = add_recipe(
+            session,
+            RecipeCreate(
+                title="Soup", total_time=20, ingredients=[], instructions=[]
+            ),
+            1,
+        )
+        assert get_recipe_by_id_cached(session, recipe.id).title == "Soup"
+        page = get_recipe_summaries_page_cached(session)
+        assert page.items[0].title == "Soup"
+
+        # written by another process, which can't drop this one's entries
+        session.execute(
+            update(DBRecipe).values(title="Stew", version=DBRecipe.version + 1)
+        )
+        session.commit()
+        assert get_recipe_by_id_cached(session, recipe.id).title == "Stew"
+        page = get_recipe_summaries_page_cached(session)
+        assert page.items[0].title == "Stew"
+    recipe_cache.clear()
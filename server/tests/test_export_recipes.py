@@ -0,0 +1,49 @@
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import add_recipe, iter_recipes_ndjson
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def test_export_writes_one_line_per_recipe(session):
+    for i in range(5):
+        recipe = RecipeCreate(
+            title=f"Recipe {i}",
+            total_time=10,
+            ingredients=[IngredientCreate(name=f"Ingredient {i}")],
+            instructions=[InstructionCreate(step_text="Cook", step_number=1)],
+        )
+        add_recipe(session, recipe, user_id=1)
+
+    # batch size smaller than the catalog so several batches are read
+    lines = list(iter_recipes_ndjson(session, batch_size=2))
+    assert len(lines) == 5
+    assert all(line.endswith("\n") for line in lines)
+    recipes = [json.loads(line) for line in lines]
+    assert [r["title"] for r in recipes] == [f"Recipe {i}" for i in range(5)]
+    assert recipes[3]["ingredients"][0]["name"] == "Ingredient 3"
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import (
+    MAX_GENERATE_BATCH,
+    RecipeGenerator,
+    get_generation_limiter,
+    get_recipe_generator,
+)
+from recipes.ai_providers import FAKE_RECIPES, FakeLLMClient
+from recipes.recipes_router import ai_router
+from recipes.similarity_index import similarity_index
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import AdmissionController, InMemoryRateLimitStore
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    similarity_index.loaded = False
+
+    def make(generator: RecipeGenerator) -> TestClient:
+        app = FastAPI()
+        app.include_router(ai_router)
+        app.dependency_overrides[get_recipe_generator] = lambda: generator
+        app.dependency_overrides[get_async_session] = get_test_session
+        limiter = AdmissionController(InMemoryRateLimitStore(), 8)
+        app.dependency_overrides[get_generation_limiter] = lambda: limiter
+        return TestClient(app)
+
+    yield make
+    asyncio.run(engine.dispose())
+
+
+def refuse_mushrooms(prompt):
+    return "no" if "mushroom" in prompt else json.dumps(FAKE_RECIPES)
+
+
+def test_batch_dedupes_and_reports_errors_per_item(make_client):
+    llm_client = FakeLLMClient(response=refuse_mushrooms, latency=0.1)
+    generator = RecipeGenerator(llm_client, max_concurrency=2)
+    client = make_client(generator)
+    response = client.post(
+        "/api/generate/batch",
+        json=[
+            {"ingredients": ["egg", "milk"], "max_time": 20},
+            {"ingredients": ["Milk", "Eggs"], "max_time": 25},
+            {"ingredients": ["mushroom"], "max_time": 20},
+            {"ingredients": ["rice"], "max_time": 20},
+            {"ingredients": ["corn"], "max_time": 20},
+        ],
+    )
+    assert response.status_code == 200
+    body = response.json()
+    results = body["results"]
+    assert body["unique"] == 4
+    assert len(results) == 5
+    assert results[0] == results[1]
+    assert len(results[0]["response"]["recipes"]) == len(FAKE_RECIPES)
+    assert results[2]["response"] is None
+    assert "valid JSON" in results[2]["error"]
+    assert results[3]["error"] is None
+    assert llm_client.calls == 4
+    assert llm_client.peak_active == 2
+
+
+def test_batch_size_is_limited(make_client):
+    client = make_client(RecipeGenerator(FakeLLMClient()))
+    response = client.post(
+        "/api/generate/batch",
+        json=[{"ingredients": ["egg"], "max_time": 10}]
+        * (MAX_GENERATE_BATCH + 1),
+    )
+    assert response.status_code == 413
+
+
+def test_batch_larger_than_the_bucket_is_refused(make_client):
+    # anonymous callers have a bucket of 5: admission takes one token and
+    # the other four pantries one each
+    pantries = [
+        {"ingredients": [name], "max_time": 20}
+        for name in ["egg", "rice", "corn", "bean", "leek", "kale"]
+    ]
+    llm_client = FakeLLMClient()
+    client = make_client(RecipeGenerator(llm_client))
+    response = client.post("/api/generate/batch", json=pantries)
+    assert response.status_code == 400
+    assert llm_client.calls == 0
+
+    client = make_client(RecipeGenerator(llm_client))
+    response = client.post("/api/generate/batch", json=pantries[:5])
+    assert response.status_code == 200
+    assert llm_client.calls == 5
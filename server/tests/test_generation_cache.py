@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import RecipeGenerator, time_bucket
+from recipes.ai_providers import FakeLLMClient
+from recipes.ai_cache import GenerationCache
+from recipes.ai_models import DBGenerationCache
+from shared.base_model import Base
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_time_bucket():
+    assert time_bucket(3) == 3
+    assert time_bucket(10) == 10
+    assert time_bucket(44) == 30
+    assert time_bucket(1000) == 240
+
+
+def test_equivalent_pantries_hit_the_cache(session_factory):
+    client = FakeLLMClient()
+    cache = GenerationCache(session_factory)
+
+    async def scenario():
+        generator = RecipeGenerator(client, cache=cache)
+        first = await generator.generate(["Eggs", "flour", "milk"], 35)
+        second = await generator.generate(["milk", "FLOUR", "egg", "eggs"], 40)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert client.calls == 1
+    assert first.cached is False
+    assert second.cached is True
+    assert second.recipes == first.recipes
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_durable_tier_survives_restart(session_factory):
+    client = FakeLLMClient()
+
+    async def ask():
+        generator = RecipeGenerator(
+            client, cache=GenerationCache(session_factory)
+        )
+        response = await generator.generate(["rice"], 20)
+        return response, generator.cache
+
+    asyncio.run(ask())
+    response, cache = asyncio.run(ask())
+    assert client.calls == 1
+    assert response.cached is True
+    assert cache.stats()["db_hits"] == 1
+
+
+def test_entries_expire(session_factory):
+    client = FakeLLMClient()
+    clock = Clock()
+    cache = GenerationCache(session_factory, ttl_seconds=60, now=clock)
+
+    async def ask():
+        generator = RecipeGenerator(client, cache=cache)
+        return await generator.generate(["rice"], 20)
+
+    asyncio.run(ask())
+    clock.now += timedelta(seconds=30)
+    assert asyncio.run(ask()).cached is True
+    clock.now += timedelta(seconds=60)
+    assert asyncio.run(ask()).cached is False
+    assert client.calls == 2
+
+
+def test_table_keeps_most_recently_used_rows(session_factory):
+    client = FakeLLMClient()
+    clock = Clock()
+    cache = GenerationCache(session_factory, max_size=0, max_rows=2, now=clock)
+
+    async def ask(item):
+        clock.now += timedelta(seconds=1)
+        generator = RecipeGenerator(client, cache=cache)
+        return await generator.generate([item], 20)
+
+    async def row_count():
+        async with session_factory() as session:
+            return await session.scalar(
+                select(func.count()).select_from(DBGenerationCache)
+            )
+
+    asyncio.run(ask("rice"))
+    asyncio.run(ask("beans"))
+    asyncio.run(ask("rice"))  # touch rice so beans is the oldest
+    asyncio.run(ask("corn"))
+    assert asyncio.run(row_count()) == 2
+    assert asyncio.run(ask("rice")).cached is True
+    assert asyncio.run(ask("beans")).cached is False
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import RecipeGenerator, get_generation_limiter
+from recipes.ai_jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    SUCCEEDED,
+    GenerationJobs,
+    get_generation_jobs,
+)
+from recipes.ai_models import DBGenerationJob
+from recipes.ai_providers import FAKE_RECIPES, FakeLLMClient
+from recipes.recipes_router import ai_router
+from shared.base_model import Base
+from shared.rate_limit import AdmissionController, InMemoryRateLimitStore
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+async def wait_until_finished(jobs, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await jobs.get(job_id)
+        if job.status in (SUCCEEDED, FAILED, CANCELLED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def flaky_response(failures):
+    """Invalid JSON for the first failures calls, then the fake recipes."""
+    calls = []
+
+    def respond(prompt):
+        calls.append(prompt)
+        if len(calls) <= failures:
+            return "not json"
+        return json.dumps(FAKE_RECIPES)
+
+    return respond
+
+
+def test_job_runs_in_the_background(session_factory):
+    client = FakeLLMClient(latency=0.05)
+
+    async def scenario():
+        jobs = GenerationJobs(RecipeGenerator(client), session_factory)
+        await jobs.start()
+        submitted = await jobs.submit(["egg", "milk"], 20)
+        assert submitted.status == QUEUED
+        job = await wait_until_finished(jobs, submitted.id)
+        await jobs.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == SUCCEEDED
+    assert job.attempts == 1
+    assert job.result.model_dump(exclude_none=True)["recipes"] == (
+        FAKE_RECIPES
+    )
+    assert client.calls == 1
+
+
+def test_failed_attempts_are_retried(session_factory):
+    async def run(failures):
+        client = FakeLLMClient(response=flaky_response(failures))
+        jobs = GenerationJobs(
+            RecipeGenerator(client),
+            session_factory,
+            max_attempts=3,
+            retry_seconds=0.01,
+        )
+        await jobs.start()
+        submitted = await jobs.submit(["rice"], 20)
+        job = await wait_until_finished(jobs, submitted.id)
+        await jobs.stop()
+        return job, client.calls
+
+    job, calls = asyncio.run(run(failures=2))
+    assert job.status == SUCCEEDED
+    assert job.attempts == 3
+    assert calls == 3
+
+    job, calls = asyncio.run(run(failures=3))
+    assert job.status == FAILED
+    assert job.attempts == 3
+    assert "valid JSON" in job.error
+    assert calls == 3
+
+
+def test_cancel_queued_and_running_jobs(session_factory):
+    client = FakeLLMClient(latency=5)
+
+    async def scenario():
+        jobs = GenerationJobs(
+            RecipeGenerator(client), session_factory, workers=1
+        )
+        await jobs.start()
+        running = await jobs.submit(["egg"], 20)
+        queued = await jobs.submit(["rice"], 20)
+        await asyncio.sleep(0.1)
+        assert (await jobs.cancel(queued.id)).status == CANCELLED
+        assert (await jobs.cancel(running.id)).status == CANCELLED
+        # the worker moves on instead of waiting out the slow call
+        client.latency = 0
+        later = await jobs.submit(["corn"], 20)
+        job = await wait_until_finished(jobs, later.id)
+        await jobs.stop()
+        assert await jobs.cancel("missing") is None
+        return job, await jobs.get(running.id)
+
+    job, cancelled = asyncio.run(scenario())
+    assert job.status == SUCCEEDED
+    assert cancelled.status == CANCELLED
+    assert cancelled.result is None
+    assert client.calls == 2
+
+
+def test_queued_jobs_survive_a_restart(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            now = datetime.now()
+            session.add(
+                DBGenerationJob(
+                    id="left-over",
+                    status=QUEUED,
+                    ingredients=json.dumps(["egg"]),
+                    max_time=10,
+                    attempts=0,
+                    created_at=now,
+                    updated_at=now,
+                    run_after=now,
+                )
+            )
+            await session.commit()
+        jobs = GenerationJobs(
+            RecipeGenerator(FakeLLMClient()), session_factory
+        )
+        await jobs.start()
+        job = await wait_until_finished(jobs, "left-over")
+        await jobs.stop()
+        return job
+
+    assert asyncio.run(scenario()).status == SUCCEEDED
+
+
+def test_job_endpoints(session_factory):
+    jobs = GenerationJobs(RecipeGenerator(FakeLLMClient()), session_factory)
+
+    async def get_test_jobs():
+        await jobs.start()
+        return jobs
+
+    app = FastAPI()
+    app.include_router(ai_router)
+    app.dependency_overrides[get_generation_jobs] = get_test_jobs
+    limiter = AdmissionController(InMemoryRateLimitStore(), 8)
+    app.dependency_overrides[get_generation_limiter] = lambda: limiter
+
+    # the context manager keeps one event loop for the workers
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/generate/jobs", json={"ingredients": ["egg"], "max_time": 10}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        for _ in range(100):
+            job = client.get(f"/api/generate/jobs/{job_id}").json()
+            if job["status"] == SUCCEEDED:
+                break
+            time.sleep(0.01)
+        assert job["status"] == SUCCEEDED
+        assert len(job["result"]["recipes"]) == len(FAKE_RECIPES)
+
+        assert client.get("/api/generate/jobs/missing").status_code == 404
+        assert client.delete("/api/generate/jobs/missing").status_code == 404
+        response = client.delete(f"/api/generate/jobs/{job_id}")
+        assert response.json()["status"] == SUCCEEDED
+        client.portal.call(jobs.stop)
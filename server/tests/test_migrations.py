@@ -0,0 +1,84 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import search_recipes
+from recipes.recipes_models import DBRecipe
+from shared.migrations import run_migrations, discover
+
+
+def test_migrations_apply_once():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    names = [name for name, _ in discover()]
+    assert run_migrations(engine) == names
+    assert run_migrations(engine) == []
+
+    inspector = inspect(engine)
+    assert {"users", "recipes", "ingredients", "instructions"} <= set(
+        inspector.get_table_names()
+    )
+    index_names = {
+        index["name"] for index in inspector.get_indexes("instructions")
+    }
+    assert "ix_instructions_recipe_id_step_number" in index_names
+
+
+def test_migrations_adopt_baseline_schema():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    with engine.begin() as connection:
+        # the schema data/chefgpt.sql seeded before any migration existed
+        for statement in [
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, "
+            "username VARCHAR NOT NULL UNIQUE, hashed_password VARCHAR "
+            "NOT NULL, image_url VARCHAR, session_token VARCHAR, "
+            "session_expires_at DATETIME, created_at DATETIME NOT NULL, "
+            "updated_at DATETIME NOT NULL)",
+            "CREATE TABLE recipes (id INTEGER PRIMARY KEY, "
+            "user_id INTEGER NOT NULL REFERENCES users (id), "
+            "title VARCHAR NOT NULL, image_url VARCHAR, "
+            "total_time INTEGER NOT NULL, created_at DATETIME NOT NULL, "
+            "updated_at DATETIME NOT NULL)",
+            "INSERT INTO users VALUES "
+            "(1, 'ana', 'x', NULL, NULL, NULL, '2024-01-01', '2024-01-01')",
+            "INSERT INTO recipes VALUES "
+            "(1, 1, 'Soup', NULL, 20, '2024-01-01', '2024-01-01')",
+        ]:
+            connection.execute(text(statement))
+
+    run_migrations(engine)
+
+    with sessionmaker(bind=engine)() as session:
+        recipe = session.get(DBRecipe, 1)
+        assert recipe.version == 1
+        recipe.title = "Tomato soup"
+        session.commit()
+        assert recipe.version == 2
+
+
+def test_search_is_backfilled_for_existing_recipes():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    migrations = dict(discover())
+    with engine.begin() as connection:
+        for name in sorted(migrations):
+            if name.startswith("0008"):
+                # recipes written before search existed
+                for statement in [
+                    "INSERT INTO users (id, username, hashed_password, "
+                    "created_at, updated_at) "
+                    "VALUES (1, 'ana', 'x', '2024-01-01', '2024-01-01')",
+                    "INSERT INTO recipes (id, user_id, title, total_time, "
+                    "created_at, updated_at) VALUES "
+                    "(1, 1, 'Soup', 20, '2024-01-01', '2024-01-01'), "
+                    "(2, 1, 'Toast', 5, '2024-01-01', '2024-01-01')",
+                    "INSERT INTO ingredients (recipe_id, name, created_at, "
+                    "updated_at) "
+                    "VALUES (1, 'Leek', '2024-01-01', '2024-01-01')",
+                ]:
+                    connection.execute(text(statement))
+            migrations[name].upgrade(connection)
+
+    with sessionmaker(bind=engine)() as session:
+        assert [r.title for r in search_recipes(session, "leek").items] == [
+            "Soup"
+        ]
+        assert [r.title for r in search_recipes(session, "toast").items] == [
+            "Toast"
+        ]
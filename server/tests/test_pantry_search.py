@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.ingredient_index import IngredientIndex, normalize_ingredient
+from recipes.recipes_db import add_recipe
+from recipes.recipes_schemas import RecipeCreate, IngredientCreate
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def make_recipe(title, total_time, names):
+    return RecipeCreate(
+        title=title,
+        total_time=total_time,
+        ingredients=[IngredientCreate(name=name) for name in names],
+        instructions=[],
+    )
+
+
+def test_normalize_ingredient():
+    assert normalize_ingredient("  Tomatoes ") == "tomato"
+    assert normalize_ingredient("EGGS") == "egg"
+    assert normalize_ingredient("Swiss  cheese!") == "swiss cheese"
+
+
+def test_search_ranks_by_missing_ingredients(session):
+    omelette = add_recipe(
+        session, make_recipe("Omelette", 10, ["Eggs", "Milk"]), 1
+    )
+    pancakes = add_recipe(
+        session, make_recipe("Pancakes", 20, ["Eggs", "Flour", "Milk"]), 1
+    )
+    add_recipe(session, make_recipe("Salad", 5, ["Lettuce"]), 1)
+
+    index = IngredientIndex()
+    index.load(session)
+    results = index.search(["milk", "egg"])
+    assert [recipe_id for recipe_id, _, _ in results] == [
+        omelette.id,
+        pancakes.id,
+    ]
+    assert results[1][2] == ["Flour"]
+
+    assert index.search(["egg", "milk"], max_missing=0)[0][0] == omelette.id
+    assert index.search(["eggs", "flour", "milk"], max_time=15) == [
+        (omelette.id, ["Eggs", "Milk"], [])
+    ]
+
+
+def test_index_updates_incrementally(session):
+    index = IngredientIndex()
+    index.load(session)
+    index.add(100, ["Rice", "Beans"], 30)
+    assert index.search(["rice"])[0][0] == 100
+    index.remove(100)
+    assert index.search(["rice"]) == []
+
+
+def test_index_picks_up_writes_from_other_workers(session):
+    now = [0.0]
+    index = IngredientIndex(refresh_seconds=30, clock=lambda: now[0])
+    index.ensure_loaded(session)
+    # this index is not the one add_recipe keeps up to date, as for a
+    # write made by another worker
+    stew = add_recipe(session, make_recipe("Stew", 60, ["Leeks"]), 1)
+    index.ensure_loaded(session)
+    assert index.search(["leek"]) == []
+
+    now[0] = 30.0
+    index.ensure_loaded(session)
+    assert index.search(["leek"])[0][0] == stew.id
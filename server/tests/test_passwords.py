@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.middleware.sessions import SessionMiddleware
+from authentication.auth_db import (
+    create_user_account_async,
+    get_user_by_username_async,
+    validate_username_password_async,
+)
+from authentication.auth_router import auth_router
+from authentication.passwords import (
+    LOGIN_USER_RATE,
+    LoginThrottle,
+    PasswordHasher,
+    get_login_throttle,
+    get_password_hasher,
+    needs_rehash,
+)
+from recipes.recipes_models import DBRecipe  # noqa: F401, registers it
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import InMemoryRateLimitStore
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_hashing_does_not_block_the_event_loop():
+    hasher = PasswordHasher(workers=1, rounds=11)
+
+    async def scenario():
+        task = asyncio.create_task(hasher.hash("password"))
+        ticks = 0
+        while not task.done():
+            await asyncio.sleep(0.001)
+            ticks += 1
+        return ticks, await task
+
+    ticks, hashed = asyncio.run(scenario())
+    assert ticks > 10
+    assert not needs_rehash(hashed, 11)
+    hasher.shutdown()
+
+
+def test_saturated_hasher_refuses_at_once():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=10)
+
+    async def scenario():
+        first = asyncio.create_task(hasher.hash("first"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as busy:
+            await hasher.hash("second")
+        await first
+        return busy.value
+
+    busy = asyncio.run(scenario())
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert hasher.stats() == {"pending": 0, "completed": 1, "rejected": 1}
+    hasher.shutdown()
+
+
+def test_login_rehashes_when_the_cost_changes(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            old = PasswordHasher(rounds=4)
+            await create_user_account_async(
+                session, "ana", "password", None, old
+            )
+            user = await get_user_by_username_async(session, "ana")
+            assert not old.needs_rehash(user.hashed_password)
+
+            new = PasswordHasher(rounds=5)
+            token = await validate_username_password_async(
+                session, user, "password", new
+            )
+            assert token is not None
+            assert (
+                await validate_username_password_async(
+                    session, user, "wrong", new
+                )
+                is None
+            )
+            old.shutdown()
+            new.shutdown()
+        async with session_factory() as session:
+            user = await get_user_by_username_async(session, "ana")
+            return user.hashed_password
+
+    assert not needs_rehash(asyncio.run(scenario()), 5)
+
+
+def test_login_attempts_are_throttled(session_factory):
+    async def get_test_session():
+        async with session_factory() as session:
+            yield session
+
+    hasher = PasswordHasher(rounds=4)
+    throttle = LoginThrottle(InMemoryRateLimitStore())
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key="test")
+    app.include_router(auth_router)
+    app.dependency_overrides[get_async_session] = get_test_session
+    app.dependency_overrides[get_password_hasher] = lambda: hasher
+    app.dependency_overrides[get_login_throttle] = lambda: throttle
+    client = TestClient(app)
+
+    credentials = {"username": "bea", "password": "password"}
+    assert client.post("/api/auth/signup", json=credentials).status_code == 200
+    wrong = {"username": "bea", "password": "guess"}
+    # signing up counted as an attempt too
+    for _ in range(int(LOGIN_USER_RATE.burst) - 1):
+        assert client.post("/api/auth/login", json=wrong).status_code == 401
+    response = client.post("/api/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert throttle.throttled == 1
+    hasher.shutdown()
@@ -0,0 +1,112 @@
+import base64
+import json
+import boto3
+import pytest
+import requests
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from photos import photos_api, photos_db, photos_router
+from photos.photos_db import get_photo_by_name
+from shared.base_model import Base
+
+BUCKET = "test-photos"
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(photos_db, "SessionLocal", sessionmaker(bind=engine))
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(photos_api, "s3", client)
+        monkeypatch.setattr(photos_api, "BUCKET_NAME", BUCKET)
+        yield client
+    engine.dispose()
+
+
+@pytest.fixture
+def client(s3):
+    app = FastAPI()
+    app.include_router(photos_router.photos_router)
+    return TestClient(app)
+
+
+def test_direct_upload_is_confirmed_once(s3, client, monkeypatch):
+    response = client.post(
+        "/api/photos/uploads",
+        json={"filename": "../pie.png", "content_type": "image/png"},
+    )
+    assert response.status_code == 200
+    upload = response.json()
+    assert upload["photo_name"].endswith("_pie.png")
+    assert "/" not in upload["photo_name"]
+
+    policy = json.loads(base64.b64decode(upload["fields"]["policy"]))
+    assert {"Content-Type": "image/png"} in policy["conditions"]
+    assert [
+        "content-length-range",
+        1,
+        photos_api.MAX_IMAGE_SIZE_BYTES,
+    ] in policy["conditions"]
+
+    # the client sends the image to the bucket, not to the API
+    stored = requests.post(
+        upload["url"],
+        data=upload["fields"],
+        files={"file": ("pie.png", b"\x89PNG image bytes", "image/png")},
+    )
+    assert stored.status_code == 204
+
+    confirm = {"photo_name": upload["photo_name"]}
+    first = client.post("/api/photos/uploads/confirm", json=confirm)
+    assert first.status_code == 200
+    assert upload["photo_name"] in first.json()["photo_url"]
+    again = client.post("/api/photos/uploads/confirm", json=confirm)
+    assert again.json()["id"] == first.json()["id"]
+
+    # a confirmation racing the first one finds no row, then loses the insert
+    lookups = [None]
+    monkeypatch.setattr(
+        photos_router,
+        "get_photo_by_name",
+        lambda name: lookups.pop() if lookups else get_photo_by_name(name),
+    )
+    racing = client.post("/api/photos/uploads/confirm", json=confirm)
+    assert racing.json()["id"] == first.json()["id"]
+    assert len(client.get("/api/photos").json()) == 1
+
+
+def test_bad_uploads_are_not_recorded(s3, client):
+    response = client.post(
+        "/api/photos/uploads",
+        json={"filename": "notes.pdf", "content_type": "application/pdf"},
+    )
+    assert response.status_code == 400
+
+    failures = photos_api.s3_breaker.stats()["consecutive_failures"]
+    missing = {"photo_name": "never-uploaded.png"}
+    response = client.post("/api/photos/uploads/confirm", json=missing)
+    assert response.status_code == 400
+    # a missing object is not an S3 failure
+    assert photos_api.s3_breaker.stats()["consecutive_failures"] == failures
+
+    too_big = b"x" * (photos_api.MAX_IMAGE_SIZE_BYTES + 1)
+    for name, body, content_type in [
+        ("script.png", b"<script>", "text/html"),
+        ("huge.png", too_big, "image/png"),
+    ]:
+        s3.put_object(
+            Bucket=BUCKET, Key=name, Body=body, ContentType=content_type
+        )
+        confirm = {"photo_name": name}
+        response = client.post("/api/photos/uploads/confirm", json=confirm)
+        assert response.status_code == 400
+        with pytest.raises(ClientError):
+            s3.head_object(Bucket=BUCKET, Key=name)
+    assert client.get("/api/photos").json() == []
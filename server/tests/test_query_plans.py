@@ -0,0 +1,107 @@
+import re
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from authentication.auth_db import (
+    create_user_account,
+    get_user_by_username,
+    validate_session,
+    validate_username_password,
+)
+from authentication.session_cache import session_cache
+from recipes.recipes_db import (
+    add_recipe,
+    get_recipe_by_id,
+    get_recipes_page,
+    get_recipe_summaries_page,
+    get_page_fingerprint,
+)
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.migrations import run_migrations
+
+# Schema comes from the migrations, so this checks that they ship the
+# indexes the hot queries need
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+HOT_TABLES = (
+    "users",
+    "user_sessions",
+    "recipes",
+    "ingredients",
+    "instructions",
+)
+# "SCAN recipes" without "USING ..." is a full table scan
+FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(HOT_TABLES)})$")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    run_migrations(engine)
+    with SessionLocal() as session:
+        create_user_account(session, "planner", "password", None)
+        for i in range(5):
+            recipe = RecipeCreate(
+                title=f"Recipe {i}",
+                total_time=10,
+                ingredients=[IngredientCreate(name="Eggs")],
+                instructions=[
+                    InstructionCreate(step_text="Cook", step_number=1)
+                ],
+            )
+            add_recipe(session, recipe, user_id=1)
+    yield
+
+
+@pytest.fixture
+def captured():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def full_scans(statements):
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            ).all()
+            for row in plan:
+                if FULL_SCAN.match(row.detail):
+                    scans.append((row.detail, statement))
+    return scans
+
+
+def test_recipe_queries_use_indexes(captured):
+    with SessionLocal() as session:
+        page = get_recipes_page(session, limit=2)
+        get_recipes_page(session, limit=2, cursor=page.next_cursor)
+        get_recipes_page(session, limit=2, user_id=1)
+        get_recipe_summaries_page(session, limit=2, cursor=page.next_cursor)
+        get_recipe_summaries_page(session, limit=2, user_id=1)
+        get_page_fingerprint(session, "full", limit=2, user_id=1)
+        get_recipe_by_id(session, page.items[0].id)
+    assert captured
+    assert full_scans(captured) == []
+
+
+def test_auth_queries_use_indexes(captured):
+    session_cache.clear()
+    with SessionLocal() as session:
+        user = get_user_by_username(session, "planner")
+        token = validate_username_password(session, user, "password")
+        assert validate_session(session, "planner", token)
+    assert captured
+    assert full_scans(captured) == []
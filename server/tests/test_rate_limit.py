@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import (
+    RecipeGenerator,
+    get_generation_limiter,
+    get_recipe_generator,
+)
+from recipes.ai_jobs import GenerationJobs, get_generation_jobs
+from recipes.ai_providers import FakeLLMClient
+from recipes.recipes_router import ai_router
+from recipes.similarity_index import similarity_index
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import (
+    AdmissionController,
+    InMemoryRateLimitStore,
+    RateLimit,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_refills_at_its_rate():
+    clock = Clock()
+    store = InMemoryRateLimitStore(clock=clock)
+    limit = RateLimit(per_minute=60, burst=2)
+    assert store.take("a", limit) == 0
+    assert store.take("a", limit) == 0
+    assert store.take("a", limit) == pytest.approx(1.0)
+    assert store.take("b", limit) == 0  # buckets are per key
+    clock.now += 0.5
+    assert store.take("a", limit) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("a", limit) == 0
+    clock.now += 60
+    assert store.take("a", limit, cost=2) == 0
+
+
+def test_store_keeps_at_most_max_keys():
+    store = InMemoryRateLimitStore(max_keys=2)
+    limit = RateLimit(per_minute=1, burst=1)
+    for key in ["a", "b", "c"]:
+        store.take(key, limit)
+    assert len(store) == 2
+
+
+def test_admission_counts_and_caps_in_flight():
+    limiter = AdmissionController(InMemoryRateLimitStore(), max_in_flight=2)
+    limit = RateLimit(per_minute=60, burst=3)
+    limiter.admit("a", limit)
+    limiter.admit("a", limit)
+    with pytest.raises(HTTPException) as busy:
+        limiter.admit("b", limit)
+    assert busy.value.status_code == 503
+    assert busy.value.headers["Retry-After"] == "1"
+
+    limiter.release()
+    limiter.admit("a", limit)
+    limiter.release()
+    with pytest.raises(HTTPException) as limited:
+        limiter.admit("a", limit)
+    assert limited.value.status_code == 429
+    assert limited.value.headers["Retry-After"] == "1"
+    assert limiter.stats() == {
+        "admitted": 3,
+        "rate_limited": 1,
+        "over_capacity": 1,
+        "rejected": 2,
+        "in_flight": 1,
+    }
+
+
+def test_generate_endpoints_are_limited(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    similarity_index.loaded = False
+    limiter = AdmissionController(InMemoryRateLimitStore(), max_in_flight=1)
+    generator = RecipeGenerator(FakeLLMClient(latency=0.3))
+    app = FastAPI()
+    app.include_router(ai_router)
+    app.dependency_overrides[get_recipe_generator] = lambda: generator
+    app.dependency_overrides[get_generation_limiter] = lambda: limiter
+    app.dependency_overrides[get_async_session] = get_test_session
+    # jobs are admitted before the dependency is resolved, never stored
+    app.dependency_overrides[get_generation_jobs] = lambda: GenerationJobs(
+        generator, None
+    )
+    client = TestClient(app)
+
+    async def burst():
+        # the first request holds the only slot while the model works
+        first = asyncio.to_thread(
+            client.post,
+            "/api/generate/stream",
+            json={"ingredients": ["egg"], "max_time": 10},
+        )
+        task = asyncio.ensure_future(first)
+        await asyncio.sleep(0.1)
+        second = await asyncio.to_thread(
+            client.post,
+            "/api/generate/jobs",
+            json={"ingredients": ["egg"], "max_time": 10},
+        )
+        return await task, second
+
+    first, second = asyncio.run(burst())
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "1"
+    stats = client.get("/api/generate/stats").json()["admission"]
+    assert stats["admitted"] == 1
+    assert stats["over_capacity"] == 1
+    assert stats["in_flight"] == 0
+    asyncio.run(engine.dispose())
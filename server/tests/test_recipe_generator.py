@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+import pytest
+from recipes.ai_api import RecipeGenerator, request_key
+from recipes.ai_providers import FAKE_RECIPES, FakeLLMClient
+
+
+def test_request_key_normalizes_ingredients():
+    assert request_key(["Tomatoes", "eggs"], 20) == request_key(
+        ["egg", " tomato", "Eggs"], 20
+    )
+    assert request_key(["egg"], 20) != request_key(["egg"], 30)
+
+
+def test_identical_requests_share_one_call():
+    client = FakeLLMClient(latency=0.1)
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        results = await asyncio.gather(
+            *(generator.generate(["Eggs", "Rice"], 15) for _ in range(5)),
+            generator.generate(["rice", "egg"], 15),
+        )
+        return generator, results
+
+    generator, results = asyncio.run(scenario())
+    assert client.calls == 1
+    assert generator.coalesced == 5
+    assert all(
+        result.model_dump(exclude_none=True)["recipes"] == FAKE_RECIPES
+        for result in results
+    )
+
+    # once the call finished the next request goes upstream again
+    asyncio.run(RecipeGenerator(client).generate(["Eggs", "Rice"], 15))
+    assert client.calls == 2
+
+
+def test_concurrency_is_bounded():
+    client = FakeLLMClient(latency=0.05)
+
+    async def scenario():
+        generator = RecipeGenerator(client, max_concurrency=2)
+        await asyncio.gather(
+            *(generator.generate([f"item{i}"], 10) for i in range(6))
+        )
+        return generator
+
+    generator = asyncio.run(scenario())
+    assert generator.upstream_calls == 6
+    assert client.peak_active == 2
+
+
+def test_slow_call_does_not_block_event_loop():
+    client = FakeLLMClient(latency=0.5)
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        call = asyncio.create_task(generator.generate(["egg"], 10))
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        waited = time.perf_counter() - started
+        await call
+        return waited
+
+    assert asyncio.run(scenario()) < 0.25
+
+
+def test_errors_reach_every_waiter():
+    client = FakeLLMClient(response="not json", latency=0.05)
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        return await asyncio.gather(
+            generator.generate(["egg"], 10),
+            generator.generate(["egg"], 10),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert client.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    client = FakeLLMClient(
+        response=lambda prompt: json.dumps(FAKE_RECIPES), latency=0.1
+    )
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        first = asyncio.create_task(generator.generate(["egg"], 10))
+        second = asyncio.create_task(generator.generate(["egg"], 10))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    response = asyncio.run(scenario())
+    assert response.model_dump(exclude_none=True)["recipes"] == FAKE_RECIPES
+    assert client.calls == 1
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import (
+    add_recipe,
+    delete_recipe,
+    search_recipes,
+    update_recipe,
+)
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def make_recipe(title, ingredients, steps):
+    return RecipeCreate(
+        title=title,
+        total_time=15,
+        ingredients=[IngredientCreate(name=name) for name in ingredients],
+        instructions=[
+            InstructionCreate(step_text=step, step_number=n)
+            for n, step in enumerate(steps, start=1)
+        ],
+    )
+
+
+def test_search_ranks_title_matches_first(session):
+    toast = add_recipe(
+        session,
+        make_recipe("Garlic Toast", ["Bread", "Butter"], ["Toast bread"]),
+        1,
+    )
+    pasta = add_recipe(
+        session,
+        make_recipe("Pasta", ["Spaghetti"], ["Fry the garlic in oil"]),
+        1,
+    )
+    add_recipe(session, make_recipe("Salad", ["Lettuce"], ["Toss"]), 1)
+
+    page = search_recipes(session, "garlic")
+    assert [r.id for r in page.items] == [toast.id, pasta.id]
+    assert page.next_offset is None
+
+    first = search_recipes(session, "garlic", limit=1)
+    assert [r.id for r in first.items] == [toast.id]
+    assert first.next_offset == 1
+
+    # ingredient names and step prefixes are searchable too
+    assert [r.id for r in search_recipes(session, "spaghet").items] == [
+        pasta.id
+    ]
+
+
+def test_search_follows_updates_and_deletes(session):
+    recipe = add_recipe(
+        session, make_recipe("Plain rice", ["Rice"], ["Boil"]), 1
+    )
+    update_recipe(session, recipe.id, {"title": "Saffron rice"}, 1)
+    assert [r.id for r in search_recipes(session, "saffron").items] == [
+        recipe.id
+    ]
+    delete_recipe(session, recipe.id, 1)
+    assert search_recipes(session, "saffron").items == []
+
+
+def test_search_ignores_query_syntax(session):
+    assert search_recipes(session, '"(*').items == []
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import (
+    RecipeGenerator,
+    get_generation_limiter,
+    get_recipe_generator,
+)
+from recipes.ai_providers import FakeLLMClient
+from recipes.ai_cache import GenerationCache
+from recipes.ai_stream import RecipeStreamParser
+from recipes.recipes_router import ai_router
+from recipes.similarity_index import similarity_index
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import AdmissionController, InMemoryRateLimitStore
+
+RECIPES = [
+    {
+        "name": f'Recipe {i} {{with braces}} and "quotes"',
+        "ingredients": ["egg", "rice"],
+        "instructions": ["Cook", "Serve"],
+        "total_time": 10 + i,
+    }
+    for i in range(3)
+]
+RESPONSE = "```json\n" + json.dumps(RECIPES, indent=2) + "\n```"
+
+
+def test_parser_yields_each_object_when_complete():
+    parser = RecipeStreamParser()
+    parsed = []
+    for char in RESPONSE:
+        parsed.extend(parser.feed(char))
+    assert parsed == RECIPES
+    assert parser.done
+
+
+def test_parser_rejects_malformed_object():
+    parser = RecipeStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed('[{"name": oops}]')
+
+
+def test_first_recipe_arrives_early():
+    client = FakeLLMClient(response=RESPONSE, latency=0.6, chunk_size=16)
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        started = time.perf_counter()
+        arrivals = []
+        async for recipe, cached in generator.stream(["egg", "rice"], 20):
+            arrivals.append(time.perf_counter() - started)
+            assert cached is False
+        return arrivals
+
+    arrivals = asyncio.run(scenario())
+    assert len(arrivals) == 3
+    # about a third of the way through the response
+    assert arrivals[0] < arrivals[-1] * 0.5
+
+
+def test_invalid_recipes_are_skipped():
+    recipes = [{"name": "No time"}, RECIPES[0]]
+    client = FakeLLMClient(response=json.dumps(recipes))
+
+    async def scenario():
+        generator = RecipeGenerator(client)
+        return [r async for r, _ in generator.stream(["egg"], 10)]
+
+    assert [recipe.name for recipe in asyncio.run(scenario())] == [
+        RECIPES[0]["name"]
+    ]
+
+
+def test_streamed_answer_is_cached():
+    client = FakeLLMClient(response=RESPONSE)
+    cache = GenerationCache(None)
+
+    async def scenario():
+        generator = RecipeGenerator(client, cache=cache)
+        first = [c async for _, c in generator.stream(["egg"], 10)]
+        second = [c async for _, c in generator.stream(["Eggs"], 10)]
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == [False] * 3
+    assert second == [True] * 3
+    assert client.calls == 1
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    # empty database, so no saved recipe answers in place of the model
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    similarity_index.loaded = False
+
+    def make(llm_client: FakeLLMClient) -> TestClient:
+        app = FastAPI()
+        app.include_router(ai_router)
+        generator = RecipeGenerator(llm_client)
+        app.dependency_overrides[get_recipe_generator] = lambda: generator
+        app.dependency_overrides[get_async_session] = get_test_session
+        limiter = AdmissionController(InMemoryRateLimitStore(), 8)
+        app.dependency_overrides[get_generation_limiter] = lambda: limiter
+        return TestClient(app)
+
+    yield make
+    asyncio.run(engine.dispose())
+
+
+def test_stream_endpoint_sends_events(make_client):
+    client = make_client(FakeLLMClient(response=RESPONSE))
+    response = client.post(
+        "/api/generate/stream", json={"ingredients": ["egg"], "max_time": 20}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["recipe"] * 3 + ["done"]
+    assert [data for _, data in events[:3]] == RECIPES
+    assert events[-1][1] == {"count": 3, "cached": False, "saved": False}
+
+
+def test_stream_endpoint_reports_errors(make_client):
+    client = make_client(FakeLLMClient(response="I can't help with that"))
+    response = client.post(
+        "/api/generate/stream", json={"ingredients": ["egg"], "max_time": 20}
+    )
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["error"]
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import (
+    add_recipe,
+    get_recipes_page,
+    get_recipe_summaries_page,
+    get_page_fingerprint,
+    update_recipe,
+)
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def make_recipe(title):
+    return RecipeCreate(
+        title=title,
+        total_time=10,
+        ingredients=[IngredientCreate(name="Eggs")],
+        instructions=[
+            InstructionCreate(step_text="Whisk", step_number=2),
+            InstructionCreate(step_text="Crack", step_number=1),
+        ],
+    )
+
+
+def test_pages_cover_every_recipe_once(session):
+    for i in range(5):
+        add_recipe(session, make_recipe(f"Recipe {i}"), user_id=1)
+    add_recipe(session, make_recipe("Other user"), user_id=2)
+
+    seen = []
+    cursor = None
+    while True:
+        page = get_recipes_page(session, limit=2, cursor=cursor, user_id=1)
+        seen.extend(recipe.id for recipe in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+    # newest first
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_page_loads_ordered_children(session):
+    page = get_recipes_page(session, limit=1)
+    recipe = page.items[0]
+    assert [i.name for i in recipe.ingredients] == ["Eggs"]
+    assert [i.step_number for i in recipe.instructions] == [1, 2]
+
+
+def test_summaries_match_full_pages(session):
+    full = get_recipes_page(session, limit=3, user_id=1)
+    summary = get_recipe_summaries_page(session, limit=3, user_id=1)
+    assert [r.id for r in summary.items] == [r.id for r in full.items]
+    assert summary.next_cursor == full.next_cursor
+    assert summary.items[0].ingredient_count == 1
+    assert summary.items[0].step_count == 2
+
+
+def test_fingerprint_changes_when_page_changes(session):
+    before = get_page_fingerprint(session, "full", limit=2)
+    assert get_page_fingerprint(session, "full", limit=2) == before
+    assert get_page_fingerprint(session, "summary", limit=2) != before
+
+    newest = get_recipes_page(session, limit=1).items[0]
+    update_recipe(session, newest.id, {"title": "Renamed"}, newest.user_id)
+    assert get_page_fingerprint(session, "full", limit=2) != before
+
+
+def test_invalid_cursor(session):
+    with pytest.raises(ValueError):
+        get_recipes_page(session, cursor="not-a-cursor")
@@ -0,0 +1,237 @@
+import asyncio
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from recipes.ai_api import (
+    RecipeGenerator,
+    get_generation_limiter,
+    get_recipe_generator,
+)
+from recipes.ai_providers import FakeLLMClient, GuardedLLMClient
+from recipes.recipes_router import ai_router
+from recipes.similarity_index import similarity_index
+from shared.base_model import Base
+from shared.database import (
+    db_breaker,
+    get_async_session,
+    guard_with_breaker,
+    limit_statement_time,
+)
+from shared.rate_limit import AdmissionController, InMemoryRateLimitStore
+from shared.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    deadline,
+    time_left,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fail(breaker: CircuitBreaker, error: Exception = ConnectionError()):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(
+        "test",
+        failure_threshold=2,
+        reset_seconds=10,
+        failure_types=(ConnectionError,),
+        clock=clock,
+    )
+    fail(breaker)
+    fail(breaker, KeyError())  # not a failure type, doesn't count
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    clock.now = 4
+    with pytest.raises(CircuitOpenError) as rejected:
+        with breaker.guard():
+            pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers["Retry-After"] == "6"
+
+    # after reset_seconds one probe goes through, others are refused
+    clock.now = 10
+    with pytest.raises(ConnectionError):
+        with breaker.guard():
+            assert breaker.state == HALF_OPEN
+            with pytest.raises(CircuitOpenError):
+                with breaker.guard():
+                    pass
+            raise ConnectionError()
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+    clock.now = 20
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+    assert breaker.stats() == {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "trips": 2,
+        "rejected": 2,
+    }
+
+
+def test_deadlines_nest_and_expire():
+    assert time_left(5) == 5
+    with deadline(1):
+        assert 0.9 < time_left(5) <= 1
+        with deadline(10):
+            assert time_left(5) <= 1  # the outer deadline is nearer
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded) as exceeded:
+            time_left(5)
+    assert exceeded.value.status_code == 504
+
+
+def test_middleware_gives_requests_a_deadline():
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, seconds=3)
+
+    @app.get("/left")
+    def left() -> float:
+        return time_left(100)
+
+    assert 2 < TestClient(app).get("/left").json() <= 3
+
+
+def test_slow_llm_calls_time_out_and_trip_the_breaker():
+    breaker = CircuitBreaker("llm", failure_threshold=2)
+    client = GuardedLLMClient(
+        FakeLLMClient(latency=1), breaker, timeout_seconds=0.05
+    )
+
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await client.generate("prompt")
+        with pytest.raises(DeadlineExceeded):
+            async for _ in client.stream("prompt"):
+                pass
+        with pytest.raises(CircuitOpenError):
+            await client.generate("prompt")
+
+    asyncio.run(scenario())
+    assert breaker.state == OPEN
+
+
+def test_llm_calls_end_with_the_request_deadline():
+    client = GuardedLLMClient(FakeLLMClient(latency=1), CircuitBreaker("llm"))
+
+    async def scenario():
+        with deadline(0.05):
+            started = time.perf_counter()
+            with pytest.raises(DeadlineExceeded):
+                await client.generate("prompt")
+            return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_generate_fails_fast_while_the_breaker_is_open(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    similarity_index.loaded = False
+
+    def broken(prompt):
+        raise ConnectionError("Gemini is down")
+
+    generator = RecipeGenerator(
+        FakeLLMClient(response=broken),
+        breaker=CircuitBreaker("llm", failure_threshold=1),
+    )
+    limiter = AdmissionController(InMemoryRateLimitStore(), 8)
+    app = FastAPI()
+    app.include_router(ai_router)
+    app.dependency_overrides[get_recipe_generator] = lambda: generator
+    app.dependency_overrides[get_generation_limiter] = lambda: limiter
+    app.dependency_overrides[get_async_session] = get_test_session
+    client = TestClient(app)
+
+    body = {"ingredients": ["egg"], "max_time": 10}
+    assert client.post("/api/generate", json=body).status_code == 500
+    response = client.post("/api/generate", json=body)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    stats = client.get("/api/generate/stats").json()["breaker"]
+    assert stats["state"] == OPEN
+    assert stats["rejected"] == 1
+    asyncio.run(engine.dispose())
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+def test_statement_timeout_follows_the_deadline():
+    connection = RecordingConnection()
+    limit_statement_time(connection)
+    assert connection.statements == []  # the server default applies
+    with deadline(2):
+        limit_statement_time(connection)
+    assert len(connection.statements) == 1
+    timeout_ms = int(connection.statements[0].split("= ")[1])
+    assert 1900 < timeout_ms <= 2000
+
+
+def test_database_breaker_guards_statements_not_sessions(
+    tmp_path, monkeypatch
+):
+    clock = Clock()
+    monkeypatch.setattr(db_breaker, "_clock", clock)
+    monkeypatch.setattr(db_breaker, "failure_threshold", 2)
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db")
+    guard_with_breaker(engine)
+    with engine.connect() as connection:
+        for _ in range(2):
+            with pytest.raises(exc.OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+        assert db_breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            connection.execute(text("SELECT 1"))
+
+        # a connection held open all along (a slow request) doesn't hold
+        # the probe: the next statement is the probe
+        clock.now = db_breaker.reset_seconds
+        with engine.connect() as other:
+            assert other.execute(text("SELECT 1")).scalar() == 1
+        assert db_breaker.state == CLOSED
+        assert connection.execute(text("SELECT 2")).scalar() == 2
+    engine.dispose()
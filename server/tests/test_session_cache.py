@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from authentication.auth_db import (
+    create_user_account,
+    flush_session_extensions,
+    get_user_by_username,
+    hash_token,
+    invalidate_session,
+    update_user,
+    validate_session,
+    validate_username_password,
+)
+from authentication.auth_models import DBUserSession
+from authentication.session_cache import SessionCache, session_cache
+from recipes.recipes_models import DBRecipe  # noqa: F401, registers it
+from shared.base_model import Base
+from shared.cache import InMemoryCacheBackend
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    session_cache.clear()
+    yield engine
+    session_cache.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.lstrip().split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield executed
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def login(session, username: str) -> str:
+    create_user_account(session, username, "password", None)
+    user = get_user_by_username(session, username)
+    return validate_username_password(session, user, "password")
+
+
+def test_validated_sessions_skip_the_database(session, statements):
+    token = login(session, "ana")
+    statements.clear()
+    assert validate_session(session, "ana", token) is True
+    assert statements == ["SELECT"]
+    for _ in range(10):
+        assert validate_session(session, "ana", token) is True
+    assert statements == ["SELECT"]
+    assert validate_session(session, "ana", "wrong") is False
+
+
+def test_logout_and_account_changes_take_effect_at_once(session):
+    token = login(session, "bea")
+    assert validate_session(session, "bea", token) is True
+    invalidate_session(session, "bea", token)
+    assert validate_session(session, "bea", token) is False
+
+    # sessions on other devices survive a new login, not a rename
+    first = login(session, "cai")
+    assert validate_session(session, "cai", first) is True
+    user = get_user_by_username(session, "cai")
+    second = validate_username_password(session, user, "password")
+    assert validate_session(session, "cai", first) is True
+    assert validate_session(session, "cai", second) is True
+    update_user(session, "cai", "cai", "password")
+    assert validate_session(session, "cai", first) is True
+    update_user(session, "cai", "cal", None, session_token=second)
+    assert validate_session(session, "cai", first) is False
+    assert validate_session(session, "cal", first) is False
+    # the session that made the change stays logged in
+    assert validate_session(session, "cal", second) is True
+
+
+def test_expiry_extensions_are_batched(session, statements, monkeypatch):
+    tokens = {name: login(session, name) for name in ["dee", "eli"]}
+    soon = datetime.now() + timedelta(minutes=5)
+    for token in tokens.values():
+        session.get(DBUserSession, hash_token(token)).expires_at = soon
+    session.commit()
+
+    # plenty of time left: validating writes nothing
+    fresh = login(session, "fay")
+    statements.clear()
+    assert validate_session(session, "fay", fresh) is True
+    assert "UPDATE" not in statements
+
+    for name, token in tokens.items():
+        assert validate_session(session, name, token) is True
+    assert "UPDATE" not in statements
+    session.expire_all()
+    user_session = session.get(DBUserSession, hash_token(tokens["dee"]))
+    assert user_session.expires_at == soon
+
+    monkeypatch.setattr(session_cache, "flush_seconds", 0)
+    statements.clear()
+    assert validate_session(session, "fay", fresh) is True
+    assert statements.count("UPDATE") == 1  # one executemany for both
+    session.expire_all()
+    for token in tokens.values():
+        user_session = session.get(DBUserSession, hash_token(token))
+        assert user_session.expires_at > datetime.now() + timedelta(
+            minutes=100
+        )
+
+
+def test_backend_shares_revocations():
+    backend = InMemoryCacheBackend()
+    here, there = SessionCache(), SessionCache()
+    here.backend = there.backend = backend
+    expires_at = datetime.now() + timedelta(hours=1)
+    here.set("hash", 1, "gus", expires_at)
+    assert here.get("hash") is not None
+    there.forget(1, "other hash")
+    assert here.get("hash") is None
+
+
+def test_several_workers_only_cache_with_a_backend(
+    session, statements, monkeypatch
+):
+    monkeypatch.setattr(session_cache, "workers", 2)
+    token = login(session, "hal")
+    session.get(DBUserSession, hash_token(token)).expires_at = (
+        datetime.now() + timedelta(minutes=5)
+    )
+    session.commit()
+    statements.clear()
+    for _ in range(3):
+        assert validate_session(session, "hal", token) is True
+    assert statements.count("SELECT") == 3
+    assert len(session_cache) == 0
+    # the extension is still queued, and written by the flush
+    flush_session_extensions(session)
+    session.expire_all()
+    user_session = session.get(DBUserSession, hash_token(token))
+    assert user_session.expires_at > datetime.now() + timedelta(minutes=100)
+
+    monkeypatch.setattr(session_cache, "backend", InMemoryCacheBackend())
+    statements.clear()
+    for _ in range(3):
+        assert validate_session(session, "hal", token) is True
+    assert statements.count("SELECT") == 1
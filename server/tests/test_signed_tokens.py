@@ -0,0 +1,156 @@
+import asyncio
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.middleware.sessions import SessionMiddleware
+from authentication import signed_tokens
+from authentication.auth_router import auth_router
+from authentication.auth_schemas import AuthenticatedUser
+from authentication.signed_tokens import (
+    RevocationList,
+    TokenClaims,
+    issue_token,
+    renewed_token,
+    sign_token,
+    verify_token,
+)
+from recipes.recipes_models import DBRecipe  # noqa: F401, registers it
+from shared.auth import require_auth
+from shared.base_model import Base
+from shared.database import get_async_session
+
+
+def test_tokens_verify_only_untampered_and_unexpired():
+    token = issue_token(7, "ana", 60, secret="s")
+    claims = verify_token(token, secret="s")
+    assert (claims.user_id, claims.username) == (7, "ana")
+    assert verify_token(token, secret="other") is None
+    assert verify_token(token, now=time.time() + 61, secret="s") is None
+
+    signature = token.split(".")[1]
+    forged = sign_token(
+        TokenClaims(8, "ana", claims.token_id, claims.issued_at, 1e12), "x"
+    ).split(".")[0]
+    assert verify_token(f"{forged}.{signature}", secret="s") is None
+    assert verify_token("garbage", secret="s") is None
+
+
+def test_renewal_keeps_the_token_id():
+    claims = verify_token(issue_token(7, "ana", 60))
+    assert renewed_token(claims, 3600, 30) is None
+    renewed = verify_token(renewed_token(claims, 3600, 120))
+    assert renewed.token_id == claims.token_id
+    assert renewed.issued_at == claims.issued_at
+    assert renewed.expires_at > claims.expires_at + 3000
+
+
+@pytest.fixture
+def signed(tmp_path, monkeypatch):
+    monkeypatch.setattr(signed_tokens, "AUTH_TOKENS", "signed")
+    signed_tokens.revocations.clear()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key="test")
+    app.include_router(auth_router)
+    app.dependency_overrides[get_async_session] = get_test_session
+
+    @app.get("/whoami")
+    async def whoami(
+        auth_user: AuthenticatedUser = Depends(require_auth),
+    ) -> AuthenticatedUser:
+        return auth_user
+
+    yield TestClient(app), statements, SessionLocal
+    signed_tokens.revocations.clear()
+    asyncio.run(engine.dispose())
+
+
+def sign_up(client: TestClient, username: str) -> None:
+    credentials = {"username": username, "password": "password"}
+    response = client.post("/api/auth/signup", json=credentials)
+    assert response.status_code == 200
+
+
+def test_signed_sessions_are_checked_without_the_database(signed):
+    client, statements, _ = signed
+    sign_up(client, "ana")
+    assert client.get("/whoami").json()["username"] == "ana"
+    statements.clear()
+    for _ in range(5):
+        assert client.get("/whoami").status_code == 200
+    assert statements == []
+
+
+def test_logout_revokes_the_token(signed):
+    client, _, _ = signed
+    sign_up(client, "bea")
+    cookie = client.cookies["session"]
+    assert client.get("/api/auth/logout").json()["success"] is True
+    assert client.get("/whoami").status_code == 401
+
+    client.cookies.set("session", cookie)
+    assert client.get("/whoami").status_code == 403
+
+
+def test_password_change_revokes_every_token(signed):
+    client, _, SessionLocal = signed
+    sign_up(client, "cai")
+    other = TestClient(client.app)
+    login = {"username": "cai", "password": "password"}
+    assert other.post("/api/auth/login", json=login).status_code == 200
+    user_id = other.get("/whoami").json()["user_id"]
+
+    # saving the profile unchanged keeps everyone logged in
+    assert client.put("/api/auth/me", json={"username": "cai"}).is_success
+    assert other.get("/whoami").status_code == 200
+
+    # so does resubmitting the current password
+    same = {"username": "cai", "password": "password"}
+    assert client.put("/api/auth/me", json=same).is_success
+    assert other.get("/whoami").status_code == 200
+
+    change = {"username": "cai", "password": "new password"}
+    assert client.put("/api/auth/me", json=change).status_code == 200
+    assert other.get("/whoami").status_code == 403
+    # the client that made the change got a new token
+    assert client.get("/whoami").status_code == 200
+    login["password"] = "new password"
+    assert other.post("/api/auth/login", json=login).status_code == 200
+    assert other.get("/whoami").status_code == 200
+
+    # another process learns about it when it reloads the table
+    elsewhere = RevocationList()
+    now = time.time()
+    old = TokenClaims(user_id, "cai", "old", now - 60, now + 60)
+    new = TokenClaims(user_id, "cai", "new", now + 1, now + 60)
+    assert not elsewhere.is_revoked(old)
+
+    async def reload():
+        async with SessionLocal() as session:
+            await elsewhere.refresh_if_due(session)
+
+    asyncio.run(reload())
+    assert elsewhere.is_revoked(old)
+    assert not elsewhere.is_revoked(new)
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.ai_api import (
+    RecipeGenerator,
+    get_generation_limiter,
+    get_recipe_generator,
+)
+from recipes.ai_providers import FakeLLMClient
+from recipes.recipes_db import (
+    add_recipe,
+    delete_recipe,
+    find_similar_recipes,
+    find_similar_recipes_async,
+)
+from recipes.recipes_router import ai_router
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from recipes.similarity_index import (
+    SimilarityIndex,
+    ingredient_vector,
+    similarity_index,
+)
+from shared.base_model import Base
+from shared.database import get_async_session
+from shared.rate_limit import AdmissionController, InMemoryRateLimitStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = f"{tmp_path}/test.db"
+    engine = create_engine(f"sqlite:///{path}", echo=False)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def session(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", echo=False)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def make_recipe(title, total_time, names):
+    return RecipeCreate(
+        title=title,
+        total_time=total_time,
+        ingredients=[IngredientCreate(name=name) for name in names],
+        instructions=[InstructionCreate(step_text="Cook", step_number=1)],
+    )
+
+
+def test_vectors_ignore_order_case_and_plurals():
+    a = ingredient_vector(["Eggs", "flour", "Milk"])
+    b = ingredient_vector(["milk", "egg", "FLOUR", "eggs"])
+    assert np.allclose(a, b)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+
+
+def test_search_ranks_by_similarity_and_filters_time():
+    index = SimilarityIndex()
+    index.load_recipes(
+        [
+            (1, ["egg", "milk", "flour"], 20),
+            (2, ["egg", "milk"], 10),
+            (3, ["lettuce", "tomato"], 5),
+            (4, ["egg", "milk", "flour", "sugar"], 90),
+        ]
+    )
+    results = index.search(["Eggs", "Milk", "Flour"], max_time=30, limit=5)
+    assert [recipe_id for recipe_id, _ in results] == [1, 2]
+    assert results[0][1] == pytest.approx(1.0)
+
+    strict = index.search(["egg", "milk", "flour"], min_score=0.9)
+    assert [recipe_id for recipe_id, _ in strict] == [1]
+
+
+def test_incremental_updates():
+    index = SimilarityIndex()
+    index.add(1, ["egg"], 10)
+    assert len(index) == 0  # not loaded yet, load reads the database
+    index.load_recipes([])
+
+    for recipe_id in range(1, 101):
+        index.add(recipe_id, [f"item{recipe_id}", "salt"], 10)
+    assert len(index) == 100
+    assert index.search(["item42"], limit=1)[0][0] == 42
+
+    index.add(42, ["rice"], 10)
+    assert index.search(["item42"]) == []
+    index.remove(7)
+    assert all(recipe_id != 7 for recipe_id, _ in index.search(["item7"]))
+    index.add(500, ["item7"], 10)
+    assert index.search(["item7"], limit=1)[0][0] == 500
+    assert len(index) == 100
+
+
+def test_find_similar_recipes_follows_writes(session):
+    omelette = add_recipe(
+        session, make_recipe("Omelette", 10, ["Eggs", "Milk"]), 1
+    )
+    similarity_index.load(session)
+    pancakes = add_recipe(
+        session, make_recipe("Pancakes", 20, ["Eggs", "Flour", "Milk"]), 1
+    )
+
+    found = find_similar_recipes(session, ["egg", "milk", "flour"], 30, 3, 0.5)
+    assert [recipe.recipe_id for recipe in found] == [pancakes.id, omelette.id]
+    assert found[0].name == "Pancakes"
+    assert found[0].ingredients == ["Eggs", "Flour", "Milk"]
+    assert found[0].instructions == ["Cook"]
+
+    delete_recipe(session, pancakes.id, 1)
+    found = find_similar_recipes(session, ["egg", "milk", "flour"], 30, 3, 0.5)
+    assert [recipe.recipe_id for recipe in found] == [omelette.id]
+
+
+def test_index_picks_up_writes_from_other_workers(session):
+    now = [0.0]
+    index = SimilarityIndex(refresh_seconds=30, clock=lambda: now[0])
+    index.ensure_loaded(session)
+    # add_recipe keeps similarity_index up to date, not this one, as for a
+    # write made by another worker
+    stew = add_recipe(session, make_recipe("Stew", 60, ["Leeks"]), 1)
+    index.ensure_loaded(session)
+    assert index.search(["leek"]) == []
+
+    now[0] = 30.0
+    index.ensure_loaded(session)
+    assert index.search(["leek"])[0][0] == stew.id
+
+
+def test_generate_answers_from_saved_recipes(db_path, session):
+    for title in ["Omelette", "Scramble", "Frittata"]:
+        add_recipe(session, make_recipe(title, 10, ["Eggs", "Milk"]), 1)
+    similarity_index.loaded = False
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_session():
+        async with SessionLocal() as session:
+            yield session
+
+    llm_client = FakeLLMClient()
+    generator = RecipeGenerator(llm_client)
+    app = FastAPI()
+    app.include_router(ai_router)
+    app.dependency_overrides[get_recipe_generator] = lambda: generator
+    app.dependency_overrides[get_async_session] = get_test_session
+    limiter = AdmissionController(InMemoryRateLimitStore(), 8)
+    app.dependency_overrides[get_generation_limiter] = lambda: limiter
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/generate", json={"ingredients": ["egg", "milk"], "max_time": 15}
+    )
+    assert response.json()["saved"] is True
+    assert len(response.json()["recipes"]) == 3
+    assert llm_client.calls == 0
+
+    # too few saved recipes fit, so the model is asked
+    response = client.post(
+        "/api/generate", json={"ingredients": ["egg", "milk"], "max_time": 5}
+    )
+    assert response.json()["saved"] is False
+    assert llm_client.calls == 1
+    asyncio.run(engine.dispose())
+
+
+def test_async_lookup_keeps_the_index_off_the_event_loop(
+    db_path, session, monkeypatch
+):
+    add_recipe(session, make_recipe("Omelette", 10, ["Eggs", "Milk"]), 1)
+    similarity_index.loaded = False
+    threads = []
+    for name in ["load_rows", "search"]:
+        method = getattr(SimilarityIndex, name)
+
+        def record(self, *args, method=method):
+            threads.append(threading.current_thread())
+            return method(self, *args)
+
+        monkeypatch.setattr(SimilarityIndex, name, record)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+
+    async def lookup():
+        async with async_sessionmaker(bind=engine)() as async_session:
+            return await find_similar_recipes_async(
+                async_session, ["egg", "milk"], 30, 3, 0.5
+            )
+
+    found = asyncio.run(lookup())
+    asyncio.run(engine.dispose())
+    assert [recipe.name for recipe in found] == ["Omelette"]
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+    similarity_index.loaded = False
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from recipes.recipes_db import (
+    add_recipe,
+    get_recipe_by_id,
+    update_recipe,
+    RecipeVersionConflict,
+)
+from recipes.recipes_schemas import (
+    RecipeCreate,
+    IngredientCreate,
+    InstructionCreate,
+)
+from shared.base_model import Base
+
+# Use an in-memory SQLite database for testing
+DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(DATABASE_URL, echo=False)
+SessionLocal = sessionmaker(bind=engine)
+
+USER_ID = 1
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def session():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def recipe(session):
+    return add_recipe(
+        session,
+        RecipeCreate(
+            title="Omelette",
+            total_time=10,
+            ingredients=[
+                IngredientCreate(name="Eggs"),
+                IngredientCreate(name="Salt"),
+            ],
+            instructions=[
+                InstructionCreate(step_text="Whisk eggs", step_number=1),
+                InstructionCreate(step_text="Fry", step_number=2),
+            ],
+        ),
+        user_id=USER_ID,
+    )
+
+
+def test_only_changed_rows_are_touched(session, recipe):
+    updated = update_recipe(
+        session,
+        recipe.id,
+        {
+            "ingredients": [{"name": "Eggs"}, {"name": "Chives"}],
+            "instructions": [
+                {"step_text": "Whisk eggs", "step_number": 1},
+                {"step_text": "Fry gently", "step_number": 2},
+            ],
+        },
+        USER_ID,
+    )
+    old_ingredients = {i.name: i.id for i in recipe.ingredients}
+    new_ingredients = {i.name: i.id for i in updated.ingredients}
+    assert new_ingredients["Eggs"] == old_ingredients["Eggs"]
+    assert "Salt" not in new_ingredients
+    assert "Chives" in new_ingredients
+    # instruction ids survive an edit of their text
+    assert [i.id for i in updated.instructions] == [
+        i.id for i in recipe.instructions
+    ]
+    assert updated.instructions[1].step_text == "Fry gently"
+    assert updated.version == recipe.version + 1
+    assert get_recipe_by_id(session, recipe.id) == updated
+
+
+def test_stale_version_is_rejected(session, recipe):
+    update_recipe(
+        session, recipe.id, {"title": "First"}, USER_ID, recipe.version
+    )
+    with pytest.raises(RecipeVersionConflict):
+        update_recipe(
+            session, recipe.id, {"title": "Second"}, USER_ID, recipe.version
+        )
+    assert get_recipe_by_id(session, recipe.id).title == "First"
+
+
+def test_other_users_cannot_update(session, recipe):
+    assert update_recipe(session, recipe.id, {"title": "X"}, 99) is None
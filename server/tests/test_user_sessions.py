@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from authentication.auth_db import validate_session
+from authentication.auth_models import (
+    DBSessionRevocation,
+    DBUser,
+    DBUserSession,
+)
+from authentication.session_cache import session_cache
+from authentication.session_sweeper import SessionSweeper
+from recipes.recipes_models import DBRecipe  # noqa: F401, registers it
+from shared.base_model import Base
+from shared.migrations import discover
+
+
+def test_sweeper_deletes_expired_sessions_in_batches(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    deletes = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: (
+            deletes.append(statement)
+            if statement.startswith("DELETE FROM user_sessions")
+            else None
+        ),
+    )
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    now = datetime.now()
+
+    async def scenario():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with SessionLocal() as session:
+            session.add(DBUser(username="ana", hashed_password="x"))
+            await session.flush()
+            session.add_all(
+                DBUserSession(
+                    token_hash=f"hash-{i}",
+                    user_id=1,
+                    expires_at=now + timedelta(hours=i - 7, minutes=30),
+                )
+                for i in range(10)
+            )
+            session.add_all(
+                DBSessionRevocation(
+                    user_id=1,
+                    revoked_at=now - timedelta(hours=3),
+                    expires_at=now + timedelta(hours=i),
+                )
+                for i in [-1, 1]
+            )
+            await session.commit()
+        sweeper = SessionSweeper(SessionLocal, batch_size=3, pause_seconds=0)
+        deleted = await sweeper.sweep()
+        async with SessionLocal() as session:
+            rows = await session.run_sync(
+                lambda s: s.query(DBUserSession.token_hash).all()
+            )
+            revocations = await session.run_sync(
+                lambda s: s.query(DBSessionRevocation).count()
+            )
+        await engine.dispose()
+        return deleted, sorted(hash for hash, in rows), revocations
+
+    deleted, left, revocations = asyncio.run(scenario())
+    assert deleted == 7
+    assert len(deletes) == 3  # 3 + 3 + 1
+    assert left == ["hash-7", "hash-8", "hash-9"]
+    # revocations are only deleted once the tokens they revoke are gone
+    assert revocations == 1
+
+
+def test_migration_keeps_live_sessions():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    migrations = dict(discover())
+    now = datetime.now()
+    with engine.begin() as connection:
+        for name in sorted(migrations):
+            if name.startswith("0006"):
+                connection.execute(
+                    text(
+                        "INSERT INTO users (username, hashed_password, "
+                        "session_token, session_expires_at, created_at, "
+                        "updated_at) VALUES "
+                        "('ana', 'x', 'live', :later, :now, :now), "
+                        "('bea', 'x', 'old', :earlier, :now, :now)"
+                    ),
+                    {
+                        "now": now,
+                        "later": now + timedelta(hours=1),
+                        "earlier": now - timedelta(hours=1),
+                    },
+                )
+            migrations[name].upgrade(connection)
+
+    session_cache.clear()
+    with sessionmaker(bind=engine)() as session:
+        assert validate_session(session, "ana", "live") is True
+        assert validate_session(session, "bea", "old") is False
+        assert session.query(DBUserSession).count() == 1
+    index_names = {
+        index["name"] for index in inspect(engine).get_indexes("users")
+    }
+    assert "ix_users_username_session_token" not in index_names
+    session_cache.clear()
+
+
+def test_sweeper_writes_queued_extensions_first(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    now = datetime.now()
+    session_cache.clear()
+
+    async def scenario():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with SessionLocal() as session:
+            session.add(DBUser(username="ana", hashed_password="x"))
+            await session.flush()
+            session.add_all(
+                DBUserSession(
+                    token_hash=token_hash,
+                    user_id=1,
+                    expires_at=now - timedelta(hours=1),
+                )
+                for token_hash in ["extended", "idle"]
+            )
+            await session.commit()
+        # validated and extended in this worker, not yet written
+        entry = session_cache.set("extended", 1, "ana", now)
+        session_cache.extend(entry, now + timedelta(hours=2))
+        deleted = await SessionSweeper(SessionLocal).sweep()
+        async with SessionLocal() as session:
+            row = await session.get(DBUserSession, "extended")
+            expires_at = row.expires_at if row else None
+        await engine.dispose()
+        return deleted, expires_at
+
+    deleted, expires_at = asyncio.run(scenario())
+    session_cache.clear()
+    assert deleted == 1
+    assert expires_at == now + timedelta(hours=2)